@@ -0,0 +1,97 @@
+"""
+Decode benchmark: response body -> transformed frame, through per-row dicts
+(json.loads, as res.json() did) vs. the columnar decoder.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_decode --tickers 500 --days 1255 --threads 8
+"""
+import argparse
+import gc
+import json
+import logging
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_transform import make_payloads
+from src.columnar import decode_prices
+from src.etl_processor import ETLProcessor
+
+def arrow_allocated() -> int:
+    """Bytes held by Arrow buffers, which tracemalloc does not see"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return 0
+    return pa.total_allocated_bytes()
+
+def run(decode, bodies, processor, threads: int):
+    """Decode every body (on `threads` fetch-like threads), then transform the lot"""
+    if threads > 1:
+        with ThreadPoolExecutor(threads) as pool:
+            payloads = list(pool.map(decode, bodies))
+    else:
+        payloads = [decode(body) for body in bodies]
+    return payloads, processor.transform(payloads)
+
+def measure(decode, bodies, processor, threads: int):
+    """Timed on a plain run, memory on a second run under tracemalloc, which slows allocation"""
+    gc.collect()
+    wall, cpu = time.perf_counter(), time.process_time()
+    payloads, df = run(decode, bodies, processor, threads)
+    stats = {'seconds': round(time.perf_counter() - wall, 3),
+             'cpu_seconds': round(time.process_time() - cpu, 3),
+             'rows': len(df)}
+    del payloads, df
+
+    gc.collect()
+    arrow_before = arrow_allocated()
+    tracemalloc.start()
+    payloads, df = run(decode, bodies, processor, threads)
+    decoded, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # payloads and frame both alive: what extract() + transform() hold at the end
+    stats.update(peak_mb=round(peak / 2**20, 1),
+                 payloads_and_frame_mb=round(decoded / 2**20, 1),
+                 arrow_buffers_mb=round((arrow_allocated() - arrow_before) / 2**20, 1))
+    return stats
+
+def per_ticker(decode, body, repeat: int = 20):
+    """Median time, then peak and retained Python memory, to decode one ticker"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        decode(body)
+        samples.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    payload = decode(body)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del payload
+    return {'ms': round(statistics.median(samples) * 1000, 2), 'peak_kb': peak // 1024, 'retained_kb': current // 1024}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--days', type=int, default=1255)
+    parser.add_argument('--threads', type=int, default=8,
+                        help="Decode threads, like the fetch pool; pyarrow parses without the GIL")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    bodies = [json.dumps(rows).encode() for rows in make_payloads(args.tickers, args.days)]
+    processor = ETLProcessor(None, None, None)
+
+    report = {'tickers': args.tickers, 'days': args.days,
+              'body_mb': round(sum(map(len, bodies)) / 2**20, 1),
+              'per_ticker': {'dicts': per_ticker(json.loads, bodies[0]),
+                             'columnar': per_ticker(decode_prices, bodies[0])}}
+    for threads in sorted({1, args.threads}):
+        report[f'threads_{threads}'] = {'dicts': measure(json.loads, bodies, processor, threads),
+                                        'columnar': measure(decode_prices, bodies, processor, threads)}
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
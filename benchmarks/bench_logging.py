@@ -0,0 +1,111 @@
+"""
+Logging overhead benchmark: the extraction loop under the old setup (basicConfig
+with a file and a console handler, written by the logging thread) vs. the queue
+handler with a background writer, with and without per-ticker sampling.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_logging --tickers 2000 --workers 8 --sink-delay-ms 0.5
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+
+from src.etl_processor import ETLProcessor
+from src.log_config import configure_logging, sampled_out, shutdown_logging
+
+class FakeClient:
+    """Price source answering instantly, so only the loop and its logging are timed"""
+    def __init__(self, rows):
+        self.rows = rows
+
+    def get_yearly_data(self, symbol):
+        return self.rows
+
+    get_five_year_data = get_yearly_data
+
+    def get_historical_data(self, symbol, start_date=None, end_date=None):
+        return self.rows
+
+class SlowStream(io.TextIOBase):
+    """Console stand-in whose writes stall, like a busy terminal or a full pipe"""
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def write(self, text):
+        if self.delay:
+            time.sleep(self.delay)
+        return len(text)
+
+def legacy_setup(stream, log_file):
+    """What ETLProcessor._setup_logging configured before"""
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.FileHandler(log_file), logging.StreamHandler(stream)],
+                        force=True)
+
+def legacy_teardown():
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+def run(args, scenario: str, sink_delay: float) -> dict:
+    processor = ETLProcessor(None, FakeClient([{'date': '2024-01-02', 'close': 1.0}]), None)
+    processor.run_id = 'bench'
+    tickers = [f"T{i:04d}" for i in range(args.tickers)]
+    stream = SlowStream(sink_delay)
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, 'etl.log')
+        if scenario == 'none':
+            logging.disable(logging.CRITICAL)
+        elif scenario == 'before':
+            legacy_setup(stream, log_file)
+        else:
+            configure_logging(stream=stream, log_file=log_file, force=True,
+                              sample_rate=None if scenario == 'queue' else args.sample_rate)
+
+        start = time.perf_counter()
+        extracted = sum(1 for _, data in processor.iter_extract(tickers, 'yearly', use_retry=False,
+                                                                max_workers=args.workers) if data)
+        elapsed = time.perf_counter() - start
+
+        dropped = sampled_out()
+        drain = time.perf_counter()
+        if scenario == 'none':
+            logging.disable(logging.NOTSET)
+        elif scenario == 'before':
+            legacy_teardown()
+        else:
+            shutdown_logging()
+        drain = time.perf_counter() - drain
+        lines = sum(1 for _ in open(log_file)) if os.path.exists(log_file) else 0
+    return {'seconds': round(elapsed, 3), 'us_per_ticker': round(elapsed / extracted * 1e6, 1),
+            'drain_seconds': round(drain, 3), 'lines_written': lines, 'sampled_out': dropped}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tickers', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=8, help="Fetch threads")
+    parser.add_argument('--sink-delay-ms', type=float, default=0.5, help="Stall per console write in the slow case")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--sample-rate', type=float, default=20.0, help="Per-ticker records per second when sampled")
+    args = parser.parse_args()
+
+    report = {'tickers': args.tickers, 'workers': args.workers}
+    for label, delay in (('fast_console', 0.0), ('slow_console', args.sink_delay_ms / 1000)):
+        # fastest of a few repeats per scenario, the single-run spread is large
+        results = {scenario: min((run(args, scenario, delay) for _ in range(args.repeat)),
+                                 key=lambda result: result['seconds'])
+                   for scenario in ('none', 'before', 'queue', 'queue_sampled')}
+        baseline = results['none']['us_per_ticker']
+        for scenario in ('before', 'queue', 'queue_sampled'):
+            results[scenario]['overhead_us_per_ticker'] = round(results[scenario]['us_per_ticker'] - baseline, 1)
+        report[label] = results
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+CLI startup benchmark: wall time and `-X importtime` totals of CLI commands
+that should not pull in pandas, BigQuery or the HTTP stack, against importing
+the modules a pipeline run needs.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_startup --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# modules whose presence in a command's import log means a heavy import leaked in
+HEAVY_MODULES = ('pandas', 'numpy', 'google.cloud.bigquery', 'requests', 'pyarrow')
+
+SCENARIOS = {
+    'cli --help': ['-m', 'src.cli', '--help'],
+    'cli validate-config': ['-m', 'src.cli', 'validate-config'],
+    'cli dry-run': ['-m', 'src.cli', 'dry-run', '--tickers', 'AAPL,MSFT', '--workers', '2', '--incremental'],
+    'cli status': ['-m', 'src.cli', 'status'],
+    # what every entry point paid before: root.py imported all of these at the top
+    'import pipeline modules': ['-c', 'import src.connectors, src.bigquery_connector, '
+                                      'src.etl_processor, src.scheduler, src.web_scrapper'],
+}
+
+def import_log(args, cwd: str, env: dict) -> dict:
+    """Cumulative import time of the top-level imports and the heavy modules loaded"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=cwd, env=env,
+                            capture_output=True, text=True)
+    total_us = 0
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # top-level entries are not indented, their cumulative times add up to the total
+        if not name[1:].startswith(' '):
+            total_us += int(cumulative)
+        loaded.add(name.strip())
+    return {'import_ms': round(total_us / 1000, 1),
+            'heavy_modules': sorted(m for m in HEAVY_MODULES if m in loaded)}
+
+def wall_time(args, cwd: str, env: dict, repeat: int) -> float:
+    """Median wall time of the whole process, interpreter startup included"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=cwd, env=env, capture_output=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per scenario, the median wall time is kept")
+    parser.add_argument('--output', help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=repo_root)
+    report = {'python': sys.version.split()[0], 'scenarios': {}}
+    # run in an empty directory so no .env or .state of the checkout is read or written
+    with tempfile.TemporaryDirectory() as cwd:
+        for name, command in SCENARIOS.items():
+            stats = import_log(command, cwd, env)
+            stats['wall_ms'] = round(wall_time(command, cwd, env, args.repeat) * 1000, 1)
+            report['scenarios'][name] = stats
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Transform benchmark: per-ticker legacy transform + concat vs. the batch transform.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_transform --tickers 500 --days 1255
+"""
+import argparse
+import gc
+import json
+import logging
+import random
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import pandas as pd
+
+from src.etl_processor import ETLProcessor
+
+def make_payloads(tickers: int, days: int, seed: int = 7):
+    """Synthetic FMP historical-price-eod payloads, newest day first like the API"""
+    rng = random.Random(seed)
+    start = date(2021, 1, 4)
+    dates = [(start + timedelta(days=i)).isoformat() for i in range(days)][::-1]
+    payloads = []
+    for t in range(tickers):
+        symbol = f"T{t:04d}"
+        price = rng.uniform(10, 900)
+        rows = []
+        for d in dates:
+            o = round(price * rng.uniform(0.98, 1.02), 2)
+            c = round(price * rng.uniform(0.98, 1.02), 2)
+            rows.append({'symbol': symbol, 'date': d, 'open': o,
+                         'high': round(max(o, c) * 1.01, 2), 'low': round(min(o, c) * 0.99, 2),
+                         'close': c, 'volume': rng.randint(10_000, 50_000_000),
+                         'change': round(c - o, 2), 'changePercent': round((c - o) / o * 100, 5),
+                         'vwap': round((o + c) / 2, 4)})
+        payloads.append(rows)
+    return payloads
+
+def legacy_transform(payloads):
+    """Pre-batch path: one default-dtype DataFrame per ticker, concatenated afterwards"""
+    frames = []
+    for rows in payloads:
+        df = pd.DataFrame(rows)
+        df['date'] = pd.to_datetime(df['date'])
+        df['volume'] = df['volume'].astype('int64')
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+def measure(func, *args):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    df = func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': round(elapsed, 3),
+            'peak_mb': round(peak / 2**20, 1),
+            'frame_mb': round(df.memory_usage(deep=True).sum() / 2**20, 1),
+            'rows': len(df)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--days', type=int, default=1255)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    payloads = make_payloads(args.tickers, args.days)
+    processor = ETLProcessor(None, None, None)
+
+    report = {
+        'tickers': args.tickers,
+        'days': args.days,
+        'legacy': measure(legacy_transform, payloads),
+        'batch': measure(processor.transform, payloads),
+    }
+    print(json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""
+End-to-end pipeline benchmark against the local API stub and fake warehouse.
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks --tickers 10 100 --history 1y 5y --output bench.json
+
+Each scenario reports tickers/sec, p50/p99 per-ticker fetch latency, peak
+RSS per stage and bytes loaded, as JSON, so runs can be diffed over time.
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List
+
+from benchmarks.stub_server import StubApiServer
+from src.bigquery_connector import BigQueryConnector
+from src.connectors import FMPClient
+from src.etl_processor import ETLProcessor
+from src.fake_bigquery import FakeBigQueryClient
+from src.http_transport import HttpTransport
+from src.metrics import get_registry
+
+HISTORY_DAYS = {'1y': 365, '5y': 1825}
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+def current_rss() -> int:
+    """Resident set size in bytes, falls back to the lifetime peak off Linux"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class RssSampler:
+    """Samples RSS on a background thread and keeps the peak seen during a stage"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = current_rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+class TimedClient:
+    """Wraps FMPClient fetch methods to record per-ticker latency"""
+
+    def __init__(self, client: FMPClient):
+        self.client = client
+        self.latencies: List[float] = []
+        self._lock = threading.Lock()
+
+    def _timed(self, method, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.latencies.append(elapsed)
+
+    def get_yearly_data(self, symbol, **kwargs):
+        return self._timed(self.client.get_yearly_data, symbol)
+
+    def get_five_year_data(self, symbol, **kwargs):
+        return self._timed(self.client.get_five_year_data, symbol)
+
+    def get_historical_data(self, symbol, **kwargs):
+        return self._timed(self.client.get_historical_data, symbol, **kwargs)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+def run_scenario(server: StubApiServer, tickers: int, history: str, args) -> Dict:
+    symbols = [f"B{i:05d}" for i in range(tickers)]
+    transport = HttpTransport(pool_maxsize=args.workers)
+    # unique key per scenario so the shared limiter starts full and never throttles the stub
+    fmp = FMPClient(server.fmp_url, f"bench-{tickers}-{history}-{time.time_ns()}",
+                    calls_per_minute=10**9, transport=transport)
+    timed = TimedClient(fmp)
+    warehouse = FakeBigQueryClient(job_latency=args.job_latency)
+    processor = ETLProcessor(None, timed, BigQueryConnector('bench', None, client=warehouse))
+    data_type = {'1y': 'yearly', '5y': 'five_year'}[history]
+    requests_before = server.requests
+    get_registry().reset()
+
+    stages = {}
+    start = time.perf_counter()
+    if args.mode == 'streaming':
+        with RssSampler() as rss:
+            stage_start = time.perf_counter()
+            stats = processor.run_streaming(symbols, 'bench.prices', data_type, max_workers=args.workers)
+        stages['pipeline'] = {'seconds': time.perf_counter() - stage_start, 'peak_rss_mb': rss.peak / 2**20}
+        rows = stats['rows_loaded']
+    else:
+        with RssSampler() as rss:
+            stage_start = time.perf_counter()
+            payloads = processor.extract(symbols, data_type, use_retry=False, max_workers=args.workers)
+        stages['extract'] = {'seconds': time.perf_counter() - stage_start, 'peak_rss_mb': rss.peak / 2**20}
+
+        with RssSampler() as rss:
+            stage_start = time.perf_counter()
+            df = processor.transform(payloads)
+        stages['transform'] = {'seconds': time.perf_counter() - stage_start, 'peak_rss_mb': rss.peak / 2**20}
+        del payloads
+
+        rows = 0
+        if df is not None and not df.empty:
+            # every fetch failing leaves nothing to load, the scenario reports no rows
+            with RssSampler() as rss:
+                stage_start = time.perf_counter()
+                processor.load(df, 'bench.prices')
+            stages['load'] = {'seconds': time.perf_counter() - stage_start, 'peak_rss_mb': rss.peak / 2**20}
+            rows = len(df)
+        del df
+    elapsed = time.perf_counter() - start
+
+    transport_stats = transport.stats()
+    transport.close()
+    return {
+        'scenario': f"{tickers}x{history}",
+        'mode': args.mode,
+        'tickers': tickers,
+        'history': history,
+        'workers': args.workers,
+        'seconds': round(elapsed, 3),
+        'tickers_per_sec': round(tickers / elapsed, 2) if elapsed else None,
+        'latency_p50_ms': round(percentile(timed.latencies, 50) * 1000, 2),
+        'latency_p99_ms': round(percentile(timed.latencies, 99) * 1000, 2),
+        'extracted': processor.stats['extracted'],
+        'errors': processor.stats['errors'],
+        'api_requests': server.requests - requests_before,
+        'connection_reuse_rate': round(transport_stats['reuse_rate'], 4),
+        'bytes_fetched': transport_stats['bytes_received'],
+        'rows_loaded': rows,
+        'bytes_loaded': sum(job.input_file_bytes for job in warehouse.jobs if job.error is None),
+        'load_jobs': len(warehouse.jobs),
+        'stages': {name: {key: round(value, 3) for key, value in stage.items()}
+                   for name, stage in stages.items()},
+        'metrics': get_registry().report()['metrics'],
+    }
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tickers', type=int, nargs='+', default=[10, 100, 500, 5000])
+    parser.add_argument('--history', nargs='+', choices=sorted(HISTORY_DAYS), default=['1y', '5y'])
+    parser.add_argument('--mode', choices=['batch', 'streaming'], default='batch')
+    parser.add_argument('--workers', type=int, default=16, help="concurrent fetch threads")
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="stub response latency")
+    parser.add_argument('--jitter-ms', type=float, default=10.0, help="extra random stub latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of HTTP 500 responses")
+    parser.add_argument('--rate-429', type=float, default=0.0, help="share of HTTP 429 responses")
+    parser.add_argument('--job-latency', type=float, default=0.0, help="fake load job duration in seconds")
+    parser.add_argument('--output', help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.CRITICAL)
+    results = []
+    with StubApiServer(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                       error_rate=args.error_rate, rate_429=args.rate_429) as server:
+        for history in args.history:
+            for tickers in args.tickers:
+                # keep stdout clean for the JSON report
+                with contextlib.redirect_stdout(sys.stderr):
+                    result = run_scenario(server, tickers, history, args)
+                results.append(result)
+                print(f"{result['scenario']}: {result['tickers_per_sec']} tickers/s, "
+                      f"p99 {result['latency_p99_ms']} ms", file=sys.stderr)
+
+    report = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+if __name__ == '__main__':
+    main()
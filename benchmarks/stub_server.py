@@ -0,0 +1,233 @@
+"""
+Local HTTP stand-in for the FMP historical-price-eod and eod-bulk endpoints
+and Alpha Vantage TIME_SERIES_DAILY, with configurable latency, errors and
+429s.
+
+    with StubApiServer(latency=0.05, error_rate=0.01) as server:
+        client = FMPClient(server.fmp_url, "bench-key")
+"""
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+SYMBOL_PLACEHOLDER = "__SYMBOL__"
+END_DATE = date(2026, 1, 8)
+
+def _trading_days(start: date, end: date):
+    """Weekdays from end back to start, newest first like the real API"""
+    days = []
+    day = end
+    while day >= start:
+        if day.weekday() < 5:
+            days.append(day)
+        day -= timedelta(days=1)
+    return days
+
+def _trading_start(end: date, rows: int) -> date:
+    """First day of the last `rows` trading days up to end"""
+    day, seen = end, 0
+    while True:
+        if day.weekday() < 5:
+            seen += 1
+            if seen >= rows:
+                return day
+        day -= timedelta(days=1)
+
+@lru_cache(maxsize=64)
+def _fmp_template(start: date, end: date) -> bytes:
+    """Encoded FMP payload for a date range with a placeholder symbol, built once per range"""
+    rng = random.Random(start.toordinal() * 31 + end.toordinal())
+    price = 100.0
+    rows = []
+    for day in _trading_days(start, end):
+        price = max(1.0, price * rng.uniform(0.97, 1.03))
+        o, c = round(price * rng.uniform(0.99, 1.01), 2), round(price, 2)
+        rows.append({'symbol': SYMBOL_PLACEHOLDER, 'date': day.isoformat(), 'open': o,
+                     'high': round(max(o, c) * 1.01, 2), 'low': round(min(o, c) * 0.99, 2),
+                     'close': c, 'volume': rng.randint(100_000, 90_000_000),
+                     'change': round(c - o, 2), 'changePercent': round((c - o) / o * 100, 5),
+                     'vwap': round((o + c) / 2, 4)})
+    return json.dumps(rows).encode()
+
+@lru_cache(maxsize=64)
+def _alpha_template(start: date, end: date) -> bytes:
+    rng = random.Random(start.toordinal() * 17 + end.toordinal())
+    series = {}
+    for day in _trading_days(start, end):
+        c = round(rng.uniform(50, 500), 4)
+        series[day.isoformat()] = {'1. open': f"{c * 0.99:.4f}", '2. high': f"{c * 1.02:.4f}",
+                                   '3. low': f"{c * 0.97:.4f}", '4. close': f"{c:.4f}",
+                                   '5. volume': str(rng.randint(100_000, 90_000_000))}
+    payload = {'Meta Data': {'1. Information': 'Daily Prices (open, high, low, close) and Volumes',
+                             '2. Symbol': SYMBOL_PLACEHOLDER,
+                             '3. Last Refreshed': end.isoformat()},
+               'Time Series (Daily)': series}
+    return json.dumps(payload).encode()
+
+
+class StubApiServer:
+    def __init__(self,
+                 latency: float = 0.0,
+                 jitter: float = 0.0,
+                 error_rate: float = 0.0,
+                 rate_429: float = 0.0,
+                 retry_after: float = 1.0,
+                 seed: int = 0,
+                 bulk_symbols: int = 500,
+                 bulk_format: str = 'json',
+                 reject_batches: bool = False,
+                 down_paths: tuple = ()):
+        """
+        Args:
+            latency (float): Seconds added to every response
+            jitter (float): Extra uniform random latency in seconds
+            error_rate (float): Share of requests answered with HTTP 500
+            rate_429 (float): Share of requests answered with HTTP 429 and Retry-After
+            retry_after (float): Retry-After value in seconds sent with 429s
+            seed (int): Seed for the error/latency draws
+            bulk_symbols (int): Symbols T0..T<n-1> present in every eod-bulk day
+            bulk_format (str): 'json' or 'csv' (what the real eod-bulk returns)
+            reject_batches (bool): Answer eod-bulk with 402, like a plan without them
+            down_paths (tuple): Path prefixes answered with 503, one provider being down
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.bulk_symbols = bulk_symbols
+        self.bulk_format = bulk_format
+        self.reject_batches = reject_batches
+        self.down_paths = tuple(down_paths)
+        self.paths = {}
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.requests = 0
+        self.status_counts = {}
+        self.bytes_sent = 0
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def fmp_url(self) -> str:
+        """Value for FMPClient api_url, symbol is appended by the client"""
+        return f"{self.base_url}/stable/historical-price-eod/full?symbol="
+
+    @property
+    def alpha_url(self) -> str:
+        return f"{self.base_url}/query"
+
+    def _draw(self):
+        with self._rng_lock:
+            return self._rng.random(), self._rng.random()
+
+    def _respond(self, handler: BaseHTTPRequestHandler):
+        url = urlsplit(handler.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        fault, jitter = self._draw()
+        time.sleep(self.latency + jitter * self.jitter)
+
+        status, headers, body = 200, {'Content-Type': 'application/json'}, b''
+        if fault < self.rate_429:
+            status, headers['Retry-After'] = 429, str(self.retry_after)
+            body = b'{"Error Message": "Limit Reach"}'
+        elif fault < self.rate_429 + self.error_rate:
+            status, body = 500, b'{"Error Message": "stub failure"}'
+        elif self.down_paths and url.path.startswith(self.down_paths):
+            status, body = 503, b'{"Error Message": "service unavailable"}'
+        elif self.reject_batches and url.path == '/stable/eod-bulk':
+            status, body = 402, b'{"Error Message": "Premium endpoint"}'
+        elif url.path == '/stable/eod-bulk':
+            body, headers['Content-Type'] = self._bulk_day(date.fromisoformat(query['date']))
+        elif url.path.startswith('/stable/historical-price-eod'):
+            symbol = query.get('symbol', 'UNKNOWN')
+            end = date.fromisoformat(query['to']) if 'to' in query else END_DATE
+            if 'from' in query:
+                start = date.fromisoformat(query['from'])
+            elif 'timeseries' in query:
+                # timeseries counts trading days, like the real endpoint
+                start = _trading_start(end, int(query['timeseries']))
+            else:
+                start = end - timedelta(days=1825)
+            body = _fmp_template(start, end).replace(SYMBOL_PLACEHOLDER.encode(), symbol.encode())
+        elif url.path == '/query' and query.get('function') == 'TIME_SERIES_DAILY':
+            symbol = query.get('symbol', 'UNKNOWN')
+            # compact is the last 100 trading days, full twenty years
+            if query.get('outputsize') == 'full':
+                start = END_DATE - timedelta(days=7300)
+            else:
+                start = _trading_start(END_DATE, 100)
+            body = _alpha_template(start, END_DATE).replace(
+                SYMBOL_PLACEHOLDER.encode(), symbol.encode())
+        else:
+            status, body = 404, b'{"Error Message": "unknown endpoint"}'
+
+        handler.send_response(status)
+        for key, value in headers.items():
+            handler.send_header(key, value)
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+        with self._rng_lock:
+            self.paths[url.path] = self.paths.get(url.path, 0) + 1
+            self.requests += 1
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            self.bytes_sent += len(body)
+
+    def _bulk_day(self, day: date):
+        """Every stub symbol's row for one day, cut from the per-symbol template"""
+        if day.weekday() >= 5:
+            rows = []
+        else:
+            template = json.loads(_fmp_template(day - timedelta(days=7), END_DATE))
+            row = next((r for r in template if r['date'] == day.isoformat()), None)
+            # the real endpoint's fields: adjClose, and no change, changePercent or vwap
+            rows = [] if row is None else [
+                {'symbol': f"T{i}", 'date': row['date'], 'open': row['open'], 'low': row['low'],
+                 'high': row['high'], 'close': row['close'], 'adjClose': row['close'], 'volume': row['volume']}
+                for i in range(self.bulk_symbols)]
+        if self.bulk_format == 'csv':
+            fields = ['symbol', 'date', 'open', 'low', 'high', 'close', 'adjClose', 'volume']
+            lines = [','.join(fields)] + [','.join(str(r[f]) for f in fields) for r in rows]
+            return ('\n'.join(lines) + '\n').encode(), 'text/csv'
+        return json.dumps(rows).encode(), 'application/json'
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                stub._respond(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
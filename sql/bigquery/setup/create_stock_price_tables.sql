@@ -0,0 +1,48 @@
+-- Daily OHLCV target for ETLProcessor, upserted by BigQueryConnector.upsert_data.
+-- Partitioning by date lets the MERGE prune to the partitions a batch touches,
+-- clustering by symbol narrows the scan inside each partition to the batch's tickers.
+CREATE TABLE IF NOT EXISTS `stock_market_data.stock_price_daily` (
+  symbol STRING NOT NULL,
+  date DATE NOT NULL,
+  open FLOAT64,
+  high FLOAT64,
+  low FLOAT64,
+  close FLOAT64,
+  volume INT64,
+  change FLOAT64,
+  changePercent FLOAT64,
+  vwap FLOAT64
+)
+PARTITION BY date
+CLUSTER BY symbol
+OPTIONS (
+  description = 'Daily end-of-day prices, one row per (symbol, date)',
+  require_partition_filter = FALSE
+);
+
+-- Indicators derived by ETLProcessor.derive, loaded next to the prices so
+-- downstream queries no longer run window functions over the full history.
+CREATE TABLE IF NOT EXISTS `stock_market_data.stock_price_features` (
+  symbol STRING NOT NULL,
+  date DATE NOT NULL,
+  return_1d FLOAT64,
+  log_return FLOAT64,
+  sma_5 FLOAT64,
+  sma_20 FLOAT64,
+  sma_50 FLOAT64,
+  volatility_20 FLOAT64,
+  vwap_20 FLOAT64
+)
+PARTITION BY date
+CLUSTER BY symbol
+OPTIONS (
+  description = 'Daily technical indicators, one row per (symbol, date)'
+);
+
+-- Staging tables are created per upsert and dropped after the MERGE.
+-- The default expiration cleans up any left behind by a crashed run.
+CREATE SCHEMA IF NOT EXISTS `stock_market_staging`
+OPTIONS (
+  description = 'Per-run staging tables for upserts',
+  default_table_expiration_days = 1
+);
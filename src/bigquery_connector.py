@@ -1,15 +1,81 @@
+import io
 import logging
 import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, Future
+from datetime import date, datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence
 from google.cloud import bigquery
 from google.api_core import exceptions
 from google.api_core.exceptions import GoogleAPIError
 import pandas as pd
+from src.cache.backends import MemoryCache
+from src.metrics import get_registry
+
+BQ_JOB_SECONDS = get_registry().histogram(
+    'bigquery_job_seconds', 'BigQuery job latency from submit to completion', ('kind',))
+BQ_BYTES_LOADED = get_registry().counter(
+    'bigquery_bytes_loaded_total', 'Serialized bytes sent in load jobs')
+BQ_ROWS_LOADED = get_registry().counter(
+    'bigquery_rows_loaded_total', 'Rows sent in successful load jobs')
+
+# staging-only column numbering the rows of an upsert batch, never merged into the target
+LOAD_SEQ_COLUMN = '_load_seq'
+
+class BatchLoad:
+    def __init__(self, futures: List[Future], destination: str):
+        """
+        Handle on the load jobs submitted by BigQueryConnector.batch_insert
+        Args:
+            futures (list): One future per chunk, each resolving to a job report dict
+            destination (str): Table the chunks are loaded into
+        """
+        self.futures = futures
+        self.destination = destination
+
+    def done(self) -> bool:
+        """True once every chunk has finished, successfully or not"""
+        return all(future.done() for future in self.futures)
+
+    def poll(self) -> List[dict]:
+        """Reports of the chunks finished so far, never blocks"""
+        return [future.result() for future in self.futures if future.done()]
+
+    def result(self, timeout: Optional[float] = None, raise_on_error: bool = True) -> List[dict]:
+        """
+        Wait for every chunk and return the per-job reports
+        Args:
+            timeout (float, optional): Seconds to wait for each chunk
+            raise_on_error (bool): Raise a RuntimeError when any chunk failed
+        """
+        reports = [future.result(timeout=timeout) for future in self.futures]
+        failed = [report for report in reports if report['error']]
+        if failed and raise_on_error:
+            raise RuntimeError(f"{len(failed)}/{len(reports)} load jobs into {self.destination} failed: "
+                               f"{failed[0]['error']}")
+        return reports
+
+    def summary(self) -> dict:
+        """Totals over the chunks finished so far"""
+        reports = self.poll()
+        return {
+            'jobs': len(self.futures),
+            'finished': len(reports),
+            'failed': sum(1 for report in reports if report['error']),
+            'rows': sum(report['rows'] for report in reports),
+            'bytes': sum(report['bytes'] for report in reports),
+            'max_latency': max((report['latency'] for report in reports), default=0.0),
+        }
+
 
 class BigQueryConnector:
     
     def __init__(self, 
                  project_id: str, 
-                 credentials_path: str):
+                 credentials_path: str,
+                 client=None,
+                 metadata_ttl: float = 60.0):
         """
         Initialize BigQuery client with project ID and optional credentials path.
         
@@ -17,10 +83,22 @@ class BigQueryConnector:
             project_id (str): Google Cloud Project ID
             credentials_path (str, optional): Path to service account JSON file.
             If None, uses GOOGLE_APPLICATION_CREDENTIALS env var.
+            client (optional): Pre-built client, e.g. a FakeBigQueryClient for local runs.
+            Credentials are not checked when a client is given.
+            metadata_ttl (float): Seconds table metadata and freshness lookups are memoized
         """
         
         self.project_id = project_id
         self.logger = logging.getLogger(__name__)
+        self._load_executor = None
+        self._load_workers = 0
+        self.metadata_ttl = metadata_ttl
+        self._metadata_cache = MemoryCache(max_entries=256)
+        self._bqstorage = None
+
+        if client is not None:
+            self.client = client
+            return
         
         # checks with path to credential is valid
         if credentials_path is None:
@@ -110,37 +188,506 @@ class BigQueryConnector:
                 self.logger.warning("PyArrow not installed, using CSV format")
         
         try:
-            job = self.client.load_table_from_dataframe(
-                dataframe = df,
-                destination = destination, 
-                job_config = job_config)
-            job.result()
+            with BQ_JOB_SECONDS.time(kind='load'):
+                job = self.client.load_table_from_dataframe(
+                    dataframe = df,
+                    destination = destination, 
+                    job_config = job_config)
+                job.result()
+            BQ_ROWS_LOADED.inc(len(df))
+            self._invalidate_metadata(destination)
+            return job
 
         except GoogleAPIError as e:
             self.logger.error(f"Error loading dataframe to BigQuery Client: {e}")
+            raise
+
+    def _serialize_chunks(self, df: pd.DataFrame, max_chunk_bytes: int, max_chunk_rows: Optional[int]):
+        """
+        Split a DataFrame into size-bounded chunks serialized for a load job.
+        The frame is converted to Arrow once and sliced zero-copy into Parquet
+        files; without pyarrow each chunk is written as CSV instead.
+
+        Returns:
+            (source_format, list of (payload bytes, row count))
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.logger.warning("PyArrow not installed, using CSV format")
+            pa = None
+
+        if pa is not None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            bytes_per_row = max(1, table.nbytes // max(1, table.num_rows))
+        else:
+            bytes_per_row = max(1, int(df.memory_usage(index=False, deep=True).sum()) // max(1, len(df)))
+
+        rows_per_chunk = max(1, max_chunk_bytes // bytes_per_row)
+        if max_chunk_rows:
+            rows_per_chunk = min(rows_per_chunk, max_chunk_rows)
+
+        chunks = []
+        for offset in range(0, len(df), rows_per_chunk):
+            if pa is not None:
+                buffer = io.BytesIO()
+                # BigQuery TIMESTAMP/DATETIME hold microseconds, not the nanoseconds pandas uses
+                pq.write_table(table.slice(offset, rows_per_chunk), buffer, compression='snappy',
+                               coerce_timestamps='us', allow_truncated_timestamps=True)
+            else:
+                buffer = io.BytesIO(df.iloc[offset:offset + rows_per_chunk].to_csv(index=False).encode())
+            chunks.append((buffer.getvalue(), min(rows_per_chunk, len(df) - offset)))
+
+        source_format = bigquery.SourceFormat.PARQUET if pa is not None else bigquery.SourceFormat.CSV
+        return source_format, chunks
+
+    def _run_load_job(self, chunk_index: int, payload: bytes, rows: int, destination: str, job_config) -> dict:
+        """Upload one serialized chunk and wait for its load job on a worker thread"""
+        report = {'chunk': chunk_index, 'job_id': None, 'rows': rows, 'bytes': len(payload),
+                  'latency': 0.0, 'error': None}
+        start = time.perf_counter()
+        try:
+            job = self.client.load_table_from_file(io.BytesIO(payload), destination, job_config=job_config)
+            report['job_id'] = job.job_id
+            job.result()
+        except GoogleAPIError as e:
+            self.logger.error(f"Load job for chunk {chunk_index} into {destination} failed: {e}")
+            report['error'] = str(e)
+        report['latency'] = time.perf_counter() - start
+        BQ_JOB_SECONDS.observe(report['latency'], kind='load')
+        BQ_BYTES_LOADED.inc(len(payload))
+        if report['error'] is None:
+            BQ_ROWS_LOADED.inc(rows)
+        self._invalidate_metadata(destination)
+        self.logger.info(f"Chunk {chunk_index} -> {destination}: {rows} rows, {len(payload)} bytes "
+                         f"in {report['latency']:.2f}s")
+        return report
 
     # insert data in batches for efficiency
-    def batch_insert(self, df, destination, job_config=None):
-        pass 
+    def batch_insert(self,
+                     df: pd.DataFrame,
+                     destination: str,
+                     job_config=None,
+                     max_chunk_bytes: int = 256 * 2**20,
+                     max_chunk_rows: Optional[int] = None,
+                     max_workers: int = 4) -> BatchLoad:
+        """
+        Bulk load a DataFrame as concurrent, size-bounded load jobs
+        Args:
+            df (obj): Pandas DataFrame with stock data
+            destination (str): Table reference (e.g., raw_stock_price)
+            job_config (optional): LoadJobConfig object, source_format is set per chunk
+            max_chunk_bytes (int): Upper bound on in-memory bytes per chunk
+            max_chunk_rows (int, optional): Upper bound on rows per chunk
+            max_workers (int): Load jobs submitted concurrently
+
+        Returns:
+            BatchLoad handle, call result() to wait for the per-job reports
+        """
+        if df is None or df.empty:
+            self.logger.error("DataFrame is empty")
+            raise ValueError("Cannot load empty DataFrame")
+
+        if not destination:
+            self.logger.error("Missing destination table")
+            raise ValueError("Destination table required")
+
+        source_format, chunks = self._serialize_chunks(df, max_chunk_bytes, max_chunk_rows)
+
+        if job_config is None:
+            job_config = bigquery.LoadJobConfig()
+            job_config.write_disposition = 'WRITE_APPEND'
+        job_config.source_format = source_format
+        if source_format == bigquery.SourceFormat.CSV:
+            job_config.skip_leading_rows = 1
+
+        if self._load_executor is None or self._load_workers != max_workers:
+            if self._load_executor is not None:
+                # jobs already queued on the old pool still run to completion
+                self._load_executor.shutdown(wait=False)
+            self._load_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bq-load")
+            self._load_workers = max_workers
+
+        futures = [self._load_executor.submit(self._run_load_job, index, payload, rows, destination, job_config)
+                   for index, (payload, rows) in enumerate(chunks)]
+        self.logger.info(f"Submitted {len(futures)} load jobs for {len(df)} rows into {destination}")
+        return BatchLoad(futures, destination)
     
+    def _staging_table_for(self, destination: str, staging_dataset: Optional[str]) -> str:
+        """Unique staging table name so concurrent upserts never share one"""
+        parts = destination.split('.')
+        project = parts[0] if len(parts) == 3 else self.project_id
+        dataset = staging_dataset or parts[-2]
+        return f"{project}.{dataset}.{parts[-1]}_staging_{uuid.uuid4().hex[:8]}"
+
     # update existing records or insert new ones
-    def upsert_data(self):
-        pass  
+    def upsert_data(self,
+                    df: pd.DataFrame,
+                    destination: str,
+                    key_columns: Sequence[str] = ('symbol', 'date'),
+                    partition_column: str = 'date',
+                    staging_dataset: Optional[str] = 'stock_market_staging') -> dict:
+        """
+        Upsert a DataFrame: load it into a staging table, then MERGE it into the
+        target on the key columns. The ON clause bounds the target's partition
+        column to the batch's date range so BigQuery only scans the partitions
+        the batch touches (see sql/bigquery/setup/create_stock_price_tables.sql).
+        Args:
+            df (obj): Pandas DataFrame with stock data
+            destination (str): Target table, date-partitioned and clustered by symbol
+            key_columns (list): Columns identifying a row, (symbol, date) by default
+            partition_column (str): Date partitioning column of the target
+            staging_dataset (str, optional): Dataset for the staging table, None uses the target's
+
+        Returns:
+            dict with staged rows, inserted/updated rows and bytes processed/billed by the MERGE
+        """
+        if df is None or df.empty:
+            self.logger.error("DataFrame is empty")
+            raise ValueError("Cannot upsert empty DataFrame")
+
+        missing = [column for column in key_columns if column not in df.columns]
+        if missing:
+            raise ValueError(f"Key columns missing from DataFrame: {missing}")
+
+        # stage dates as DATE so the key matches the target's partition column type
+        staged = df.copy()
+        staged[partition_column] = pd.to_datetime(staged[partition_column]).dt.date
+        first_date = min(staged[partition_column])
+        last_date = max(staged[partition_column])
+
+        staging = self._staging_table_for(destination, staging_dataset)
+
+        columns = [f"`{column}`" for column in staged.columns]
+        # staging order, so the last row written for a duplicated key is the one merged
+        staged[LOAD_SEQ_COLUMN] = range(len(staged))
+        on_clause = " AND ".join(f"T.`{column}` = S.`{column}`" for column in key_columns)
+        update_clause = ", ".join(f"{column} = S.{column}" for column in columns
+                                  if column.strip('`') not in key_columns)
+        merge_sql = f"""
+            MERGE `{destination}` T
+            USING (
+                SELECT * FROM `{staging}`
+                WHERE TRUE
+                QUALIFY ROW_NUMBER() OVER (PARTITION BY {", ".join(f"`{c}`" for c in key_columns)}
+                                           ORDER BY `{LOAD_SEQ_COLUMN}` DESC) = 1
+            ) S
+            ON {on_clause}
+               AND T.`{partition_column}` BETWEEN DATE '{first_date}' AND DATE '{last_date}'
+            WHEN MATCHED THEN UPDATE SET {update_clause}
+            WHEN NOT MATCHED THEN INSERT ({", ".join(columns)}) VALUES ({", ".join(f"S.{c}" for c in columns)})
+        """
+
+        try:
+            self.batch_insert(staged, staging).result()
+            with BQ_JOB_SECONDS.time(kind='merge'):
+                job = self.client.query(merge_sql)
+                job.result()
+        except GoogleAPIError as e:
+            self.logger.error(f"Error merging {staging} into {destination}: {e}")
+            raise
+        finally:
+            self.client.delete_table(staging, not_found_ok=True)
+        self._invalidate_metadata(destination)
+
+        dml_stats = getattr(job, 'dml_stats', None)
+        result = {
+            'staged_rows': len(staged),
+            'inserted_rows': getattr(dml_stats, 'inserted_row_count', None),
+            'updated_rows': getattr(dml_stats, 'updated_row_count', None),
+            'bytes_processed': job.total_bytes_processed,
+            'bytes_billed': job.total_bytes_billed,
+        }
+        self.logger.info(f"Upserted {len(staged)} rows into {destination} "
+                         f"({first_date} to {last_date}): {result}")
+        return result
 
 # 3. Query Operations
 
-# execute_query() - run SQL queries
-# get_table_info() - check table schemas, row counts
-# check_data_freshness() - validate when data was last updated
+    def get_max_dates(self,
+                      table: str,
+                      symbols: Optional[List[str]] = None,
+                      date_column: str = "date") -> Dict[str, date]:
+        """
+        Latest loaded date per symbol, used as the incremental extraction watermark
+        Args:
+            table (str): Fully qualified table (project.dataset.table)
+            symbols (list, optional): Restrict the lookup to these symbols
+            date_column (str): Date column of the table
+
+        Returns:
+            dict of symbol -> date, symbols with no rows are absent
+        """
+        sql = (f"SELECT symbol, MAX(DATE({date_column})) AS last_date "
+               f"FROM `{table}`")
+        params = []
+        if symbols:
+            sql += " WHERE symbol IN UNNEST(@symbols)"
+            params.append(bigquery.ArrayQueryParameter("symbols", "STRING", symbols))
+        sql += " GROUP BY symbol"
+
+        try:
+            job = self.client.query(sql, job_config=bigquery.QueryJobConfig(query_parameters=params))
+            return {row.symbol: row.last_date for row in job.result()}
+        except exceptions.NotFound:
+            self.logger.warning(f"Table {table} not found, treating every symbol as never loaded")
+            return {}
+        except GoogleAPIError as e:
+            self.logger.error(f"Error reading watermarks from {table}: {e}")
+            raise
+
+    def get_tail(self, table: str, symbols: List[str], rows: int) -> pd.DataFrame:
+        """
+        The last `rows` rows of every symbol, the history trailing indicators
+        need before the newest rows
+        Args:
+            table (str): Fully qualified table (project.dataset.table)
+            symbols (list): Symbols to read
+            rows (int): Rows per symbol
+
+        Returns:
+            DataFrame of the table's rows sorted by symbol and date, empty when
+            the table does not exist
+        """
+        sql = (f"SELECT * FROM `{table}` WHERE symbol IN UNNEST(@symbols) "
+               f"QUALIFY ROW_NUMBER() OVER (PARTITION BY symbol ORDER BY date DESC) <= @rows")
+        params = [bigquery.ArrayQueryParameter("symbols", "STRING", list(symbols)),
+                  bigquery.ScalarQueryParameter("rows", "INT64", rows)]
+        try:
+            frames = list(self.execute_query(sql, params))
+        except exceptions.NotFound:
+            self.logger.warning(f"Table {table} not found, no history for {len(symbols)} symbols")
+            return pd.DataFrame()
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True).sort_values(['symbol', 'date'], kind='stable')
+
+    def _memoized(self, key: str, compute):
+        """Return a metadata lookup from the short-lived cache, computing it on a miss"""
+        value = self._metadata_cache.get(key)
+        if value is None:
+            value = compute()
+            self._metadata_cache.set(key, value, self.metadata_ttl)
+        return value
+
+    def _invalidate_metadata(self, table: str):
+        """Forget memoized lookups for a table after it was written to"""
+        for prefix in ('table_info', 'freshness', 'row_count'):
+            self._metadata_cache.delete_prefix(f"{prefix}:{table}:")
+        self._metadata_cache.delete_prefix("list_tables:")
+
+    def _bqstorage_client(self):
+        """BigQuery Storage read client for fast Arrow downloads, None when not installed"""
+        if self._bqstorage is None:
+            try:
+                from google.cloud import bigquery_storage
+                self._bqstorage = bigquery_storage.BigQueryReadClient(credentials=self.client._credentials)
+            except (ImportError, AttributeError):
+                self._bqstorage = False
+        return self._bqstorage or None
+
+    def execute_query(self,
+                      sql: str,
+                      params: Optional[list] = None,
+                      page_size: Optional[int] = None,
+                      as_arrow: bool = False) -> Iterator:
+        """
+        Run a SQL query and stream the result as Arrow record batches, so large
+        results are never materialized row by row or all at once
+        Args:
+            sql (str): Query text
+            params (list, optional): bigquery.ScalarQueryParameter/ArrayQueryParameter list
+            page_size (int, optional): Rows per page when the REST API is used
+            as_arrow (bool): Yield pyarrow.RecordBatch instead of DataFrames
+
+        Returns:
+            Iterator of DataFrames (or record batches), one per downloaded batch
+        """
+        try:
+            job = self.client.query(sql, job_config=bigquery.QueryJobConfig(query_parameters=params or []))
+            rows = job.result(page_size=page_size)
+        except GoogleAPIError as e:
+            self.logger.error(f"Error running query: {e}")
+            raise
+
+        self.logger.info(f"Query {job.job_id} finished, {job.total_bytes_processed} bytes processed")
+        for batch in rows.to_arrow_iterable(bqstorage_client=self._bqstorage_client()):
+            yield batch if as_arrow else batch.to_pandas()
+
+    def get_table_info(self, table: str) -> dict:
+        """
+        Table schema, size and layout, memoized for metadata_ttl seconds
+        Returns:
+            dict with table_id, num_rows, num_bytes, modified, schema, partitioning and clustering
+        """
+        def lookup():
+            try:
+                info = self.client.get_table(table)
+            except GoogleAPIError as e:
+                self.logger.error(f"Error reading metadata for {table}: {e}")
+                raise
+            partitioning = info.time_partitioning
+            return {
+                'table_id': info.full_table_id,
+                'num_rows': info.num_rows,
+                'num_bytes': info.num_bytes,
+                'modified': info.modified,
+                'schema': [(field.name, field.field_type, field.mode) for field in info.schema],
+                'partition_field': partitioning.field if partitioning else None,
+                'clustering_fields': info.clustering_fields,
+            }
+        return self._memoized(f"table_info:{table}:", lookup)
+
+    def check_data_freshness(self,
+                             table: str,
+                             date_column: str = "date",
+                             max_age_days: int = 1) -> dict:
+        """
+        Validate when data was last updated, memoized for metadata_ttl seconds
+        Args:
+            table (str): Fully qualified table
+            date_column (str): Column holding the trading date
+            max_age_days (int): Age in days beyond which the table counts as stale
+
+        Returns:
+            dict with last_date, age_days and is_fresh
+        """
+        def lookup():
+            sql = f"SELECT MAX(DATE({date_column})) AS last_date FROM `{table}`"
+            last_date = None
+            for frame in self.execute_query(sql):
+                if not frame.empty:
+                    last_date = frame['last_date'].iloc[0]
+            if last_date is None or pd.isna(last_date):
+                return {'last_date': None, 'age_days': None, 'is_fresh': False}
+            age = (datetime.now(timezone.utc).date() - last_date).days
+            return {'last_date': last_date, 'age_days': age, 'is_fresh': age <= max_age_days}
+        return self._memoized(f"freshness:{table}:{date_column}:{max_age_days}", lookup)
+
+    def get_row_count(self, table: str, exact: bool = False) -> int:
+        """
+        Verify data loaded correctly
+        Args:
+            table (str): Fully qualified table
+            exact (bool): Run COUNT(*) instead of reading table metadata. Metadata
+                is free but excludes rows still in the streaming buffer.
+        """
+        if not exact:
+            return self.get_table_info(table)['num_rows']
+
+        def lookup():
+            frames = list(self.execute_query(f"SELECT COUNT(*) AS row_count FROM `{table}`"))
+            return int(frames[0]['row_count'].iloc[0])
+        return self._memoized(f"row_count:{table}:exact", lookup)
 
 # 4. Table Management
 
-# truncate_table() - clear table data
-# drop_table() - delete tables
-# list_tables() - see what tables exist
+    def truncate_table(self, table: str):
+        """clear table data"""
+        try:
+            self.client.query(f"TRUNCATE TABLE `{table}`").result()
+        except GoogleAPIError as e:
+            self.logger.error(f"Error truncating {table}: {e}")
+            raise
+        self._invalidate_metadata(table)
+        self.logger.info(f"Truncated {table}")
+
+    def drop_table(self, table: str, not_found_ok: bool = True):
+        """delete tables"""
+        try:
+            self.client.delete_table(table, not_found_ok=not_found_ok)
+        except GoogleAPIError as e:
+            self.logger.error(f"Error dropping {table}: {e}")
+            raise
+        self._invalidate_metadata(table)
+        self.logger.info(f"Dropped {table}")
+
+    def list_tables(self, dataset_id: str) -> List[str]:
+        """see what tables exist, memoized for metadata_ttl seconds"""
+        def lookup():
+            try:
+                return [item.table_id for item in self.client.list_tables(dataset_id)]
+            except GoogleAPIError as e:
+                self.logger.error(f"Error listing tables in {dataset_id}: {e}")
+                raise
+        return self._memoized(f"list_tables:{dataset_id}:", lookup)
 
 # 5. Data Validation
 
-# validate_schema() - ensure data matches expected table structure
-# check_duplicates() - find duplicate records
-# get_row_count() - verify data loaded correctly
\ No newline at end of file
+    def validate_schema(self, df: pd.DataFrame, table: str) -> List[str]:
+        """
+        Ensure data matches expected table structure, before a load job finds out
+        Args:
+            df (pd.DataFrame): Frame about to be loaded
+            table (str): Fully qualified destination table
+
+        Returns:
+            List of problems, empty when the frame fits the table schema
+        """
+        kinds = {'STRING': 'string', 'DATE': 'datetime', 'DATETIME': 'datetime', 'TIMESTAMP': 'datetime',
+                 'FLOAT': 'float', 'FLOAT64': 'float', 'NUMERIC': 'float', 'BIGNUMERIC': 'float',
+                 'INTEGER': 'integer', 'INT64': 'integer', 'BOOLEAN': 'bool', 'BOOL': 'bool'}
+        checks = {'string': lambda s: (pd.api.types.is_string_dtype(s) or pd.api.types.is_object_dtype(s)
+                                       or isinstance(s.dtype, pd.CategoricalDtype)),
+                  'datetime': pd.api.types.is_datetime64_any_dtype,
+                  'float': pd.api.types.is_numeric_dtype,
+                  'integer': pd.api.types.is_integer_dtype,
+                  'bool': pd.api.types.is_bool_dtype}
+
+        problems = []
+        schema = self.get_table_info(table)['schema']
+        table_columns = {name for name, _, _ in schema}
+        for name, field_type, mode in schema:
+            if name not in df.columns:
+                if mode == 'REQUIRED':
+                    problems.append(f"missing required column {name}")
+                continue
+            kind = kinds.get(field_type)
+            if kind is not None and not checks[kind](df[name]):
+                problems.append(f"column {name} is {df[name].dtype}, table expects {field_type}")
+            if mode == 'REQUIRED' and df[name].isna().any():
+                problems.append(f"column {name} is REQUIRED but has nulls")
+        for name in df.columns:
+            if name not in table_columns:
+                problems.append(f"column {name} is not in {table}")
+
+        if problems:
+            self.logger.warning(f"Frame does not match {table}: {problems}")
+        return problems
+
+    def check_duplicates(self,
+                         table: str,
+                         key_columns: Sequence[str] = ('symbol', 'date'),
+                         start_date=None,
+                         end_date=None,
+                         date_column: str = 'date') -> int:
+        """
+        Find duplicate records already in a table. New batches are deduplicated
+        by ETLProcessor.validate before load, this audits what is stored.
+        Args:
+            table (str): Fully qualified table
+            key_columns: Columns that identify a row
+            start_date, end_date (optional): Restrict the scan to these partitions
+
+        Returns:
+            Number of keys present more than once
+        """
+        keys = ', '.join(key_columns)
+        conditions = []
+        params = []
+        if start_date is not None:
+            conditions.append(f"{date_column} >= @start_date")
+            params.append(bigquery.ScalarQueryParameter('start_date', 'DATE', start_date))
+        if end_date is not None:
+            conditions.append(f"{date_column} <= @end_date")
+            params.append(bigquery.ScalarQueryParameter('end_date', 'DATE', end_date))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = (f"SELECT COUNT(*) AS duplicate_keys FROM ("
+               f" SELECT {keys} FROM `{table}` {where} GROUP BY {keys} HAVING COUNT(*) > 1)")
+
+        frames = list(self.execute_query(sql, params=params or None))
+        duplicates = int(frames[0]['duplicate_keys'].iloc[0]) if frames and not frames[0].empty else 0
+        if duplicates:
+            self.logger.warning(f"{table} has {duplicates} duplicated ({keys}) keys")
+        return duplicates
@@ -0,0 +1,3 @@
+from src.cache.backends import CacheBackend, MemoryCache, SQLiteCache
+from src.cache.redis_cache import RedisCache
+from src.cache.response_cache import ResponseCache, cached, market_aware_ttl
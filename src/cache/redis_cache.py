@@ -0,0 +1,48 @@
+
+from src.cache.backends import CacheBackend
+
+class RedisCache(CacheBackend):
+    def __init__(self,
+                 url: str = "redis://localhost:6379/0",
+                 prefix: str = "fdp:",
+                 client=None):
+        """
+        Shared cache backed by Redis, expiry and eviction are left to the server
+        Args:
+            url (str): Redis connection URL
+            prefix (str): Namespace prepended to every key
+            client (optional): Pre-built redis.Redis client, e.g. a fakeredis instance for local runs
+        """
+        super().__init__()
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def _get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def _set(self, key, value, ttl):
+        # Redis expiry is whole seconds, round up so short TTLs don't become "no expiry"
+        ex = max(1, int(ttl + 0.999)) if ttl is not None else None
+        self.client.set(self.prefix + key, value, ex=ex)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        # evictions and expirations happen server side under maxmemory-policy / EXPIRE
+        try:
+            info = self.client.info("stats")
+            stats['evictions'] = int(info.get('evicted_keys', 0))
+            stats['expirations'] = int(info.get('expired_keys', 0))
+        except Exception as e:
+            self.logger.warning(f"Could not read Redis eviction stats: {e}")
+        return stats
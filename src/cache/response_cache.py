@@ -0,0 +1,123 @@
+import functools
+import json
+import logging
+from datetime import datetime, time as dt_time, timedelta
+from typing import Callable, Optional
+from zoneinfo import ZoneInfo
+
+from src.cache.backends import CacheBackend, MemoryCache
+from src.columnar import json_default
+from src.metrics import get_registry
+
+CACHE_REQUESTS = get_registry().counter(
+    'cache_requests_total', 'Connector response cache lookups', ('endpoint', 'result'))
+
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_OPEN = dt_time(9, 30)
+MARKET_CLOSE = dt_time(16, 0)
+
+def market_aware_ttl(now: Optional[datetime] = None,
+                     intraday_ttl: float = 900,
+                     settle_minutes: int = 60) -> float:
+    """
+    TTL for end-of-day price responses based on the NYSE session
+    Args:
+        now (datetime, optional): Current time, defaults to the wall clock
+        intraday_ttl (float): Seconds to cache while the market is open or the
+            closing bar is still settling
+        settle_minutes (int): Minutes after the close during which EOD bars may still change
+
+    Returns:
+        Seconds until the cached response may be stale. Outside the session this
+        is the time until the next weekday open (exchange holidays are not modelled).
+    """
+    now = (now or datetime.now(MARKET_TZ)).astimezone(MARKET_TZ)
+    session_end = (datetime.combine(now.date(), MARKET_CLOSE, MARKET_TZ)
+                   + timedelta(minutes=settle_minutes)).time()
+
+    if now.weekday() < 5 and MARKET_OPEN <= now.time() < session_end:
+        return intraday_ttl
+
+    next_open = datetime.combine(now.date(), MARKET_OPEN, MARKET_TZ)
+    if now >= next_open:
+        next_open += timedelta(days=1)
+    while next_open.weekday() >= 5:
+        next_open += timedelta(days=1)
+    return max(intraday_ttl, (next_open - now).total_seconds())
+
+
+class ResponseCache:
+    def __init__(self,
+                 backend: Optional[CacheBackend] = None,
+                 ttl: Optional[Callable[[], float]] = None,
+                 namespace: str = "v1"):
+        """
+        JSON response cache placed in front of the API connectors
+        Args:
+            backend (CacheBackend, optional): Storage, defaults to an in-process MemoryCache
+            ttl (callable, optional): Returns the TTL in seconds for a new entry,
+                defaults to market_aware_ttl
+            namespace (str): Key prefix, bump it to invalidate entries written by older code
+        """
+        self.backend = backend if backend is not None else MemoryCache()
+        self.ttl = ttl or market_aware_ttl
+        self.namespace = namespace
+        self.logger = logging.getLogger(__name__)
+
+    def make_key(self, endpoint: str, symbol: str, params: Optional[dict] = None) -> str:
+        """Key on endpoint + symbol + date range parameters, API keys never included"""
+        range_part = json.dumps(params or {}, sort_keys=True, separators=(",", ":"))
+        return f"{self.namespace}:{endpoint}:{symbol}:{range_part}"
+
+    def get(self, key: str, decode: Optional[Callable] = None):
+        """Cached payload, decoded with `decode(raw_bytes)` when given, json.loads otherwise"""
+        raw = self.backend.get(key)
+        if raw is None:
+            return None
+        try:
+            return decode(raw) if decode is not None else json.loads(raw)
+        except ValueError:
+            self.logger.warning(f"Dropping undecodable cache entry {key}")
+            self.backend.delete(key)
+            return None
+
+    def set(self, key: str, data):
+        self.backend.set(key, json.dumps(data, separators=(",", ":"), default=json_default).encode(), self.ttl())
+
+    def stats(self) -> dict:
+        return self.backend.stats()
+
+
+def cached(endpoint: str, cacheable: Optional[Callable] = None, decode: Optional[Callable] = None):
+    """
+    Cache a connector fetch method through the instance's `cache` attribute.
+    The wrapped method is called as method(symbol, params=None) and is passed
+    straight through when the instance has no cache. None results, and results
+    rejected by `cacheable`, are never stored.
+    Args:
+        endpoint (str): Endpoint name used in the cache key
+        cacheable (callable, optional): Predicate deciding whether a payload may be stored
+        decode (callable, optional): Turns a stored JSON body back into the payload
+            the method returns, when that is not what json.loads gives
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, symbol, params: Optional[dict] = None):
+            cache = getattr(self, 'cache', None)
+            if cache is None:
+                return func(self, symbol, params)
+
+            key = cache.make_key(endpoint, symbol, params)
+            data = cache.get(key, decode)
+            if data is not None:
+                CACHE_REQUESTS.inc(endpoint=endpoint, result='hit')
+                self.logger.debug(f"Cache hit for {symbol} ({endpoint})")
+                return data
+            CACHE_REQUESTS.inc(endpoint=endpoint, result='miss')
+
+            data = func(self, symbol, params)
+            if data is not None and (cacheable is None or cacheable(data)):
+                cache.set(key, data)
+            return data
+        return wrapper
+    return decorator
@@ -0,0 +1,468 @@
+"""
+Command line entry point of the pipeline
+
+    python -m src.cli run [--tickers AAPL,MSFT | --tickers tickers.csv] [--incremental] [--workers 4]
+                          [--metrics-out run.json] [--trace]
+    python -m src.cli backfill [--tickers ...] [--new-only]
+    python -m src.cli status [--run-id RUN]
+    python -m src.cli validate-config
+    python -m src.cli dry-run [--incremental] [--workers 4]
+
+Only the standard library is imported here. pandas, BigQuery and the HTTP
+stack are imported inside the commands that use them, and .env is read when
+a command runs, so `--help`, `status`, `validate-config` and `dry-run` start
+in a few tens of milliseconds and importing this module does no I/O.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TABLE = "stock_market_data.stock_price_daily"
+STATE_DIR = ".state"
+
+# environment variables read by the pipeline, (name, required, description)
+ENV_VARS = (
+    ('FMP_API_URL', True, 'Financial Modeling Prep API base url'),
+    ('FMP_API_KEY', False, 'FMP API key, or FMP_API_KEYS'),
+    ('FMP_API_KEYS', False, 'Comma separated FMP API keys, one quota each'),
+    ('ALPHA_API_URL', False, 'Alpha Vantage API base url'),
+    ('ALPHA_API_KEY', False, 'Alpha Vantage API key'),
+    ('PROJECT_ID', False, 'BigQuery project, required by the bigquery sink'),
+    ('BIG_QUERY_CREDENTIALS', False, 'Service account JSON key file'),
+    ('DATA_TABLE', False, 'Destination table'),
+    ('ETL_WORKERS', False, 'Worker processes, more than 1 runs sharded'),
+    ('TICKER_CSV', False, 'CSV with a Ticker column, instead of the S&P 500 universe'),
+    ('METRICS_OUT', False, 'Run report path for run and backfill, like --metrics-out'),
+    ('ETL_TRACE', False, 'Set to 1 to record spans in the run report, like --trace'),
+)
+
+def _env_int(name: str, default: int) -> Optional[int]:
+    """Integer setting from the environment, None when it is not a number so check_config can report it"""
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return None
+
+def load_config() -> dict:
+    """Pipeline settings from the environment, .env is read by main beforehand"""
+    fmp_api_key = os.getenv("FMP_API_KEY")
+    return {'fmp_api_url': os.getenv("FMP_API_URL"),
+            'fmp_api_key': fmp_api_key,
+            'fmp_api_keys': [key for key in os.getenv("FMP_API_KEYS", fmp_api_key or "").split(",") if key],
+            'alpha_api_url': os.getenv("ALPHA_API_URL"),
+            'alpha_api_key': os.getenv("ALPHA_API_KEY"),
+            'project_id': os.getenv("PROJECT_ID"),
+            'credentials_path': os.getenv("BIG_QUERY_CREDENTIALS"),
+            'data_table': os.getenv("DATA_TABLE", DEFAULT_TABLE),
+            'etl_workers': _env_int("ETL_WORKERS", 1),
+            'ticker_csv': os.getenv("TICKER_CSV")}
+
+def check_config(config: dict, sink: str = 'bigquery', route: bool = False) -> List[str]:
+    """
+    Problems with the configuration, checked without any network call. route
+    checks that Alpha Vantage is configured for provider routing
+    Returns:
+        One message per problem, empty when the configuration is usable
+    """
+    problems = []
+    if not config['fmp_api_url']:
+        problems.append("FMP_API_URL is not set")
+    if not config['fmp_api_keys']:
+        problems.append("Neither FMP_API_KEY nor FMP_API_KEYS is set")
+    if bool(config['alpha_api_url']) != bool(config['alpha_api_key']):
+        problems.append("ALPHA_API_URL and ALPHA_API_KEY must be set together")
+    elif route and not config['alpha_api_url']:
+        problems.append("--route needs ALPHA_API_URL and ALPHA_API_KEY")
+
+    if sink == 'bigquery':
+        if not config['project_id']:
+            problems.append("PROJECT_ID is not set")
+        credentials_path = config['credentials_path']
+        if credentials_path:
+            try:
+                with open(credentials_path) as f:
+                    credentials = json.load(f)
+                if credentials.get('type') != 'service_account':
+                    problems.append(f"{credentials_path} is not a service account key")
+            except OSError as e:
+                problems.append(f"BIG_QUERY_CREDENTIALS cannot be read: {e}")
+            except ValueError:
+                problems.append(f"{credentials_path} is not valid JSON")
+
+    if config['ticker_csv'] and not os.path.isfile(config['ticker_csv']):
+        problems.append(f"TICKER_CSV {config['ticker_csv']} does not exist")
+    if config['etl_workers'] is None:
+        problems.append(f"ETL_WORKERS must be a whole number, got {os.getenv('ETL_WORKERS')!r}")
+    elif config['etl_workers'] < 1:
+        problems.append("ETL_WORKERS must be at least 1")
+    return problems
+
+def read_ticker_csv(path: str) -> List[str]:
+    """Tickers from the Ticker column of a CSV file"""
+    with open(path, newline='') as f:
+        reader = csv.DictReader(f)
+        if 'Ticker' not in (reader.fieldnames or []):
+            raise ValueError(f"{path} has no Ticker column")
+        return [row['Ticker'].strip() for row in reader if row['Ticker'].strip()]
+
+def resolve_tickers(value: Optional[str], config: dict, refresh: bool = True) -> Tuple[List[str], List[str]]:
+    """
+    Tickers for a command: --tickers as a comma separated list or a CSV path,
+    then TICKER_CSV, then the S&P 500 universe
+    Args:
+        value: The --tickers argument
+        config: Settings from load_config
+        refresh: Refresh the universe page; when False the tickers stored by the
+            last refresh are used and nothing is fetched
+
+    Returns:
+        (ticker_list, new_tickers): new_tickers are the constituents added by this or
+        an earlier refresh whose history backfill has not succeeded yet, see
+        _mark_backfilled
+    """
+    if value:
+        if os.path.isfile(value):
+            return read_ticker_csv(value), []
+        return [ticker.strip().upper() for ticker in value.split(',') if ticker.strip()], []
+    if config['ticker_csv']:
+        return read_ticker_csv(config['ticker_csv']), []
+
+    universe_path = os.path.join(STATE_DIR, "universe.json")
+    if not refresh:
+        try:
+            with open(universe_path) as f:
+                return json.load(f).get('tickers', []), []
+        except (OSError, ValueError):
+            return [], []
+
+    from src.ticker_universe import TickerUniverse
+    universe = TickerUniverse(state_path=universe_path)
+    universe.refresh()
+    return universe.tickers, universe.pending
+
+def _mark_backfilled(new_tickers: List[str]):
+    """Take new constituents off the universe's pending list after their backfill loaded"""
+    if not new_tickers:
+        return
+    from src.ticker_universe import TickerUniverse
+
+    TickerUniverse(state_path=os.path.join(STATE_DIR, "universe.json")).mark_loaded(new_tickers)
+
+def _logging_options(args) -> dict:
+    """configure_logging arguments, the same in this process and in sharded workers"""
+    return {'level': args.log_level, 'json_format': args.log_format == 'json', 'log_file': args.log_file}
+
+def _scheduler_config(config: dict, args) -> dict:
+    """Settings every sharded worker builds its processor from, see scheduler.build_processor"""
+    worker_config = {'fmp_api_url': config['fmp_api_url'],
+                     'fmp_api_keys': config['fmp_api_keys'],
+                     'alpha_api_url': config['alpha_api_url'],
+                     'alpha_api_key': config['alpha_api_key'],
+                     'project_id': config['project_id'],
+                     'credentials_path': config['credentials_path']}
+    if args.sink == 'parquet':
+        worker_config.update(sink='parquet', lake_root=args.lake_root)
+    if args.route:
+        worker_config['route_providers'] = True
+    worker_config['logging'] = _logging_options(args)
+    if getattr(args, 'metrics_out', None) or getattr(args, 'trace', False):
+        worker_config['metrics'] = {'path': args.metrics_out, 'trace': args.trace}
+    return worker_config
+
+def _build_processor(config: dict, args):
+    """Single-process ETLProcessor with a run journal, so an interrupted run can be resumed"""
+    from src.run_journal import RunJournal
+    from src.scheduler import build_processor
+
+    processor = build_processor(_scheduler_config(config, args))
+    processor.journal = RunJournal(os.path.join(STATE_DIR, "runs.sqlite"),
+                                   os.path.join(STATE_DIR, "payloads"))
+    return processor
+
+def _run_sharded(config: dict, args, tickers: List[str], data_type: str, run_id: Optional[str] = None,
+                 ranges: Optional[dict] = None, watermarks: Optional[str] = None) -> int:
+    """
+    Run through the scheduler, one shard per worker and one API key per shard.
+    ranges and watermarks make it an incremental run, see Scheduler.submit
+    Returns:
+        0 when every task of the run finished
+    """
+    from src.scheduler import Scheduler
+
+    scheduler = Scheduler(os.path.join(STATE_DIR, "queue.sqlite"), os.path.join(STATE_DIR, "work"))
+    run_id = scheduler.submit(tickers, args.table, data_type, shards=args.shards or args.workers,
+                              key_count=len(config['fmp_api_keys']), run_id=run_id, upsert=True,
+                              max_workers=args.threads, ranges=ranges, watermarks=watermarks)
+    status = scheduler.run(run_id, _scheduler_config(config, args), workers=args.workers)
+    print(json.dumps({'run_id': run_id, 'status': status}, indent=2))
+    # pending or running tasks left behind (workers died) fail the run as much as failed ones
+    unfinished = any(count for counts in status.values() for state, count in counts.items() if state != 'done')
+    return 1 if unfinished else 0
+
+def _with_run_report(args, config: dict) -> int:
+    """Run a command with span tracing per --trace, writing the metrics report to --metrics-out at the end"""
+    from src.metrics import get_registry
+
+    registry = get_registry()
+    registry.tracing = args.trace
+    try:
+        return args.func(args, config)
+    finally:
+        if args.metrics_out:
+            registry.write(args.metrics_out)
+            logger.info(f"Run report written to {args.metrics_out}")
+
+def _exit_code(stats: dict) -> int:
+    """0 when every batch loaded and a journaled run finished complete"""
+    failed = stats.get('failed_batches', 0) or stats.get('run_status', 'complete') != 'complete'
+    return 1 if failed else 0
+
+# 1. Commands
+def cmd_run(args, config: dict) -> int:
+    """Daily run: new constituents get five years of history, every ticker gets its latest data"""
+    problems = check_config(config, args.sink, args.route)
+    if problems:
+        for problem in problems:
+            logger.error(problem)
+        return 2
+
+    tickers, new_tickers = resolve_tickers(args.tickers, config)
+    if not tickers:
+        logger.error("No tickers to run")
+        return 2
+
+    if args.workers > 1 and args.incremental:
+        from src.watermark_store import WatermarkStore, plan_ranges
+        watermark_path = os.path.join(STATE_DIR, "watermarks.sqlite")
+        watermarks = WatermarkStore(watermark_path)
+        try:
+            ranges = plan_ranges(tickers, watermarks.get(tickers))
+        finally:
+            watermarks.close()
+        if not ranges:
+            logger.info(f"All {len(tickers)} tickers are up to date")
+            return 0
+        rc = _run_sharded(config, args, list(ranges), 'historical', run_id=args.run_id,
+                          ranges=ranges, watermarks=watermark_path)
+        if rc == 0:
+            _mark_backfilled(new_tickers)
+        return rc
+    # new constituents get five years of history, which covers the yearly window too
+    backfilled = set(new_tickers)
+    yearly = [ticker for ticker in tickers if ticker not in backfilled]
+    if args.workers > 1:
+        rc = 0
+        if new_tickers:
+            rc = _run_sharded(config, args, new_tickers, 'five_year')
+            if rc == 0:
+                _mark_backfilled(new_tickers)
+        if yearly:
+            rc = max(rc, _run_sharded(config, args, yearly, 'yearly', run_id=args.run_id))
+        return rc
+
+    processor = _build_processor(config, args)
+    if args.incremental:
+        from src.watermark_store import WatermarkStore
+        # the watermarks give never loaded tickers their full lookback, no separate backfill
+        stats = processor.run_streaming(tickers, args.table, max_workers=args.threads, run_id=args.run_id,
+                                        watermarks=WatermarkStore(os.path.join(STATE_DIR, "watermarks.sqlite")))
+        print(json.dumps(stats, indent=2, default=str))
+        if _exit_code(stats) == 0:
+            _mark_backfilled(new_tickers)
+        return _exit_code(stats)
+
+    rc = 0
+    if new_tickers:
+        backfill = processor.run_streaming(new_tickers, args.table, 'five_year', max_workers=args.threads,
+                                           upsert=True)
+        print(json.dumps({'new_tickers': backfill}, indent=2, default=str))
+        rc = _exit_code(backfill)
+        if rc == 0:
+            _mark_backfilled(new_tickers)
+    if yearly:
+        stats = processor.run_streaming(yearly, args.table, 'yearly', max_workers=args.threads,
+                                        run_id=args.run_id, upsert=True)
+        print(json.dumps(stats, indent=2, default=str))
+        rc = max(rc, _exit_code(stats))
+    return rc
+
+def cmd_backfill(args, config: dict) -> int:
+    """Load five years of history, upserting over any dates already loaded"""
+    problems = check_config(config, args.sink, args.route)
+    if problems:
+        for problem in problems:
+            logger.error(problem)
+        return 2
+
+    tickers, new_tickers = resolve_tickers(args.tickers, config, refresh=args.new_only or not args.tickers)
+    if args.new_only:
+        tickers = new_tickers
+    if not tickers:
+        logger.info("No tickers to backfill")
+        return 0
+
+    if args.workers > 1:
+        rc = _run_sharded(config, args, tickers, args.data_type, run_id=args.run_id)
+    else:
+        processor = _build_processor(config, args)
+        stats = processor.run_streaming(tickers, args.table, args.data_type, max_workers=args.threads,
+                                        run_id=args.run_id, upsert=True)
+        print(json.dumps(stats, indent=2, default=str))
+        rc = _exit_code(stats)
+    # a yearly load is not the history backfill the pending constituents are waiting for
+    if rc == 0 and args.data_type != 'yearly':
+        loaded = set(tickers)
+        _mark_backfilled([ticker for ticker in new_tickers if ticker in loaded])
+    return rc
+
+def cmd_status(args, config: dict) -> int:
+    """Journaled runs and sharded run progress, read from the local state files only"""
+    from src.run_journal import RunJournal
+
+    journal_path = os.path.join(STATE_DIR, "runs.sqlite")
+    queue_path = os.path.join(STATE_DIR, "queue.sqlite")
+    report = {}
+    if os.path.exists(journal_path):
+        journal = RunJournal(journal_path, os.path.join(STATE_DIR, "payloads"))
+        if args.run_id:
+            report['journal'] = journal.status(args.run_id)
+        else:
+            report['runs'] = journal.runs(args.limit)
+        journal.close()
+    if args.run_id and os.path.exists(queue_path):
+        from src.scheduler import WorkQueue
+        queue = WorkQueue(queue_path)
+        report['queue'] = queue.status(args.run_id)
+        queue.close()
+    if not report:
+        print("No runs recorded yet")
+        return 0
+    print(json.dumps(report, indent=2))
+    return 0
+
+def cmd_validate_config(args, config: dict) -> int:
+    """Report every environment variable and the problems found, exit 1 when there are any"""
+    for name, required, description in ENV_VARS:
+        state = 'set' if os.getenv(name) else ('MISSING' if required else 'unset')
+        print(f"{name:<22} {state:<8} {description}")
+    print(f"{'FMP keys':<22} {len(config['fmp_api_keys'])}")
+
+    problems = check_config(config, args.sink)
+    for problem in problems:
+        print(f"error: {problem}")
+    if not problems:
+        print("Configuration OK")
+    return 1 if problems else 0
+
+def cmd_dry_run(args, config: dict) -> int:
+    """What a run would do, without calling any API or loading anything"""
+    from src.scheduler import shard_tickers
+
+    tickers, _ = resolve_tickers(args.tickers, config, refresh=False)
+    plan = {'table': args.table,
+            'sink': args.sink,
+            'tickers': len(tickers),
+            'sample': tickers[:10],
+            'config_problems': check_config(config, args.sink, args.route)}
+    if not tickers:
+        plan['note'] = "no tickers: pass --tickers, set TICKER_CSV or refresh the universe with `run`"
+
+    if args.workers > 1 and tickers:
+        key_count = max(1, len(config['fmp_api_keys']))
+        plan['shards'] = [{'shard': i, 'tickers': len(shard), 'key_index': i % key_count}
+                          for i, shard in enumerate(shard_tickers(tickers, args.shards or args.workers))]
+
+    if args.incremental and tickers:
+        from src.watermark_store import WatermarkStore, plan_ranges
+        watermark_path = os.path.join(STATE_DIR, "watermarks.sqlite")
+        # opening the store would create it, a dry run leaves no state behind
+        marks = WatermarkStore(watermark_path).get(tickers) if os.path.exists(watermark_path) else {}
+        ranges = plan_ranges(tickers, marks)
+        plan['incremental'] = {'to_fetch': len(ranges),
+                               'never_loaded': sum(1 for ticker in ranges if ticker not in marks),
+                               'up_to_date': len(tickers) - len(ranges)}
+    print(json.dumps(plan, indent=2, default=str))
+    return 0
+
+# 2. Argument parsing
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="Financial data ETL pipeline")
+    parser.add_argument('--log-level', default='INFO', help="Logging level, default INFO")
+    parser.add_argument('--log-format', choices=('json', 'text'), default=os.getenv("LOG_FORMAT", "json"),
+                        help="One JSON object per line (default) or plain text")
+    parser.add_argument('--log-file', default=os.getenv("LOG_FILE"), help="Also append log records to this file")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def pipeline_options(command):
+        command.add_argument('--tickers', help="Comma separated tickers or a CSV with a Ticker column")
+        command.add_argument('--table', default=os.getenv("DATA_TABLE", DEFAULT_TABLE), help="Destination table")
+        command.add_argument('--sink', choices=('bigquery', 'parquet'), default='bigquery')
+        command.add_argument('--lake-root', default='data/lake', help="Parquet lake root for --sink parquet")
+        command.add_argument('--workers', type=int,
+                             help="Worker processes, more than 1 runs sharded through the scheduler "
+                                  "(default ETL_WORKERS or 1)")
+        command.add_argument('--shards', type=int, help="Shards of a sharded run, defaults to --workers")
+        command.add_argument('--threads', type=int, default=4, help="Fetch threads per process")
+        command.add_argument('--run-id', help="Run to resume")
+        command.add_argument('--route', action='store_true',
+                             help="Spread fetches over FMP and Alpha Vantage, failing over per ticker")
+
+    def report_options(command):
+        command.add_argument('--metrics-out', default=os.getenv("METRICS_OUT"),
+                             help="Write the run's metrics report here: JSON, or Prometheus text for a .prom "
+                                  "file. Sharded workers each write their own, suffixed with the worker name")
+        command.add_argument('--trace', action='store_true', default=os.getenv("ETL_TRACE") == "1",
+                             help="Record a span per ticker and stage in the report")
+
+    run = commands.add_parser('run', help="Daily extract, transform, validate and load")
+    pipeline_options(run)
+    report_options(run)
+    run.add_argument('--incremental', action='store_true', help="Fetch only dates after each ticker's watermark")
+    run.set_defaults(func=cmd_run)
+
+    backfill = commands.add_parser('backfill', help="Load history, upserting over loaded dates")
+    pipeline_options(backfill)
+    report_options(backfill)
+    backfill.add_argument('--data-type', choices=('yearly', 'five_year', 'historical'), default='five_year')
+    backfill.add_argument('--new-only', action='store_true', help="Only constituents added since the last refresh")
+    backfill.set_defaults(func=cmd_backfill)
+
+    status = commands.add_parser('status', help="Show recorded runs, or one run's progress")
+    status.add_argument('--run-id', help="Run to show")
+    status.add_argument('--limit', type=int, default=20, help="Runs listed without --run-id")
+    status.set_defaults(func=cmd_status)
+
+    validate_config = commands.add_parser('validate-config', help="Check the environment without network calls")
+    validate_config.add_argument('--sink', choices=('bigquery', 'parquet'), default='bigquery')
+    validate_config.set_defaults(func=cmd_validate_config)
+
+    dry_run = commands.add_parser('dry-run', help="Show the tickers and plan of a run without running it")
+    pipeline_options(dry_run)
+    dry_run.add_argument('--incremental', action='store_true', help="Include the incremental fetch plan")
+    dry_run.set_defaults(func=cmd_dry_run)
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from dotenv import load_dotenv
+
+    from src.log_config import configure_logging
+
+    load_dotenv()
+    args = build_parser().parse_args(argv)
+    configure_logging(**_logging_options(args))
+    config = load_config()
+    if hasattr(args, 'workers') and args.workers is None:
+        # an invalid ETL_WORKERS is reported by check_config, run single-process meanwhile
+        args.workers = config['etl_workers'] or 1
+    if hasattr(args, 'metrics_out'):
+        return _with_run_report(args, config)
+    return args.func(args, config)
+
+if __name__ == "__main__":
+    sys.exit(main())
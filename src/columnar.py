@@ -0,0 +1,186 @@
+import io
+import json
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # optional, the standard library parser is used without it
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# set on the first pyarrow import failure, the Python decoder is used from then on
+_arrow_missing = False
+
+class ColumnarBatch:
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        """
+        Daily price rows held as one NumPy array per field, the form API payloads
+        are decoded into so no per-row dicts are built between fetch and transform
+        Args:
+            columns: field -> array, all of the same length. Numeric fields are
+                int64/float64, dates datetime64[ns] or strings, the rest object arrays
+        """
+        self.columns = columns
+
+    def __len__(self) -> int:
+        for values in self.columns.values():
+            return len(values)
+        return 0
+
+    @property
+    def nbytes(self) -> int:
+        """Memory of the arrays, object arrays count their pointers only"""
+        return sum(values.nbytes for values in self.columns.values())
+
+    @classmethod
+    def from_records(cls, records: list) -> "ColumnarBatch":
+        """
+        Build columns from daily records. Numeric fields are streamed straight
+        into preallocated typed arrays; a field with a missing or non-numeric
+        value falls back to an object array for transform to coerce.
+        """
+        n = len(records)
+        if n == 0:
+            return cls({})
+        columns = {}
+        for column, first in records[0].items():
+            if isinstance(first, (int, float)) and not isinstance(first, bool):
+                dtype = 'int64' if column == 'volume' else 'float64'
+                try:
+                    columns[column] = np.fromiter((r[column] for r in records), dtype=dtype, count=n)
+                    continue
+                except (KeyError, TypeError, ValueError):
+                    pass
+            values = np.empty(n, dtype=object)
+            values[:] = [r.get(column) for r in records]
+            columns[column] = values
+        return cls(columns)
+
+    @classmethod
+    def concat(cls, batches: List["ColumnarBatch"]) -> "ColumnarBatch":
+        """
+        One batch from many, fields absent from a batch are filled with NaN (or
+        None for object fields) and mismatched dtypes are widened by NumPy
+        """
+        batches = [batch for batch in batches if len(batch)]
+        if len(batches) == 1:
+            return batches[0]
+        names = list(dict.fromkeys(name for batch in batches for name in batch.columns))
+        columns = {}
+        for name in names:
+            parts = []
+            for batch in batches:
+                values = batch.columns.get(name)
+                if values is None:
+                    values = np.full(len(batch), np.nan) if name not in ('symbol', 'date') \
+                        else np.full(len(batch), None, dtype=object)
+                parts.append(values)
+            if len({part.dtype.kind for part in parts}) > 1 and any(part.dtype.kind in 'OMU' for part in parts):
+                # strings next to datetimes or numbers, let transform coerce them
+                parts = [part.astype(object) for part in parts]
+            columns[name] = np.concatenate(parts)
+        return cls(columns)
+
+    def to_frame(self):
+        """pandas DataFrame over the arrays, without copying numeric columns"""
+        import pandas as pd
+
+        return pd.DataFrame(self.columns, copy=False)
+
+    def to_records(self) -> List[dict]:
+        """Daily records, as the JSON endpoints return them"""
+        columns = {}
+        for name, values in self.columns.items():
+            if values.dtype.kind == 'M':
+                values = np.datetime_as_string(values, unit='D').astype(object)
+            columns[name] = values.tolist()
+        names = list(columns)
+        return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+    def __repr__(self):
+        return f"ColumnarBatch({len(self)} rows, {list(self.columns)})"
+
+
+def _decode_arrow(body: bytes) -> Optional[ColumnarBatch]:
+    """
+    Parse a JSON array of flat objects with pyarrow's JSON reader. The reader
+    takes newline-delimited objects, so the array is wrapped in one object and
+    its list column flattened. Returns None when pyarrow is missing or cannot
+    infer one type per field.
+    """
+    global _arrow_missing
+    if _arrow_missing:
+        return None
+    try:
+        import pyarrow as pa
+        import pyarrow.json as pa_json
+    except ImportError:
+        _arrow_missing = True
+        logger.info("pyarrow is not installed, decoding price payloads in Python")
+        return None
+
+    wrapped = b'{"rows":' + body + b'}'
+    try:
+        # one block for the whole body, parsing runs without the GIL
+        table = pa_json.read_json(io.BytesIO(wrapped),
+                                  read_options=pa_json.ReadOptions(block_size=len(wrapped) + 64,
+                                                                   use_threads=False))
+        rows = table.column('rows').chunk(0).values
+    except (pa.ArrowInvalid, KeyError, IndexError):
+        return None
+    if not isinstance(rows, pa.StructArray):
+        return None
+
+    columns = {}
+    for i, field in enumerate(rows.type):
+        values = rows.field(i)
+        if pa.types.is_timestamp(field.type):
+            values = values.cast(pa.timestamp('ns'))
+        elif pa.types.is_null(field.type):
+            values = values.cast(pa.float64())
+        columns[field.name] = values.to_numpy(zero_copy_only=False)
+    return ColumnarBatch(columns)
+
+def decode_prices(body: bytes):
+    """
+    Decode a price endpoint response body straight into a ColumnarBatch:
+    pyarrow's JSON reader when it is installed, otherwise orjson (or json)
+    plus typed NumPy buffers
+    Args:
+        body: Raw response body, a JSON array of daily records
+    Returns:
+        ColumnarBatch, or the decoded JSON as is when it is not an array
+        (FMP reports some errors as a 200 with an object)
+    Raises:
+        ValueError: If the body is not valid JSON
+    """
+    stripped = body.lstrip()
+    if stripped[:1] == b'[' and stripped[1:].lstrip()[:1] == b'{':
+        batch = _decode_arrow(stripped)
+        if batch is not None:
+            return batch
+    data = orjson.loads(body) if orjson is not None else json.loads(body)
+    if isinstance(data, list):
+        return ColumnarBatch.from_records(data)
+    return data
+
+def as_batch(payload) -> ColumnarBatch:
+    """
+    ColumnarBatch from any form a payload takes on its way to transform: a
+    batch, or a list of records as read back from the cache or run journal
+    """
+    if isinstance(payload, ColumnarBatch):
+        return payload
+    if isinstance(payload, list):
+        return ColumnarBatch.from_records(payload)
+    raise ValueError(f"Cannot read price rows from a {type(payload).__name__} payload")
+
+def json_default(obj):
+    """`default` hook for json.dump, a batch is stored as the records it was decoded from"""
+    if isinstance(obj, ColumnarBatch):
+        return obj.to_records()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
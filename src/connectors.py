@@ -1,130 +1,368 @@
-import requests
+import csv
+import io
 import logging
-from ratelimit import limits, RateLimitException, sleep_and_retry
-import os
-import logging
-import pandas as pd
-from typing import Optional, Dict, Any, List
+import threading
+from datetime import date, timedelta
+from typing import Optional, Dict, Any, List, Iterable, Callable
+from urllib.parse import urlsplit
+from src.rate_limiter import TokenBucketLimiter, get_limiter
+from src.http_transport import HttpTransport, get_default_transport
+from src.cache import ResponseCache, cached
+from src.columnar import ColumnarBatch, decode_prices
+from src.metrics import get_registry
+from src.retry_policy import FailureKind, ProviderError, RetryPolicy, get_retry_policy
+
+JSON_DECODE_SECONDS = get_registry().histogram(
+    'json_decode_seconds', 'Time spent decoding API response bodies', ('provider',))
+
+def _is_alpha_payload(data) -> bool:
+    """Alpha Vantage reports errors and throttling as 200 responses, keep those out of the cache"""
+    return not any(key in data for key in ('Error Message', 'Note', 'Information'))
+
+def _check_alpha_payload(data, symbol: str):
+    """Turn the 200-with-a-message error responses of Alpha Vantage into ProviderErrors"""
+    if 'Error Message' in data:
+        raise ProviderError(f"{symbol}: {data['Error Message']}", provider='alpha_vantage',
+                            kind=FailureKind.PERMANENT)
+    # 'Note' is the per-minute throttle, 'Information' the daily quota or a premium endpoint
+    for key in ('Note', 'Information'):
+        if key in data:
+            raise ProviderError(f"{symbol}: {data[key]}", provider='alpha_vantage', kind=FailureKind.QUOTA)
+
+
+def _is_fmp_rows(data) -> bool:
+    """FMP price endpoints answer with an array of rows, keep anything else out of the cache"""
+    return isinstance(data, (list, ColumnarBatch))
+
+# FMP error objects naming a problem a retry won't fix
+FMP_PERMANENT_ERRORS = ('invalid api key', 'premium', 'subscription', 'not available', 'exclusive')
+
+def _check_fmp_payload(data, label: str, status: Optional[int] = None):
+    """Turn the 200-with-an-object error responses of FMP, e.g. {"Error Message": ...}, into ProviderErrors"""
+    if not isinstance(data, dict):
+        return
+    message = str(data.get('Error Message') or data.get('message') or data or 'empty response')
+    lowered = message.lower()
+    if 'limit reach' in lowered:
+        kind = FailureKind.QUOTA
+    elif not data or any(phrase in lowered for phrase in FMP_PERMANENT_ERRORS):
+        kind = FailureKind.PERMANENT
+    else:
+        kind = FailureKind.TRANSIENT
+    raise ProviderError(f"{label}: {message}", provider='fmp', kind=kind, status=status)
+
 
 class AlphaAdvantage:
-    def __init__(self, api_url, api_key):
+    def __init__(self, api_url, api_key,
+                 calls_per_minute: int = 5,
+                 rate_limiter: Optional[TokenBucketLimiter] = None,
+                 transport: Optional[HttpTransport] = None,
+                 cache: Optional[ResponseCache] = None,
+                 retry_policy: Optional[RetryPolicy] = None):
         """
         Initializes AlphaVantage client with API URL and key.
         Args:
             api_url (str): Alpha Vantage API URL.
             api_key (str): Alpha Vantage API key.
+            calls_per_minute (int): Account quota, shared by every call made with this key.
+            rate_limiter (TokenBucketLimiter, optional): Limiter to use instead of the shared per-key one.
+            transport (HttpTransport, optional): Pooled HTTP session, defaults to the process-wide one.
+            cache (ResponseCache, optional): Response cache consulted before calling the API.
+            retry_policy (RetryPolicy, optional): Retry rules, defaults to the shared alpha_vantage policy.
         """
         self.api_url = api_url
         self.api_key = api_key
+        self.rate_limiter = rate_limiter or get_limiter('alpha_vantage', api_key, calls=calls_per_minute, period=60)
+        self.transport = transport or get_default_transport()
+        self.cache = cache
+        self.retry_policy = retry_policy or get_retry_policy('alpha_vantage')
         self.logger = logging.getLogger(__name__)
 
-    @sleep_and_retry
-    @limits(calls=5, period=60)
-    def get_stock_data(self, symbol):
+    @cached('alpha-vantage/TIME_SERIES_DAILY', cacheable=_is_alpha_payload)
+    def get_stock_data(self, symbol, params: Optional[Dict[str, Any]] = None):
         """
         Fetches daily stock data for a given symbol from Alpha Vantage.
         Args:
             symbol (str): Stock ticker symbol.
+            params (dict, optional): Extra query parameters, e.g. outputsize.
 
         Returns:
             dict: Stock data from API.
         Raises:
-            requests.RequestException: If the API request fails.
-            ValueError: If the response contains an error or is invalid.
+            ProviderError: If the request still fails after retries, or the response
+                is an error or throttle message. `kind` tells which.
         """
-        data = None
+        query = {
+            'function': 'TIME_SERIES_DAILY',  
+            'symbol': symbol, 
+            **(params or {}),
+            'apikey': self.api_key
+        }
+
+        def send():
+            self.rate_limiter.acquire()
+            res = self.transport.get(self.api_url, params=query, timeout=15.0) #timeout parameter prevents program from hanging
+            res.raise_for_status()
+            with JSON_DECODE_SECONDS.time(provider='alpha_vantage'):
+                data = res.json()
+            _check_alpha_payload(data, symbol)
+            return data
+
         try:
-            params = {
-                'function': 'TIME_SERIES_DAILY',  
-                'symbol': symbol, 
-                'apikey': self.api_key
-            }
-            res = requests.get(self.api_url, params=params, timeout=15.0) #timeout parameter prevents program from hanging
-            data = res.json()
-            if 'Error Message' in data:
-                self.logger.error(f"{data['Error Message']}")
-            #self.logger.info(f"Data from the API {data}")
-        except requests.ConnectionError as e:
-            self.logger.error(f"Failed to connect: {e}")
-        except requests.HTTPError as e:
-            self.logger.error(f"HTTP error: {e}, Status: {e.response.status_code}")
-        except requests.Timeout as e:
-            self.logger.error(f"Request timed out: {e}")
-        except requests.RequestException as e:
-            self.logger.error(f"Request error: {e}")
-        return data
+            return self.retry_policy.call(send, on_quota=self.rate_limiter.pause)
+        except ProviderError as e:
+            self.logger.error(f"Alpha Vantage {e.kind} error for {symbol}: {e}"
+                              + (f", Status: {e.status}" if e.status else ""))
+            raise
 
 class FMPClient:
-    def __init__(self, api_url, api_key):
+    def __init__(self, api_url, api_key,
+                 calls_per_minute: int = 5,
+                 rate_limiter: Optional[TokenBucketLimiter] = None,
+                 transport: Optional[HttpTransport] = None,
+                 cache: Optional[ResponseCache] = None,
+                 retry_policy: Optional[RetryPolicy] = None,
+                 max_bulk_days: int = 5):
+        """
+        Initializes FMP client with API URL and key.
+        Args:
+            api_url (str): FMP historical price endpoint, ending in `symbol=`
+            api_key (str): FMP API key
+            calls_per_minute (int): Account quota, shared by every method called with this key
+            rate_limiter (TokenBucketLimiter, optional): Limiter to use instead of the shared per-key one
+            transport (HttpTransport, optional): Pooled HTTP session, defaults to the process-wide one
+            cache (ResponseCache, optional): Response cache consulted before calling the API
+            retry_policy (RetryPolicy, optional): Retry rules, defaults to the shared fmp policy
+            max_bulk_days (int): Longest range, in trading days, fetched through the
+                one-call-per-day eod-bulk endpoint instead of one call per symbol
+        """
         self.api_url = api_url
         self.api_key = api_key
+        self.rate_limiter = rate_limiter or get_limiter('fmp', api_key, calls=calls_per_minute, period=60)
+        self.transport = transport or get_default_transport()
+        self.cache = cache
+        self.retry_policy = retry_policy or get_retry_policy('fmp')
         self.logger = logging.getLogger(__name__)
 
-    @sleep_and_retry
-    @limits(calls=5, period=60)
-    def get_yearly_data(self, symbol):
-        """get request for one year of stock timeseries data"""
-        url = f"{self.api_url}{symbol}&timeseries=365&apikey={self.api_key}"
+        # multi-symbol endpoints live next to the historical one under /stable/
+        parts = urlsplit(api_url)
+        self.stable_url = f"{parts.scheme}://{parts.netloc}/stable/"
+        self.max_bulk_days = max_bulk_days
+        # cleared the first time the plan rejects eod-bulk, single-symbol calls from then on
+        self.bulk_supported = True
 
-        # add a logic to handle 402 error messages
-        try:
-            res = requests.get(url, timeout=10)
+    def _call(self, url: str, params: Dict[str, Any], label: str, columnar: bool = False):
+        """
+        GET through the rate limiter and retry policy, decoding JSON or CSV bodies
+        Args:
+            columnar (bool): Decode a JSON array of daily rows straight into a
+                ColumnarBatch instead of a list of dicts
+        Raises:
+            ProviderError: When the request still fails after retries, or the
+                response is an FMP error object
+        """
+        query = {**params, 'apikey': self.api_key}
+
+        def send():
+            self.rate_limiter.acquire()
+            res = self.transport.get(url, params=query, timeout=30)
             res.raise_for_status()
-        except requests.ConnectionError as e:
-            self.logger.error(f"Failed to connect to API for {symbol}: {e}")
-            return None
-        except requests.Timeout as e:
-            self.logger.error(f"Request timed out for {symbol}: {e}")
-            return None
-        except requests.HTTPError as e:
-            self.logger.error(f"HTTP error for {symbol}: {e}, Status code: {e.response.status_code}")
-            return None
-        except requests.RequestException as e:
-            self.logger.error(f"Request exception for {symbol}: {e}")
-            return None
+            try:
+                with JSON_DECODE_SECONDS.time(provider='fmp'):
+                    if 'csv' in res.headers.get('Content-Type', ''):
+                        data = _parse_csv_rows(res.text)
+                    elif columnar:
+                        data = decode_prices(res.content)
+                    else:
+                        data = res.json()
+            except ValueError as e:
+                self.logger.error(f"Response content: {res.text[:200]}...")
+                raise ProviderError(f"Invalid response for {label}: {e}", provider='fmp',
+                                    kind=FailureKind.TRANSIENT, status=res.status_code) from e
+            _check_fmp_payload(data, label, res.status_code)
+            return data
 
         try:
-            data = res.json()
-            return data
-        except ValueError as e:
-            self.logger.error(f"Invalid JSON response for {symbol}: {e}")
-            self.logger.error(f"Response content: {res.text[:200]}...")
-            return None
+            return self.retry_policy.call(send, on_quota=self.rate_limiter.pause)
+        except ProviderError as e:
+            if e.status == 402:
+                self.logger.error(f"{label} is not covered by the FMP plan (402), skipping")
+            else:
+                self.logger.error(f"FMP {e.kind} error for {label}: {e}"
+                                  + (f", Status code: {e.status}" if e.status else ""))
+            raise
+
+    @cached('fmp/historical-price-eod', cacheable=_is_fmp_rows, decode=decode_prices)
+    def _request(self, symbol: str, params: Dict[str, Any]):
+        """
+        Get request against the historical price endpoint for one symbol
+        Args:
+            symbol (str): Stock ticker symbol
+            params (dict): Query parameters besides the symbol and API key
+
+        Returns:
+            ColumnarBatch of the daily rows, newest first, decoded without per-row
+            dicts; `to_records()` gives the JSON records
+        Raises:
+            ProviderError: When the request still fails after retries. 402 (symbol
+                outside the plan), 401/403 and 404 are permanent and not retried
+        """
+        return self._call(f"{self.api_url}{symbol}", params, symbol, columnar=True)
+
+    def get_timeseries(self, symbol, days: int):
+        """Get request for the last `days` days of stock timeseries data"""
+        return self._request(symbol, {'timeseries': days})
+
+    def get_yearly_data(self, symbol):
+        """get request for one year of stock timeseries data"""
+        return self.get_timeseries(symbol, 365)
 
-    @sleep_and_retry
-    @limits(calls=5, period=60)
     def get_five_year_data(self, symbol):
         """
         Get request for the past 5 year of stock timeseries data
         """
-        
-        url = f"{self.api_url}{symbol}&timeseries=1825&apikey={self.api_key}"
+        return self.get_timeseries(symbol, 1825)
+    
+    def get_historical_data(self, symbol, start_date=None, end_date=None):
+        """
+        Get request for stock timeseries data between two dates
+        Args:
+            symbol (str): Stock ticker symbol
+            start_date (date or str, optional): First date to fetch (FMP `from`)
+            end_date (date or str, optional): Last date to fetch (FMP `to`)
+        """
+        params = {}
+        if start_date is not None:
+            params['from'] = str(start_date)
+        if end_date is not None:
+            params['to'] = str(end_date)
+        return self._request(symbol, params)
+    # Multi-symbol endpoints
+    @cached('fmp/eod-bulk', cacheable=_is_fmp_rows)
+    def _bulk_request(self, day: str, params: Optional[Dict[str, Any]] = None):
+        """End-of-day rows of every symbol for one date"""
+        return self._call(f"{self.stable_url}eod-bulk", {'date': day, **(params or {})}, f"eod-bulk {day}")
 
-        try:
-            res = requests.get(url, timeout=10)
-            res.raise_for_status()
-        except requests.ConnectionError as e:
-            self.logger.error(f"Failed to connect to API for {symbol}: {e}")
-            return None
-        except requests.Timeout as e:
-            self.logger.error(f"Request timed out for {symbol}: {e}")
-            return None
-        except requests.HTTPError as e:
-            self.logger.error(f"HTTP error for {symbol}: {e}, Status code: {e.response.status_code}")
-            return None
-        except requests.RequestException as e:
-            self.logger.error(f"Request exception for {symbol}: {e}")
-            return None
+    def get_bulk_range(self, symbols: Iterable[str], start_date, end_date) -> Dict[str, list]:
+        """
+        Daily rows of many symbols between two dates from one eod-bulk call per
+        trading day, split back into per-symbol payloads, newest first like
+        get_historical_data
+        Args:
+            symbols: Ticker symbols wanted, rows of other symbols are dropped
+            start_date (date or str): First date
+            end_date (date or str): Last date
 
-        try:
-            data = res.json()
-            return data
-        except ValueError as e:
-            self.logger.error(f"Invalid JSON response for {symbol}: {e}")
-            self.logger.error(f"Response content: {res.text[:200]}...")
-            return None
-    
-    @sleep_and_retry
-    @limits(calls=5, period=60)
-    def get_historical_data(self, symbol):
-        pass
\ No newline at end of file
+        Returns:
+            dict of symbol -> list of daily records in the historical-price-eod
+            shape (see normalize_bulk_row), empty for symbols without rows
+        Raises:
+            ProviderError: When a bulk call fails, a permanent one also turns
+                bulk_supported off so later ranges go straight to single calls
+        """
+        start, end = date.fromisoformat(str(start_date)[:10]), date.fromisoformat(str(end_date)[:10])
+        payloads: Dict[str, list] = {symbol: [] for symbol in symbols}
+        day = end
+        calls = 0
+        while day >= start:
+            if day.weekday() < 5:
+                try:
+                    rows = self._bulk_request(day.isoformat())
+                except ProviderError as e:
+                    if e.kind == FailureKind.PERMANENT:
+                        self.bulk_supported = False
+                    raise
+                calls += 1
+                if not isinstance(rows, list):
+                    raise ProviderError(f"eod-bulk {day}: expected a list of rows, got {type(rows).__name__}",
+                                        provider='fmp', kind=FailureKind.TRANSIENT)
+                for row in rows:
+                    bucket = payloads.get(row.get('symbol')) if isinstance(row, dict) else None
+                    if bucket is not None:
+                        bucket.append(normalize_bulk_row(row))
+            day -= timedelta(days=1)
+        self.logger.info(f"Fetched {len(payloads)} symbols from {start} to {end} in {calls} eod-bulk calls")
+        return payloads
+
+# fields of a historical-price-eod row, the schema transform and load expect
+FMP_PRICE_FIELDS = ('symbol', 'date', 'open', 'high', 'low', 'close', 'volume')
+
+def normalize_bulk_row(row: dict) -> dict:
+    """
+    eod-bulk row as a historical-price-eod row: change and changePercent derived
+    from open and close like FMP's, vwap (not provided) NaN, and fields the
+    historical rows don't have, such as adjClose, dropped
+    """
+    record = {field: row.get(field) for field in FMP_PRICE_FIELDS}
+    open_, close = record['open'], record['close']
+    if isinstance(open_, (int, float)) and isinstance(close, (int, float)):
+        change = close - open_
+        change_percent = change / open_ * 100 if open_ else float('nan')
+    else:
+        # text left by _parse_csv_rows, validation rejects the row
+        change = change_percent = float('nan')
+    record.update(change=change, changePercent=change_percent, vwap=float('nan'))
+    return record
+
+def _parse_csv_rows(text: str) -> List[dict]:
+    """CSV bulk responses as JSON-like records, numeric fields converted"""
+    rows = []
+    for row in csv.DictReader(io.StringIO(text)):
+        for key, value in row.items():
+            if key in ('symbol', 'date') or value is None:
+                continue
+            try:
+                row[key] = int(value) if key == 'volume' else float(value)
+            except ValueError:
+                pass  # left as text for transform/validation to reject
+        rows.append(row)
+    return rows
+
+
+class CoalescedFetch:
+    def __init__(self, client: FMPClient, symbols: List[str], start_date, end_date,
+                 fallback: Optional[Callable] = None):
+        """
+        Fetch function for ETLProcessor jobs that serves many tickers from one
+        group request. The first ticker asked for triggers get_bulk_range for the
+        whole group; when the provider rejects the batch every ticker falls back
+        to its own get_historical_data call.
+        Args:
+            client (FMPClient): Client whose multi-symbol endpoints are used
+            symbols: Tickers of the group
+            start_date, end_date: Date range shared by the group
+            fallback (callable, optional): fetch(symbol, start_date, end_date) used
+                instead of the client's single calls, e.g. ProviderRouter.get_historical_data.
+                With a fallback any failed group request falls back, so the tickers
+                can fail over to another provider; without one only a rejected
+                batch does and other failures are raised
+        """
+        self.client = client
+        self.fallback = fallback
+        self.symbols = list(symbols)
+        self.start_date = start_date
+        self.end_date = end_date
+        self._lock = threading.Lock()
+        self._fetched = False
+        self._payloads: Optional[Dict[str, list]] = None
+        self._error: Optional[ProviderError] = None
+
+    def __call__(self, symbol: str, **kwargs):
+        with self._lock:
+            if not self._fetched:
+                self._fetched = True
+                if self.client.bulk_supported:
+                    try:
+                        self._payloads = self.client.get_bulk_range(self.symbols, self.start_date, self.end_date)
+                    except ProviderError as e:
+                        if e.kind != FailureKind.PERMANENT:
+                            self._error = e
+            if self._payloads is not None:
+                # hand each payload out once so the group result is freed as it drains
+                return self._payloads.pop(symbol, [])
+            error = self._error
+        if self.fallback is None:
+            if error is not None:
+                raise error
+            return self.client.get_historical_data(symbol, self.start_date, self.end_date)
+        return self.fallback(symbol, self.start_date, self.end_date)
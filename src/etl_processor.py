@@ -1,58 +1,90 @@
+import numpy as np
 import pandas as pd
 import logging
-from typing import Optional
-from datetime import datetime
+from datetime import date, timedelta
+import random
+import threading
 import time
-from typing import Optional, List, Dict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional, List, Dict, Iterator, Tuple
+from src.columnar import ColumnarBatch, as_batch
+from src.log_config import log_context, set_context
+from src.metrics import get_registry
+from src.retry_policy import FailureKind, ProviderError, RetryBudget, classify_exception, use_budget
+from src.watermark_store import plan_ranges
 
 # from src.utils.logger import get_logger
-# from src.cache.redis_cache import cached
+
+ETL_STAGE_SECONDS = get_registry().histogram(
+    'etl_stage_seconds', 'Wall time per ETL stage call, extract is per ticker', ('stage',))
+ETL_TICKERS = get_registry().counter(
+    'etl_tickers_total', 'Tickers processed by extraction outcome', ('status',))
+ETL_ROWS = get_registry().counter(
+    'etl_rows_total', 'Rows leaving each ETL stage', ('stage',))
+ETL_RETRIES = get_registry().counter(
+    'etl_extract_retries_total', 'Extraction attempts retried after a failure')
+
+# FMP price-like fields that are candidates for float32 storage
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'vwap', 'change', 'changePercent')
+
+def _compact_float(series: pd.Series, tolerance: float = 5e-3) -> pd.Series:
+    """
+    Downcast a price column to float32 when no value moves by more than half a cent
+    """
+    values = series.astype('float64')
+    narrowed = values.astype('float32')
+    if (narrowed.astype('float64') - values).abs().max() <= tolerance:
+        return narrowed
+    return values
 
 class ETLProcessor:
-    def __init__(self, alpha_vantage_client, fmp_client, bigquery_client):
+    def __init__(self, alpha_vantage_client, fmp_client, bigquery_client, sink=None, journal=None, router=None,
+                 retry_budget: int = 200):
         """
         Initialize ETL Process with AlphaVantage and BigQuery 
         Args:
             AlphaVantage (object)
             FMP (Object)
             BigQuery (object)
+            sink (Sink, optional): Load target, defaults to a BigQuerySink over the BigQuery client
+            journal (RunJournal, optional): Per-ticker run journal, makes runs resumable
+            router (ProviderRouter, optional): Spreads fetches over FMP and Alpha Vantage
+                with per-ticker failover; FMP alone is used without one
+            retry_budget (int): Provider retries allowed per extraction, across every ticker
         """
+        from src.sinks import BigQuerySink
+
         # creates instance of alpha vantange and bigquery
         self.alpha_vantage_client = alpha_vantage_client
         self.fmp_client = fmp_client
         self.bigquery_client = bigquery_client
+        self.sink = sink if sink is not None else BigQuerySink(bigquery_client)
+        self.journal = journal
+        self.router = router
+        self.retry_budget = retry_budget
+        self.run_id = None
+        self.metrics = get_registry()
         self.logger = logging.getLogger(__name__)
 
-        # Track processing statistics
+        # Track processing statistics, shared by extraction worker threads
         self.stats = {'extracted': 0,
                       'errors': 0}
-        
-        # setup logging
-        self._setup_logging()
-    
-    def _setup_logging(self):
-        """Setup logging and configuration"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('etl_processor.log'),
-                logging.StreamHandler()
-            ]
-        )
-        self.logger = logging.getLogger(__name__)
+        self._stats_lock = threading.Lock()
+        # logging is configured once per process by the entry point, see log_config.configure_logging
 
     def extract_with_retry(self,
                            extraction_func,
                            max_retries: int = 3,
-                           retry_delay: int = 5,
+                           retry_delay: float = 1,
                            **kwargs):
         """
-        Execute extraction with retry logic
+        Execute extraction with retry logic. The connectors already retry with their
+        provider's RetryPolicy, so a ProviderError coming out of them is final; only
+        other transient failures are retried here, with jittered exponential backoff
         Args:
             extraction_func: The function to execute extraction
             max_retries: Maximum number of retry attemps
-            retry_delay: Seconds to wait between retries
+            retry_delay: Backoff base in seconds, doubled after every attempt
 
         Return:
             Extraction result
@@ -62,143 +94,646 @@ class ETLProcessor:
                 result = extraction_func(**kwargs)
                 return result
             except Exception as e:
-                self.logger.warning(f"Extraction attemp {attempt + 1}/{max_retries} failed: {e}")
+                kind, _ = classify_exception(e)
+                self.logger.warning(f"Extraction attemp {attempt + 1}/{max_retries} failed ({kind}): {e}")
 
+                if isinstance(e, ProviderError) or kind == FailureKind.PERMANENT:
+                    raise
                 if attempt < max_retries - 1:
-                    self.logger.info(f"Retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
+                    ETL_RETRIES.inc()
+                    delay = random.uniform(0, retry_delay * (2 ** attempt))
+                    self.logger.info(f"Retrying in {delay:.2f} seconds...")
+                    time.sleep(delay)
                 else:
                     self.logger.error("All retry attemps exhausted")
                     raise
 
-    # could add error handling when symbol isn't found from the ticker_list
-    # def advantage_extract(self, 
-    #                       ticker_list):
-    #     """
-    #     Takes ticker as dataframe and process each ticker
-    #     """
-    #     if not ticker_list:
-    #         self.logger.error("Ticker list is empty ")
-    #         raise ValueError("Ticker list cannot be empty")
-    #     self.data = [] # self data is reseted after each extraction is performed
-    #     if not ticker_list:
-    #         self.logger.error(f"Stock ticker csv not found")
-    #     for ticker in ticker_list:
-    #         try:
-    #             self.data.append(self.alpha_vantage_client.get_stock_data(ticker))
-    #             self.logger.info(f"Alpha Advantage data extract complete")
-    #         except ValueError as e:
-    #             self.logger.error(f"Error with Alpha Advantage API request {e}")
-    #         else:
-    #             self.logger.info(f"Alpha Advantage API request complete")
-    #     return self.data
+    def _count(self, key: str, amount: int = 1):
+        """Increment a processing statistic, safe to call from worker threads"""
+        with self._stats_lock:
+            self.stats[key] += amount
+        ETL_TICKERS.inc(amount, status=key)
 
-    def extract(self, 
-                    ticker_list: List[str],
-                    data_type: str,
-                    use_retry: bool = True):
-        """
-        Takes ticker as dataframe and process each ticker
-        """
-        if not ticker_list:
-            self.logger.error(f"Ticker file not found")
-            raise ValueError("Ticker list cannot be empty")
-        
-        extracted_data = []
-        
-        self.logger.info(f"Starting FMP extraction for {len(ticker_list)} tickers")
+    @property
+    def price_source(self):
+        """Where ticker prices are fetched from: the provider router when set, FMP otherwise"""
+        return self.router if self.router is not None else self.fmp_client
+
+    def _get_fetch_method(self, data_type: str):
+        """Maps a data type to the price source method that fetches it"""
+        methods = {
+            'yearly': self.price_source.get_yearly_data,
+            'five_year': self.price_source.get_five_year_data,
+            'historical': self.price_source.get_historical_data,
+        }
+        if data_type not in methods:
+            raise ValueError(f"Unknown data type: {data_type}")
+        return methods[data_type]
 
-        for ticker in ticker_list:
+    def _extract_ticker(self, ticker: str, fetch, use_retry: bool, budget: RetryBudget, **kwargs):
+        """Fetch one ticker, charging retries to the run's budget, and update the statistics. Returns None on failure"""
+        # runs on fetch threads, which don't inherit the caller's log context or budget
+        with log_context(run_id=self.run_id, ticker=ticker), use_budget(budget):
+            start = time.perf_counter()
             try:
-                self.logger.info(f"Extracting {data_type} data for ticker symbol: {ticker}")
-                
-                # Select appropriate extraction FMP method
-                if data_type == 'yearly':
-                    if use_retry:
-                        data = self.extract_with_retry(
-                            self.fmp_client.get_yearly_data,
-                            symbol=ticker
-                        )
-                    else:
-                        data = self.fmp_client.get_yearly_data(ticker)
-                        print(f"Retry was skipped")
-                
-                elif data_type == 'historical':
+                with self.metrics.span('extract', ticker=ticker):
+                    self.logger.info(f"Extracting data for ticker symbol: {ticker}")
                     if use_retry:
-                        data = self.extract_with_retry(
-                            self.fmp_client.get_historical_data,
-                            symbol=ticker
-                        )
+                        data = self.extract_with_retry(fetch, symbol=ticker, **kwargs)
                     else:
-                        data = self.fmp_client.get_historical_data
-                
-                else:
-                    # should catch more error
-                    raise ValueError(f"Unknown data type: {data_type}")
-                
-                if data is not None:
-                    extracted_data.append(data)
-                    self.stats['extracted'] += 1
-                    self.logger.info(f"Successfully extracted {ticker}")
-                else:
-                    self.logger.warning(f"No data returned for {ticker}")
-                
-                # Rate limiting
-                time.sleep(0.2)
-                
+                        data = fetch(ticker, **kwargs)
             except Exception as e:
                 self.logger.error(f"Failed to extract {ticker}: {e}")
-                self.stats['errors'] += 1
+                self._count('errors')
+                return None
+            finally:
+                ETL_STAGE_SECONDS.observe(time.perf_counter() - start, stage='extract')
+
+            if data is not None and not isinstance(data, (list, ColumnarBatch)):
+                # an error object slipped through as data, it would fail transform for every ticker
+                self.logger.error(f"Failed to extract {ticker}: expected price rows, got a {type(data).__name__}")
+                self._count('errors')
+                return None
+            if data is not None:
+                self._count('extracted')
+                self.logger.info(f"Successfully extracted {ticker}")
+            else:
+                self.logger.warning(f"No data returned for {ticker}")
+            return data
+
+    def _iter_fetch(self, jobs, use_retry: bool, max_workers: int):
+        """
+        Run (ticker, fetch, kwargs) jobs and yield (ticker, data) in completion order
+        """
+        # every extraction gets its own retry budget, the provider policies are shared process-wide
+        budget = RetryBudget(self.retry_budget)
+
+        if max_workers <= 1:
+            for ticker, fetch, kwargs in jobs:
+                yield ticker, self._extract_ticker(ticker, fetch, use_retry, budget, **kwargs)
+            return
+
+        # keep a bounded number of fetches in flight so a slow consumer holds back extraction
+        max_in_flight = max_workers * 2
+        jobs = iter(jobs)
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="extract")
+        try:
+            pending = {}
+            for ticker, fetch, kwargs in jobs:
+                pending[executor.submit(self._extract_ticker, ticker, fetch, use_retry, budget, **kwargs)] = ticker
+                if len(pending) >= max_in_flight:
+                    break
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    ticker = pending.pop(future)
+                    yield ticker, future.result()
+
+                for ticker, fetch, kwargs in jobs:
+                    pending[executor.submit(self._extract_ticker, ticker, fetch, use_retry, budget, **kwargs)] = ticker
+                    if len(pending) >= max_in_flight:
+                        break
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def start_run(self, ticker_list: List[str], run_id: Optional[str] = None, **params) -> Optional[str]:
+        """
+        Open a journaled run, or resume run_id. Later extract/transform/load
+        calls record their per-ticker progress against it.
+        Returns:
+            The run id, None when the processor has no journal
+        """
+        if self.journal is None:
+            return None
+        self.run_id = self.journal.start_run(ticker_list, run_id=run_id, **params)
+        set_context(run_id=self.run_id)
+        return self.run_id
+
+    def finish_run(self) -> Optional[str]:
+        """Close the current journaled run. Returns its final status"""
+        if self.journal is None or self.run_id is None:
+            return None
+        status = self.journal.finish_run(self.run_id)
+        self.run_id = None
+        set_context(run_id=None)
+        return status
+
+    def _journal_record(self, tickers, stage: str, status: str = 'done', **fields):
+        if self.journal is not None and self.run_id is not None:
+            self.journal.record(self.run_id, tickers, stage, status, **fields)
+
+    def _run_jobs(self, jobs, use_retry: bool, max_workers: int):
+        """
+        _iter_fetch with the run journal applied: tickers already loaded in the
+        current run are skipped, stored payloads are reused instead of fetched,
+        and every new payload is queued for storage as it is handed on
+        """
+        if self.journal is None or self.run_id is None:
+            yield from self._iter_fetch(jobs, use_retry, max_workers)
+            return
+
+        run_id = self.run_id
+        state = self.journal.tickers(run_id)
+        to_fetch, loaded, reused = [], 0, 0
+        for ticker, fetch, kwargs in jobs:
+            entry = state.get(ticker)
+            if entry is not None and entry['stage'] == 'load' and entry['status'] == 'done':
+                loaded += 1
                 continue
-        
+            if entry is not None and entry['payload_path']:
+                data = self.journal.load_payload(entry['payload_path'])
+                if data is not None:
+                    reused += 1
+                    self._count('extracted')
+                    yield ticker, data
+                    continue
+            to_fetch.append((ticker, fetch, kwargs))
+
+        self.logger.info(f"Run {run_id}: {loaded} tickers already loaded, {reused} payloads reused, "
+                         f"{len(to_fetch)} to fetch")
+        for ticker, data in self._iter_fetch(to_fetch, use_retry, max_workers):
+            if data is not None:
+                self.journal.record(run_id, ticker, 'extract', 'done', rows=len(data))
+                # written on the journal's thread, its payload_path is set once it is on disk
+                self.journal.save_payload(run_id, ticker, data)
+            else:
+                self.journal.record(run_id, ticker, 'extract', 'failed')
+            yield ticker, data
+
+    def iter_extract(self,
+                     ticker_list: List[str],
+                     data_type: str,
+                     use_retry: bool = True,
+                     max_workers: int = 1) -> Iterator[Tuple[str, Optional[list]]]:
+        """
+        Extract tickers and yield each result as soon as its fetch finishes
+        Args:
+            ticker_list: Ticker symbols to extract
+            data_type: 'yearly', 'five_year' or 'historical'
+            use_retry: Retry failed fetches with extract_with_retry
+            max_workers: Number of concurrent fetch threads, 1 runs sequentially.
+                Request pacing is left to the client's shared per-key rate limiter.
+
+        Yields:
+            (ticker, data) tuples in completion order, data is None when the fetch failed
+        """
+        if not ticker_list:
+            self.logger.error("Ticker list is empty")
+            raise ValueError("Ticker list cannot be empty")
+
+        fetch = self._get_fetch_method(data_type)
+        self.logger.info(f"Starting {'routed' if self.router is not None else 'FMP'} extraction "
+                         f"for {len(ticker_list)} tickers "
+                         f"with {max_workers} worker(s)")
+
+        jobs = ((ticker, fetch, {}) for ticker in ticker_list)
+        yield from self._run_jobs(jobs, use_retry, max_workers)
+
+    def plan_incremental(self,
+                         ticker_list: List[str],
+                         watermarks,
+                         lookback_days: int = 1825,
+                         end_date: Optional[date] = None) -> Dict[str, Tuple[date, date]]:
+        """
+        Work out the missing date range for every ticker from its watermark
+        Args:
+            ticker_list: Ticker symbols to extract
+            watermarks: WatermarkStore or BigQueryWatermarkSource
+            lookback_days: History fetched for tickers that have never been loaded
+            end_date: Last date to fetch, defaults to today
+
+        Returns:
+            dict of ticker -> (start_date, end_date), tickers already up to date are left out
+        """
+        plan = plan_ranges(ticker_list, watermarks.get(ticker_list), lookback_days, end_date)
+        self.logger.info(f"Incremental plan: {len(plan)}/{len(ticker_list)} tickers need new data")
+        return plan
+
+    def iter_extract_incremental(self,
+                                 ticker_list: List[str],
+                                 watermarks,
+                                 lookback_days: int = 1825,
+                                 end_date: Optional[date] = None,
+                                 use_retry: bool = True,
+                                 max_workers: int = 1,
+                                 coalesce: bool = True) -> Iterator[Tuple[str, Optional[list]]]:
+        """
+        Extract only the dates after each ticker's watermark
+        Args:
+            coalesce: Serve tickers that share a short date range (a daily run)
+                from the client's multi-symbol endpoint, one call per day for the
+                whole group instead of one call per ticker
+
+        Yields:
+            (ticker, data) tuples in completion order, like iter_extract
+        """
+        if not ticker_list:
+            self.logger.error("Ticker list is empty")
+            raise ValueError("Ticker list cannot be empty")
+
+        plan = self.plan_incremental(ticker_list, watermarks, lookback_days, end_date)
+        up_to_date = [ticker for ticker in ticker_list if ticker not in plan]
+        if up_to_date:
+            self._journal_record(up_to_date, 'load', rows=0)
+        yield from self.iter_extract_ranges(plan, use_retry, max_workers, coalesce)
+
+    def iter_extract_ranges(self,
+                            plan: Dict[str, Tuple[date, date]],
+                            use_retry: bool = True,
+                            max_workers: int = 1,
+                            coalesce: bool = True) -> Iterator[Tuple[str, Optional[list]]]:
+        """
+        Extract a planned date range per ticker, as made by plan_incremental
+        Args:
+            plan: ticker -> (start_date, end_date)
+            coalesce: See iter_extract_incremental
+
+        Yields:
+            (ticker, data) tuples in completion order, like iter_extract
+        """
+        fetch = self.price_source.get_historical_data
+        jobs = [(ticker, fetch, {'start_date': start, 'end_date': end})
+                for ticker, (start, end) in plan.items()]
+        if coalesce and hasattr(self.fmp_client, 'get_bulk_range'):
+            coalesced_jobs, covered = self._coalesce_jobs(plan)
+            jobs = coalesced_jobs + [job for job in jobs if job[0] not in covered]
+        yield from self._run_jobs(jobs, use_retry, max_workers)
+
+    def _coalesce_jobs(self, plan: Dict[str, Tuple[date, date]]):
+        """
+        Jobs sharing one CoalescedFetch per group of tickers with the same short
+        date range
+        Returns:
+            (jobs, set of the tickers they cover)
+        """
+        from src.connectors import CoalescedFetch
+
+        groups: Dict[Tuple[date, date], List[str]] = {}
+        for ticker, date_range in plan.items():
+            groups.setdefault(date_range, []).append(ticker)
+
+        fallback = self.router.get_historical_data if self.router is not None else None
+        jobs = []
+        covered = set()
+        for (start, end), tickers in groups.items():
+            trading_days = int(np.busday_count(start, end + timedelta(days=1)))
+            if len(tickers) < 2 or trading_days > self.fmp_client.max_bulk_days:
+                continue
+            # a failed group request falls back to the router, which can fail over per ticker
+            fetch = CoalescedFetch(self.fmp_client, tickers, start, end, fallback=fallback)
+            jobs.extend((ticker, fetch, {}) for ticker in tickers)
+            covered.update(tickers)
+        if covered:
+            self.logger.info(f"Coalescing {len(covered)} tickers into multi-symbol requests")
+        return jobs, covered
+
+    def extract(self, 
+                    ticker_list: List[str],
+                    data_type: str,
+                    use_retry: bool = True,
+                    max_workers: int = 1,
+                    run_id: Optional[str] = None):
+        """
+        Takes ticker list and extracts each ticker, concurrently when max_workers > 1
+        Args:
+            ticker_list: Ticker symbols to extract
+            data_type: 'yearly', 'five_year' or 'historical'
+            use_retry: Retry failed fetches with extract_with_retry
+            max_workers: Number of concurrent fetch threads
+            run_id: Journaled run to resume, only used when the processor has a journal.
+                Without one a new run is started and kept open for transform/load.
+
+        Returns:
+            List of payloads for the tickers that returned data, in completion order
+        """
+        extracted_data = []
+        if self.journal is not None and (run_id is not None or self.run_id is None):
+            self.start_run(ticker_list, run_id=run_id, data_type=data_type)
+
+        for ticker, data in self.iter_extract(ticker_list, data_type, use_retry, max_workers):
+            if data is not None:
+                extracted_data.append(data)
+
         self.logger.info(
             f"FMP extraction complete: "
             f"{len(extracted_data)}/{len(ticker_list)} successful"
         )
-        
+
         return extracted_data
 
-    def transform(self, extracted_data: Optional[list[dict]] = None):
+    def transform(self,
+                  extracted_data: Optional[list] = None,
+                  compact: bool = True,
+                  as_arrow: bool = False):
         """
+        Combine the payloads of every extracted ticker into one columnar frame
         Args:
-            Extracted data from FMP
+            extracted_data: List of per-ticker payloads (ColumnarBatch or lists of
+                daily records) or a flat list of daily records. Payloads holding no
+                rows, e.g. a provider's error object, are skipped
+            compact: Use compact dtypes, a categorical symbol and float32 prices
+                where the values survive the round trip to the cent
+            as_arrow: Return a pyarrow.Table instead of a DataFrame
         Returns:
-            Pandas dataframe
+            Pandas dataframe, or pyarrow Table when as_arrow is set
         """
         if extracted_data is None or (isinstance(extracted_data, list) and len(extracted_data) == 0):
             self.logger.error("No data to transform")
-            print("🚫 No data to transform")
             return None
 
+        start = time.perf_counter()
         try:
-            if isinstance(extracted_data[0], list):
-                flat_data = extracted_data[0]
+            if all(isinstance(item, dict) for item in extracted_data):
+                batch = ColumnarBatch.from_records(extracted_data)
             else:
-                flat_data = extracted_data
+                # per-ticker arrays are concatenated, rows never become dicts
+                payloads = [payload for payload in extracted_data if isinstance(payload, (list, ColumnarBatch))]
+                if len(payloads) < len(extracted_data):
+                    self.logger.error(f"Skipping {len(extracted_data) - len(payloads)} payloads that hold no price rows")
+                if not payloads:
+                    return None
+                batch = ColumnarBatch.concat([as_batch(payload) for payload in payloads])
+            if not len(batch):
+                self.logger.error("No data to transform")
+                return None
+
+            df = batch.to_frame()
 
-            df = pd.DataFrame(flat_data)
+            # malformed values become NaN/NaT for validate() to quarantine, one bad
+            # ticker no longer fails the whole batch
+            df['date'] = pd.to_datetime(df['date'], errors='coerce')
+            volume = pd.to_numeric(df['volume'], errors='coerce')
+            df['volume'] = volume if volume.isna().any() else volume.astype('int64')
+            for column in PRICE_COLUMNS:
+                if column in df.columns and df[column].dtype == object:
+                    df[column] = pd.to_numeric(df[column], errors='coerce')
 
-            df['date'] = pd.to_datetime(df['date'])
-            df['volume'] = df['volume'].astype('int64')
+            if compact:
+                df['symbol'] = df['symbol'].astype('category')
+                for column in PRICE_COLUMNS:
+                    if column in df.columns:
+                        df[column] = _compact_float(df[column])
 
-            self.logger.info(f"Transformed {len(df)} records")
+            ETL_STAGE_SECONDS.observe(time.perf_counter() - start, stage='transform')
+            ETL_ROWS.inc(len(df), stage='transform')
+            if self.run_id is not None:
+                self._journal_record(df['symbol'].unique().tolist(), 'transform')
+            self.logger.info(f"Transformed {len(df)} records "
+                             f"for {df['symbol'].nunique()} tickers")
+
+            if as_arrow:
+                import pyarrow as pa
+                return pa.Table.from_pandas(df, preserve_index=False)
             return df
         except Exception as e:
             self.logger.error(f"Error transforming data: {e}")
             raise
 
-    def load(self, data, data_table):
+    def validate(self,
+                 df: pd.DataFrame,
+                 quarantine_dir: Optional[str] = "data/quarantine",
+                 quarantine_table: Optional[str] = None) -> pd.DataFrame:
+        """
+        Validation stage run before load: schema and dtypes, (symbol, date)
+        duplicates, OHLC consistency, non-positive prices and date gaps, in one
+        vectorized pass over the combined frame
+        Args:
+            df: Transformed price frame
+            quarantine_dir: Directory the rejected rows are written to as CSV, None to skip
+            quarantine_table: BigQuery table the rejected rows are also appended to
+
+        Returns:
+            The rows that passed every check
+        """
+        from src.validation import validate_prices, write_quarantine
+
+        start = time.perf_counter()
+        with self.metrics.span('validate', rows=len(df)):
+            result = validate_prices(df)
+        ETL_STAGE_SECONDS.observe(time.perf_counter() - start, stage='validate')
+        ETL_ROWS.inc(len(result.valid), stage='validate')
+        if result.report['gaps']:
+            self.logger.warning(f"{result.report['gaps']} date gaps found, "
+                                f"first: {result.report['gap_list'][:3]}")
+
+        if not result.ok:
+            ETL_ROWS.inc(len(result.quarantine), stage='quarantine')
+            if quarantine_dir is not None:
+                write_quarantine(result.quarantine, quarantine_dir)
+            if quarantine_table is not None:
+                try:
+                    # raw values may not fit the price schema, keep them as text
+                    self.bigquery_client.load_dataframe(result.quarantine.astype(str), quarantine_table)
+                except Exception as e:
+                    self.logger.error(f"Error loading quarantined rows to {quarantine_table}: {e}")
+        return result.valid
+
+    def derive(self, df: pd.DataFrame, indicator_state=None, history_table: Optional[str] = None) -> pd.DataFrame:
+        """
+        Technical indicators stage: returns, moving averages, volatility and VWAP
+        Args:
+            df: Transformed price frame
+            indicator_state (IndicatorState, optional): Per-symbol trailing windows.
+                When given only the rows of df are computed, with the stored windows
+                as history, and the windows advance; otherwise df must hold the
+                full history it is computed from.
+            history_table (str, optional): Loaded price table the windows of symbols
+                the state has never seen are seeded from, through the sink
+
+        Returns:
+            Frame of symbol, date and indicator columns
+        """
+        from src.indicators import compute_indicators
+
+        start = time.perf_counter()
+        with self.metrics.span('derive', rows=len(df)):
+            if indicator_state is not None:
+                history = None
+                missing = indicator_state.missing(df['symbol'].astype(str).unique()) if history_table else []
+                if missing:
+                    # the table may already hold the rows of df, read enough to reach past them
+                    rows = indicator_state.window + int(df['symbol'].astype(str).value_counts().max())
+                    try:
+                        history = self.sink.read_tail(history_table, missing, rows)
+                    except NotImplementedError:
+                        self.logger.warning(f"{self.sink} cannot read back history, indicators of "
+                                            f"{len(missing)} new symbols start from their new rows")
+                features = indicator_state.update(df, history)
+            else:
+                features = compute_indicators(df)
+        ETL_STAGE_SECONDS.observe(time.perf_counter() - start, stage='derive')
+        ETL_ROWS.inc(len(features), stage='derive')
+        return features
+
+    def load(self, data, data_table, upsert: bool = False):
         """
-        Loads the data to BigQuery Cloud Storage
+        Loads the data into the configured sink, BigQuery by default
         Args:
             data (obj): Pandas DataFrame with stock data
             data_table (str): Table reference from os.get()
+            upsert (bool): MERGE on (symbol, date) through a staging table instead
+                of appending, so reruns don't duplicate rows
 
         Returns:
-            console logs successfully loaded data to BigQuery
+            True when the load succeeded, False otherwise
         """
+        start = time.perf_counter()
         try:
-            self.bigquery_client.load_dataframe(data, data_table)
-            print(f"Successfully loaded dataframe to BigQuery")
+            with self.metrics.span('load', table=data_table, rows=len(data)):
+                self.sink.write(data, data_table, upsert=upsert)
+            ETL_ROWS.inc(len(data), stage='load')
+            if self.run_id is not None:
+                self._journal_record(data['symbol'].unique().tolist(), 'load')
+            self.logger.info(f"Successfully loaded {len(data)} rows to {self.sink}")
+            return True
         except Exception as e:
-            self.logger.error(f"Error loading dataset to BigQuery {e}")
+            self.logger.error(f"Error loading dataset to {self.sink} {e}")
+            if self.run_id is not None:
+                self._journal_record(data['symbol'].unique().tolist(), 'load', 'failed', error=str(e))
+            return False
+        finally:
+            ETL_STAGE_SECONDS.observe(time.perf_counter() - start, stage='load')
+
+    def run_streaming(self,
+                      ticker_list: List[str],
+                      data_table: str,
+                      data_type: str = 'yearly',
+                      watermarks=None,
+                      max_workers: int = 4,
+                      batch_rows: int = 50_000,
+                      batch_bytes: int = 64 * 2**20,
+                      queue_size: int = 16,
+                      run_id: Optional[str] = None,
+                      features_table: Optional[str] = None,
+                      indicator_state=None,
+                      validate: bool = True,
+                      upsert: bool = False) -> Dict:
+        """
+        Stream tickers through extract -> transform -> load with bounded memory.
+        Extraction runs ahead on a background thread through a bounded queue,
+        each ticker is transformed as it arrives and rows are loaded in
+        micro-batches, so memory stays flat however large the universe is.
+        Args:
+            ticker_list: Ticker symbols to extract
+            data_table: Destination table
+            data_type: 'yearly', 'five_year' or 'historical', ignored when watermarks are given
+            watermarks: WatermarkStore/BigQueryWatermarkSource for incremental runs,
+                advanced after every successfully loaded batch
+            max_workers: Number of concurrent fetch threads
+            batch_rows: Flush a micro-batch at this many rows
+            batch_bytes: Flush a micro-batch at this many bytes of frame memory
+            queue_size: Extracted tickers allowed to wait for transform
+            run_id: Journaled run to resume, only used when the processor has a journal
+            features_table: Table to load the derived indicators of every batch into
+            indicator_state: IndicatorState carrying history between incremental runs,
+                required with features_table when watermarks are given
+            validate: Run the validation stage on every batch, quarantining bad rows
+            upsert: MERGE every batch instead of appending, for backfills over loaded dates
+
+        Returns:
+            dict with batch, row and failure counts, plus run_id and run_status when journaled
+        """
+        from src.streaming import MicroBatcher, prefetch
+
+        def flush(batch):
+            if validate:
+                batch = self.validate(batch)
+                if batch.empty:
+                    return True
+            if not self.load(batch, data_table, upsert=upsert):
+                return False
+            if watermarks is not None:
+                watermarks.update_from_frame(batch)
+            if features_table is not None:
+                self.load(self.derive(batch, indicator_state, data_table), features_table)
+            return True
+
+        if features_table is not None and watermarks is not None and indicator_state is None:
+            self.logger.error("An incremental run loading features needs an indicator_state")
+            raise ValueError("indicator_state is required with features_table and watermarks, the new rows "
+                             "alone are too short for the indicator windows")
+
+        self.start_run(ticker_list, run_id=run_id, data_type=data_type, table=data_table)
+
+        if watermarks is not None:
+            results = self.iter_extract_incremental(ticker_list, watermarks, max_workers=max_workers)
+        else:
+            results = self.iter_extract(ticker_list, data_type, max_workers=max_workers)
+
+        batcher = MicroBatcher(flush, max_rows=batch_rows, max_bytes=batch_bytes)
+        for ticker, data in prefetch(results, maxsize=queue_size):
+            if not data:
+                if data is not None:
+                    # an empty payload has nothing left to load
+                    self._journal_record(ticker, 'load', rows=0)
+                continue
+            try:
+                batcher.add(self.transform([data]))
+            except Exception as e:
+                self.logger.error(f"Skipping {ticker}, transform failed: {e}")
+                self._journal_record(ticker, 'transform', 'failed', error=str(e))
+                self._count('errors')
+        batcher.flush()
+
+        self.logger.info(f"Streaming run complete: {batcher.stats['rows_loaded']} rows loaded "
+                         f"in {batcher.stats['batches']} batches")
+        stats = dict(batcher.stats)
+        if self.run_id is not None:
+            stats['run_id'] = self.run_id
+            stats['run_status'] = self.finish_run()
+        return stats
+
+    def run_incremental(self,
+                        ticker_list: List[str],
+                        data_table: str,
+                        watermarks,
+                        lookback_days: int = 1825,
+                        end_date: Optional[date] = None,
+                        max_workers: int = 1,
+                        run_id: Optional[str] = None,
+                        features_table: Optional[str] = None,
+                        indicator_state=None,
+                        validate: bool = True):
+        """
+        Extract the dates missing since each ticker's watermark, load them and
+        advance the watermarks once the load has succeeded
+        Args:
+            ticker_list: Ticker symbols to extract
+            data_table: Destination table
+            watermarks: WatermarkStore or BigQueryWatermarkSource
+            lookback_days: History fetched for tickers that have never been loaded
+            end_date: Last date to fetch, defaults to today
+            max_workers: Number of concurrent fetch threads
+            run_id: Journaled run to resume, only used when the processor has a journal
+            features_table: Table to load the derived indicators of the new rows into
+            indicator_state: IndicatorState holding each symbol's trailing window,
+                required with features_table. Symbols it has no window for are
+                seeded from the tail of data_table.
+            validate: Run the validation stage before load, quarantining bad rows
+
+        Returns:
+            The loaded DataFrame, or None when there was nothing new to load
+        """
+        if features_table is not None and indicator_state is None:
+            self.logger.error("An incremental run loading features needs an indicator_state")
+            raise ValueError("indicator_state is required with features_table, the new rows alone "
+                             "are too short for the indicator windows")
+
+        self.start_run(ticker_list, run_id=run_id, table=data_table, lookback_days=lookback_days)
+        payloads = [data for _, data in self.iter_extract_incremental(
+            ticker_list, watermarks, lookback_days, end_date, max_workers=max_workers) if data]
+        if not payloads:
+            self.logger.info("All tickers are up to date, nothing to load")
+            self.finish_run()
+            return None
+
+        df = self.transform(payloads)
+        if validate:
+            df = self.validate(df)
+        if self.load(df, data_table):
+            watermarks.update_from_frame(df)
+            if features_table is not None:
+                self.load(self.derive(df, indicator_state, data_table), features_table)
+        self.finish_run()
+        return df
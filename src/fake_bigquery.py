@@ -0,0 +1,121 @@
+import io
+import itertools
+import logging
+import threading
+import time
+from typing import List, Optional
+
+import pandas as pd
+
+class FakeLoadJob:
+    def __init__(self, job_id: str, destination: str, rows: int, num_bytes: int,
+                 source_format: Optional[str], latency: float, error: Optional[Exception]):
+        self.job_id = job_id
+        self.destination = destination
+        self.output_rows = rows
+        self.input_file_bytes = num_bytes
+        self.source_format = source_format
+        self.latency = latency
+        self.error = error
+        self.created = time.monotonic()
+        self.state = 'RUNNING'
+
+    def done(self) -> bool:
+        if self.state == 'RUNNING' and time.monotonic() - self.created >= self.latency:
+            self.state = 'DONE'
+        return self.state == 'DONE'
+
+    def result(self, timeout: Optional[float] = None):
+        remaining = self.latency - (time.monotonic() - self.created)
+        if remaining > 0:
+            time.sleep(remaining)
+        self.state = 'DONE'
+        if self.error is not None:
+            raise self.error
+        return self
+
+
+class FakeQueryJob:
+    def __init__(self, job_id: str, sql: str, rows: Optional[list] = None):
+        self.job_id = job_id
+        self.query = sql
+        self.rows = rows or []
+        self.total_bytes_processed = 0
+        self.total_bytes_billed = 0
+        self.num_dml_affected_rows = None
+        self.dml_stats = None
+        self.state = 'DONE'
+
+    def done(self) -> bool:
+        return True
+
+    def result(self, *args, **kwargs):
+        return iter(self.rows)
+
+
+class FakeBigQueryClient:
+    def __init__(self, project: str = "local-project", job_latency: float = 0.0, fail_every: int = 0):
+        """
+        In-memory stand-in for google.cloud.bigquery.Client that records every
+        load job and keeps the loaded rows per table, for local runs and benchmarks
+        Args:
+            project (str): Project id reported by the client
+            job_latency (float): Seconds each load job takes to finish
+            fail_every (int): Fail every Nth load job with a GoogleAPIError, 0 never fails
+        """
+        self.project = project
+        self.job_latency = job_latency
+        self.fail_every = fail_every
+        self.jobs: List[FakeLoadJob] = []
+        self.queries: List[FakeQueryJob] = []
+        self.deleted_tables: List[str] = []
+        self.tables = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def _record(self, destination, frame: pd.DataFrame, num_bytes: int, source_format) -> FakeLoadJob:
+        from google.api_core.exceptions import InternalServerError
+
+        with self._lock:
+            number = next(self._ids)
+            error = None
+            if self.fail_every and number % self.fail_every == 0:
+                error = InternalServerError(f"fake failure for job {number}")
+            else:
+                self.tables.setdefault(str(destination), []).append(frame)
+            job = FakeLoadJob(f"fake_job_{number}", str(destination), len(frame), num_bytes,
+                              source_format, self.job_latency, error)
+            self.jobs.append(job)
+        return job
+
+    def load_table_from_dataframe(self, dataframe, destination, job_config=None):
+        return self._record(destination, dataframe.copy(),
+                            int(dataframe.memory_usage(index=False, deep=True).sum()),
+                            getattr(job_config, 'source_format', None))
+
+    def load_table_from_file(self, file_obj, destination, job_config=None, **kwargs):
+        payload = file_obj.read()
+        source_format = getattr(job_config, 'source_format', None)
+        if source_format == 'CSV':
+            frame = pd.read_csv(io.BytesIO(payload))
+        else:
+            frame = pd.read_parquet(io.BytesIO(payload))
+        return self._record(destination, frame, len(payload), source_format)
+
+    def query(self, sql: str, job_config=None, **kwargs) -> FakeQueryJob:
+        """Records the SQL, returns a finished job with no rows"""
+        with self._lock:
+            job = FakeQueryJob(f"fake_query_{next(self._ids)}", sql)
+            self.queries.append(job)
+        return job
+
+    def delete_table(self, table, not_found_ok: bool = False):
+        with self._lock:
+            self.tables.pop(str(table), None)
+            self.deleted_tables.append(str(table))
+
+    def table_frame(self, destination: str) -> pd.DataFrame:
+        """Everything loaded into a table so far as one DataFrame"""
+        frames = self.tables.get(str(destination), [])
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
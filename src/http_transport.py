@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+from src.metrics import get_registry
+
+HTTP_REQUEST_SECONDS = get_registry().histogram(
+    'http_request_seconds', 'HTTP request latency including body download', ('host', 'status'))
+HTTP_RESPONSE_BYTES = get_registry().counter(
+    'http_response_bytes_total', 'Decoded response body bytes', ('host',))
+
+# gzip/deflate always, br (and zstd) only when urllib3 can decode them in this environment
+ACCEPT_ENCODING = make_headers(accept_encoding=True)['accept-encoding']
+
+class HttpTransport:
+    def __init__(self,
+                 pool_connections: int = 10,
+                 pool_maxsize: int = 10,
+                 max_per_host: Optional[int] = None,
+                 host_limits: Optional[Dict[str, int]] = None,
+                 headers: Optional[Dict[str, str]] = None):
+        """
+        Pooled keep-alive HTTP session shared by the API connectors
+        Args:
+            pool_connections (int): Number of per-host connection pools to keep
+            pool_maxsize (int): Connections kept alive in each host pool
+            max_per_host (int, optional): Concurrent requests allowed per host, defaults to pool_maxsize
+            host_limits (dict, optional): Per-host overrides of max_per_host, keyed by host name
+            headers (dict, optional): Extra headers sent with every request
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_per_host = max_per_host or pool_maxsize
+        self.host_limits = host_limits or {}
+
+        # pool_block keeps the number of open sockets per host at pool_maxsize
+        self.adapter = HTTPAdapter(pool_connections=pool_connections,
+                                   pool_maxsize=pool_maxsize,
+                                   pool_block=True)
+        self.session = requests.Session()
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self.session.headers.update({'Accept-Encoding': ACCEPT_ENCODING,
+                                     'Connection': 'keep-alive'})
+        if headers:
+            self.session.headers.update(headers)
+
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self.requests_sent = 0
+        self.bytes_received = 0
+        self.total_latency = 0.0
+
+    @contextmanager
+    def _host_slot(self, host: str):
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.host_limits.get(host, self.max_per_host))
+                self._host_slots[host] = slot
+        with slot:
+            yield
+
+    def get(self, url: str, params: Optional[dict] = None, timeout: float = 10, **kwargs) -> requests.Response:
+        """
+        Send a GET request over the pooled session
+        Returns:
+            requests.Response, raises requests.RequestException like requests.get
+        """
+        host = urlsplit(url).netloc
+        with self._host_slot(host):
+            start = time.perf_counter()
+            res = self.session.get(url, params=params, timeout=timeout, **kwargs)
+            elapsed = time.perf_counter() - start
+
+        size = len(res.content)
+        with self._lock:
+            self.requests_sent += 1
+            self.bytes_received += size
+            self.total_latency += elapsed
+        HTTP_REQUEST_SECONDS.observe(elapsed, host=host, status=res.status_code)
+        HTTP_RESPONSE_BYTES.inc(size, host=host)
+        return res
+
+    def _new_connections(self) -> int:
+        pools = self.adapter.poolmanager.pools
+        total = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                total += pool.num_connections
+        return total
+
+    def stats(self) -> dict:
+        """
+        Connection reuse statistics for the pools still held by the session
+        Returns:
+            dict with requests, new_connections, reuse_rate, bytes_received, avg_latency
+        """
+        with self._lock:
+            sent = self.requests_sent
+            received = self.bytes_received
+            latency = self.total_latency
+        new_connections = self._new_connections()
+        return {
+            'requests': sent,
+            'new_connections': new_connections,
+            'reuse_rate': (1 - new_connections / sent) if sent else 0.0,
+            'bytes_received': received,
+            'avg_latency': (latency / sent) if sent else 0.0,
+        }
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncHttpTransport:
+    def __init__(self,
+                 max_connections: int = 10,
+                 max_keepalive_connections: int = 10,
+                 keepalive_expiry: float = 30.0,
+                 max_per_host: Optional[int] = None,
+                 host_limits: Optional[Dict[str, int]] = None,
+                 headers: Optional[Dict[str, str]] = None):
+        """
+        asyncio counterpart of HttpTransport built on an httpx.AsyncClient
+        Args:
+            max_connections (int): Total connections across all hosts
+            max_keepalive_connections (int): Idle connections kept open for reuse
+            keepalive_expiry (float): Seconds an idle connection is kept
+            max_per_host (int, optional): Concurrent requests allowed per host, defaults to max_connections
+            host_limits (dict, optional): Per-host overrides of max_per_host
+            headers (dict, optional): Extra headers sent with every request
+        """
+        import httpx
+
+        self.logger = logging.getLogger(__name__)
+        self.max_per_host = max_per_host or max_connections
+        self.host_limits = host_limits or {}
+        limits = httpx.Limits(max_connections=max_connections,
+                              max_keepalive_connections=max_keepalive_connections,
+                              keepalive_expiry=keepalive_expiry)
+        self.client = httpx.AsyncClient(limits=limits,
+                                        headers={'Accept-Encoding': ACCEPT_ENCODING, **(headers or {})})
+
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self.requests_sent = 0
+        self.new_connections = 0
+        self.bytes_received = 0
+        self.total_latency = 0.0
+
+    async def _trace(self, event_name: str, info: dict):
+        # httpcore emits this once per freshly opened socket, never for a reused one
+        if event_name == 'connection.connect_tcp.complete':
+            self.new_connections += 1
+
+    async def get(self, url: str, params: Optional[dict] = None, timeout: float = 10, **kwargs):
+        """
+        Send a GET request over the pooled async client
+        Returns:
+            httpx.Response
+        """
+        host = urlsplit(url).netloc
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = asyncio.Semaphore(self.host_limits.get(host, self.max_per_host))
+            self._host_slots[host] = slot
+
+        async with slot:
+            start = time.perf_counter()
+            res = await self.client.get(url, params=params, timeout=timeout,
+                                        extensions={'trace': self._trace}, **kwargs)
+            elapsed = time.perf_counter() - start
+
+        size = len(res.content)
+        self.requests_sent += 1
+        self.bytes_received += size
+        self.total_latency += elapsed
+        HTTP_REQUEST_SECONDS.observe(elapsed, host=host, status=res.status_code)
+        HTTP_RESPONSE_BYTES.inc(size, host=host)
+        return res
+
+    def stats(self) -> dict:
+        """Connection reuse statistics, same keys as HttpTransport.stats"""
+        sent = self.requests_sent
+        return {
+            'requests': sent,
+            'new_connections': self.new_connections,
+            'reuse_rate': (1 - self.new_connections / sent) if sent else 0.0,
+            'bytes_received': self.bytes_received,
+            'avg_latency': (self.total_latency / sent) if sent else 0.0,
+        }
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_default_transport: Optional[HttpTransport] = None
+_default_lock = threading.Lock()
+
+def get_default_transport() -> HttpTransport:
+    """Process-wide transport used by connectors that are not given one"""
+    global _default_transport
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = HttpTransport()
+        return _default_transport
@@ -0,0 +1,213 @@
+import logging
+import os
+import sqlite3
+import threading
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# columns a trailing window needs to carry, everything else is derived from them
+BASE_COLUMNS = ('symbol', 'date', 'high', 'low', 'close', 'volume')
+
+def _group_starts(codes: np.ndarray) -> np.ndarray:
+    """Index of the first row of each row's group, rows sorted by group"""
+    n = len(codes)
+    change = np.empty(n, dtype=bool)
+    if n:
+        change[0] = True
+        change[1:] = codes[1:] != codes[:-1]
+    first_rows = np.flatnonzero(change)
+    return first_rows[np.cumsum(change) - 1]
+
+def _rolling_sum(values: np.ndarray, row_start: np.ndarray, window: int) -> np.ndarray:
+    """
+    Trailing `window` sum per group for every row at once, from one cumulative
+    sum over the whole column. Rows with less than a full window of history in
+    their group, or a NaN inside the window, are NaN.
+    """
+    n = len(values)
+    missing = np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(missing, 0.0, values))))
+    gaps = np.concatenate(([0], np.cumsum(missing)))
+    end = np.arange(1, n + 1)
+    begin = end - window
+    clipped = np.maximum(begin, 0)
+    out = sums[end] - sums[clipped]
+    out[(begin < row_start) | (gaps[end] - gaps[clipped] > 0)] = np.nan
+    return out
+
+def compute_indicators(df: pd.DataFrame,
+                       ma_windows: Sequence[int] = (5, 20, 50),
+                       vol_window: int = 20) -> pd.DataFrame:
+    """
+    Returns, moving averages, rolling volatility and rolling VWAP for every
+    symbol at once. Windows are evaluated on whole columns grouped by symbol,
+    there is no per-ticker loop.
+    Args:
+        df: Price frame with symbol, date, high, low, close and volume
+        ma_windows: Simple moving average windows of close, in rows (trading days)
+        vol_window: Window of the log-return volatility and of the VWAP
+
+    Returns:
+        symbol, date and the indicator columns, sorted by symbol and date:
+        return_1d, log_return, sma_<w>, volatility_<vol_window>, vwap_<vol_window>
+    """
+    frame = df.loc[:, list(BASE_COLUMNS)].sort_values(['symbol', 'date'], kind='stable')
+    symbols = frame['symbol'].astype(str).to_numpy()
+    codes = pd.factorize(symbols)[0]
+    row_start = _group_starts(codes)
+    first = np.arange(len(frame)) == row_start
+
+    close = frame['close'].to_numpy(dtype='float64')
+    high = frame['high'].to_numpy(dtype='float64')
+    low = frame['low'].to_numpy(dtype='float64')
+    volume = frame['volume'].to_numpy(dtype='float64')
+
+    prev_close = np.empty_like(close)
+    prev_close[1:] = close[:-1]
+    prev_close[first] = np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        simple_return = close / prev_close - 1
+        log_return = np.log(close / prev_close)
+
+    out = {'symbol': frame['symbol'].to_numpy(),
+           'date': frame['date'].to_numpy(),
+           'return_1d': simple_return,
+           'log_return': log_return}
+
+    for window in ma_windows:
+        out[f'sma_{window}'] = _rolling_sum(close, row_start, window) / window
+
+    # a return needs the previous close, so its groups effectively start one row later
+    return_start = np.minimum(row_start + 1, len(close))
+    s1 = _rolling_sum(log_return, return_start, vol_window)
+    s2 = _rolling_sum(log_return * log_return, return_start, vol_window)
+    variance = np.maximum((s2 - s1 * s1 / vol_window) / (vol_window - 1), 0.0)
+    out[f'volatility_{vol_window}'] = np.sqrt(variance)
+
+    typical = (high + low + close) / 3
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[f'vwap_{vol_window}'] = (_rolling_sum(typical * volume, row_start, vol_window)
+                                     / _rolling_sum(volume, row_start, vol_window))
+
+    return pd.DataFrame(out, copy=False)
+
+
+class IndicatorState:
+    def __init__(self,
+                 path: str = ".state/indicators.sqlite",
+                 ma_windows: Sequence[int] = (5, 20, 50),
+                 vol_window: int = 20):
+        """
+        Trailing window of prices per symbol, so a daily run computes indicators
+        for its new rows from the window instead of the full history
+        Args:
+            path (str): SQLite database file, ':memory:' for a throwaway state
+            ma_windows: Moving average windows, as in compute_indicators
+            vol_window: Volatility and VWAP window, as in compute_indicators
+        """
+        self.path = path
+        self.ma_windows = tuple(ma_windows)
+        self.vol_window = vol_window
+        # the volatility window needs vol_window returns, so one more close
+        self.window = max(max(self.ma_windows), vol_window + 1)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS indicator_tail ("
+            " symbol TEXT NOT NULL,"
+            " date TEXT NOT NULL,"
+            " high REAL, low REAL, close REAL, volume REAL,"
+            " PRIMARY KEY (symbol, date))"
+        )
+        self._conn.commit()
+
+    def tail(self, symbols: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Stored trailing rows, for the given symbols when provided"""
+        query = "SELECT symbol, date, high, low, close, volume FROM indicator_tail"
+        params: list = []
+        if symbols is not None:
+            symbols = list(symbols)
+            if not symbols:
+                return pd.DataFrame(columns=list(BASE_COLUMNS))
+            query += f" WHERE symbol IN ({','.join('?' * len(symbols))})"
+            params = symbols
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        tail = pd.DataFrame(rows, columns=list(BASE_COLUMNS))
+        tail['date'] = pd.to_datetime(tail['date'])
+        return tail
+
+    def missing(self, symbols: Sequence[str]) -> list:
+        """Symbols with no stored window, whose history has to come from elsewhere"""
+        symbols = [str(symbol) for symbol in dict.fromkeys(symbols)]
+        if not symbols:
+            return []
+        with self._lock:
+            stored = {row[0] for row in self._conn.execute(
+                f"SELECT DISTINCT symbol FROM indicator_tail WHERE symbol IN ({','.join('?' * len(symbols))})",
+                symbols)}
+        return [symbol for symbol in symbols if symbol not in stored]
+
+    def _save_tail(self, frame: pd.DataFrame):
+        symbols = frame['symbol'].astype(str).unique().tolist()
+        rows = list(zip(frame['symbol'].astype(str),
+                        frame['date'].dt.strftime('%Y-%m-%d'),
+                        frame['high'].astype('float64'),
+                        frame['low'].astype('float64'),
+                        frame['close'].astype('float64'),
+                        frame['volume'].astype('float64')))
+        with self._lock:
+            self._conn.executemany("DELETE FROM indicator_tail WHERE symbol = ?", [(s,) for s in symbols])
+            self._conn.executemany("INSERT INTO indicator_tail VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def update(self, df: pd.DataFrame, history: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """
+        Indicators for the rows of df, using the stored window of each symbol as
+        history, then advance the windows. Cost is O(new rows + symbols x window).
+        Rows of df replace stored rows of the same symbol and date.
+        Args:
+            df: New price rows
+            history: Earlier rows of symbols with no stored window yet, e.g. the
+                tail of the loaded table; rows of df take precedence over them
+        Returns:
+            compute_indicators output for the rows of df only
+        """
+        if df is None or df.empty:
+            return compute_indicators(pd.DataFrame(columns=list(BASE_COLUMNS)),
+                                      self.ma_windows, self.vol_window)
+
+        new = df.loc[:, list(BASE_COLUMNS)].copy()
+        new['symbol'] = new['symbol'].astype(str)
+        new['date'] = pd.to_datetime(new['date'])
+        new['_new'] = True
+        stored = self.tail(new['symbol'].unique().tolist())
+        if history is not None and len(history):
+            history = history.loc[:, list(BASE_COLUMNS)].assign(symbol=lambda h: h['symbol'].astype(str),
+                                                                 date=lambda h: pd.to_datetime(h['date']))
+            stored = pd.concat([history, stored], ignore_index=True) if len(stored) else history
+        history = stored
+        history['_new'] = False
+
+        combined = pd.concat([history, new], ignore_index=True) if len(history) else new
+        combined = (combined.drop_duplicates(['symbol', 'date'], keep='last')
+                            .sort_values(['symbol', 'date'], kind='stable')
+                            .reset_index(drop=True))
+
+        indicators = compute_indicators(combined, self.ma_windows, self.vol_window)
+        # compute_indicators keeps the (symbol, date) order combined already has
+        result = indicators[combined['_new'].to_numpy()].reset_index(drop=True)
+
+        self._save_tail(combined.groupby('symbol', sort=False).tail(self.window))
+        self.logger.info(f"Computed indicators for {len(result)} new rows "
+                         f"with {len(history)} rows of carried history")
+        return result
+
+    def close(self):
+        self._conn.close()
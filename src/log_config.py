@@ -0,0 +1,208 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+# run_id, ticker, ... of the code being executed, attached to every record it logs
+_context: contextvars.ContextVar[Dict[str, str]] = contextvars.ContextVar('log_context', default={})
+
+# attributes every LogRecord has, anything else was passed through `extra=`
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_listener: Optional[QueueListener] = None
+_sampler: Optional["SamplingFilter"] = None
+_configured_pid: Optional[int] = None
+_configure_lock = threading.Lock()
+
+@contextmanager
+def log_context(**fields):
+    """
+    Attach fields (run_id, ticker, ...) to every record logged inside the block
+    by this thread or task. Worker threads do not inherit the context, enter
+    it in the function the thread runs.
+    """
+    token = _context.set({**_context.get(), **{k: v for k, v in fields.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+def set_context(**fields):
+    """
+    Add fields to the log context of the current thread until changed again,
+    for state that outlives one block such as an open run. None removes a field.
+    """
+    context = {**_context.get(), **fields}
+    _context.set({k: v for k, v in context.items() if v is not None})
+
+
+class ContextFilter(logging.Filter):
+    """Copies the log context onto the record, in the thread that logged it"""
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, rate: float = 20.0, burst: int = 100):
+        """
+        Rate limit for per-ticker chatter: records below WARNING that carry a
+        ticker pass at `rate` per second per logger after a burst of `burst`,
+        the rest are dropped and counted. Warnings and errors always pass.
+        Args:
+            rate (float): Records per second let through per logger, 0 drops them all
+            burst (int): Records let through at once before the rate applies
+        """
+        super().__init__()
+        self.rate = rate
+        self.burst = float(burst)
+        self.dropped = 0
+        self._buckets: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not hasattr(record, 'ticker'):
+            return True
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.setdefault(record.name, [self.burst, now])
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True
+            self.dropped += 1
+            return False
+
+
+class _QueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Only merge the message and its arguments before the record crosses threads.
+        The stock prepare formats the whole record and copies it in the logging
+        thread, which is the listener's work.
+        """
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, context and extra fields"""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+                 'level': record.levelname,
+                 'logger': record.name,
+                 'msg': record.getMessage()}
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: str = 'INFO',
+                      json_format: bool = True,
+                      log_file: Optional[str] = None,
+                      stream=None,
+                      sample_rate: Optional[float] = 20.0,
+                      sample_burst: int = 100,
+                      force: bool = False) -> QueueListener:
+    """
+    Configure logging for the whole process, once. Loggers only put records on
+    an in-memory queue; a background thread formats them and writes them to
+    stderr (and log_file), so slow disks or terminals never stall the pipeline.
+    Calling it again in the same process is a no-op unless force is set.
+    Args:
+        level (str): Root level
+        json_format (bool): One JSON object per line, human readable text otherwise
+        log_file (str, optional): Also append records to this file
+        stream: Text stream for the console handler, stderr by default
+        sample_rate (float, optional): Per-ticker records per second and logger, see
+            SamplingFilter; None keeps every record
+        sample_burst (int): Per-ticker records let through at once before sampling
+        force (bool): Replace an existing configuration
+
+    Returns:
+        The running QueueListener
+    """
+    global _listener, _sampler, _configured_pid
+    with _configure_lock:
+        if _listener is not None and _configured_pid != os.getpid():
+            # inherited through fork, its writer thread only runs in the parent
+            _listener = None
+        if _listener is not None and not force:
+            return _listener
+        _stop_listener()
+
+        if json_format:
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        handlers = [logging.StreamHandler(stream if stream is not None else sys.stderr)]
+        if log_file:
+            handlers.append(logging.FileHandler(log_file))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        # the logging thread only merges the message and enqueues, the listener formats
+        queue_handler = _QueueHandler(log_queue)
+        queue_handler.addFilter(ContextFilter())
+        _sampler = SamplingFilter(sample_rate, sample_burst) if sample_rate is not None else None
+        if _sampler is not None:
+            queue_handler.addFilter(_sampler)
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+            handler.close()
+        root.addHandler(queue_handler)
+        root.setLevel(level.upper() if isinstance(level, str) else level)
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        _configured_pid = os.getpid()
+        return _listener
+
+def sampled_out() -> int:
+    """Per-ticker records dropped by sampling since logging was configured"""
+    return _sampler.dropped if _sampler is not None else 0
+
+def _stop_listener():
+    global _listener, _sampler
+    if _listener is not None:
+        if sampled_out():
+            # queued ahead of the listener's stop sentinel, so it is still written
+            logging.getLogger(__name__).info(f"Sampled out {sampled_out()} per-ticker log records")
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+        _sampler = None
+
+def shutdown_logging():
+    """Write out every queued record and stop the background writer"""
+    global _configured_pid
+    with _configure_lock:
+        _stop_listener()
+        _configured_pid = None
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,258 @@
+import bisect
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# latency buckets in seconds, from sub-millisecond decode times up to slow load jobs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def _label_text(self, key: Tuple[str, ...], extra: str = '') -> str:
+        pairs = [f'{name}="{value}"' for name, value in zip(self.label_names, key) if value != '']
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name, help_text, label_names=()):
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def snapshot(self) -> List[dict]:
+        with self._lock:
+            items = list(self._values.items())
+        return [{'labels': dict(zip(self.label_names, key)), 'value': value} for key, value in items]
+
+    def prometheus(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{self._label_text(key)} {value}" for key, value in items]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, label_names=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # per label key: [bucket counts..., +Inf count], sum, count
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def _quantile(self, counts: List[int], total: int, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation"""
+        rank = q * total
+        seen = 0
+        for bound, count in zip(self.buckets, counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self) -> List[dict]:
+        with self._lock:
+            items = [(key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items()]
+        out = []
+        for key, (counts, total_sum, count) in items:
+            out.append({
+                'labels': dict(zip(self.label_names, key)),
+                'count': count,
+                'sum': total_sum,
+                'mean': total_sum / count if count else 0.0,
+                'p50': self._quantile(counts, count, 0.50),
+                'p95': self._quantile(counts, count, 0.95),
+                'p99': self._quantile(counts, count, 0.99),
+            })
+        return out
+
+    def prometheus(self) -> List[str]:
+        with self._lock:
+            items = [(key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items()]
+        lines = []
+        for key, (counts, total_sum, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{self._label_text(key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{self._label_text(key, le)} {count}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {total_sum}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self, tracing: bool = False, max_spans: int = 100_000):
+        """
+        Process-wide collection of counters, histograms and optional spans
+        Args:
+            tracing (bool): Record a span per instrumented operation
+            max_spans (int): Spans kept before new ones are dropped
+        """
+        self.tracing = tracing
+        self.max_spans = max_spans
+        self.started_at = time.time()
+        self._metrics: Dict[str, _Metric] = {}
+        self._spans: List[dict] = []
+        self._dropped_spans = 0
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text, label_names, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, label_names, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, label_names)
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, label_names, buckets=buckets)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """
+        Time an operation as a span nested under the current one. A no-op
+        unless tracing is enabled, so it is safe to leave in hot paths.
+        """
+        if not self.tracing:
+            yield None
+            return
+
+        parent = _current_span.get()
+        span = {'name': name, 'parent': parent['id'] if parent else None,
+                'id': f"{threading.get_ident():x}-{time.perf_counter_ns():x}",
+                'start': time.time(), 'attributes': attributes}
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span['error'] = repr(e)
+            raise
+        finally:
+            span['duration'] = time.perf_counter() - start
+            _current_span.reset(token)
+            with self._lock:
+                if len(self._spans) < self.max_spans:
+                    self._spans.append(span)
+                else:
+                    self._dropped_spans += 1
+
+    def reset(self):
+        """Zero every metric and drop recorded spans, metric objects stay registered"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            self._spans = []
+            self._dropped_spans = 0
+            self.started_at = time.time()
+        for metric in metrics:
+            metric.reset()
+
+    def report(self) -> dict:
+        """Run report with every metric's current values and the recorded spans"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            spans = list(self._spans)
+            dropped = self._dropped_spans
+        return {
+            'started_at': self.started_at,
+            'generated_at': time.time(),
+            'metrics': {metric.name: {'type': metric.kind, 'help': metric.help,
+                                      'values': metric.snapshot()} for metric in metrics},
+            'spans': spans,
+            'dropped_spans': dropped,
+        }
+
+    def to_json(self, path: Optional[str] = None) -> str:
+        """Serialize the run report, writing it to path when given"""
+        text = json.dumps(self.report(), indent=2, default=str)
+        if path:
+            with open(path, 'w') as f:
+                f.write(text + '\n')
+        return text
+
+    def write(self, path: str):
+        """Write the run report to path, in Prometheus text format for a .prom file, JSON otherwise"""
+        if path.endswith('.prom'):
+            with open(path, 'w') as f:
+                f.write(self.to_prometheus())
+        else:
+            self.to_json(path)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.prometheus())
+        return '\n'.join(lines) + '\n'
+
+
+_registry = MetricsRegistry()
+
+def get_registry() -> MetricsRegistry:
+    """The process-wide registry every component records into"""
+    return _registry
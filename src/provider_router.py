@@ -0,0 +1,226 @@
+import logging
+import threading
+import time
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.columnar import ColumnarBatch, as_batch
+from src.metrics import get_registry
+from src.retry_policy import CircuitBreaker, FailureKind, ProviderError, classify_exception
+
+ROUTED_REQUESTS = get_registry().counter(
+    'provider_routed_requests_total', 'Ticker fetches sent through the provider router', ('provider', 'outcome'))
+ROUTER_FAILOVERS = get_registry().counter(
+    'provider_failovers_total', 'Ticker fetches handed to the next provider after a failure', ('provider',))
+
+# Alpha Vantage daily fields and the FMP fields they become
+ALPHA_FIELDS = (('open', '1. open'), ('high', '2. high'), ('low', '3. low'), ('close', '4. close'))
+# compact returns the last 100 trading days, roughly this many calendar days
+ALPHA_COMPACT_ROWS = 100
+ALPHA_COMPACT_DAYS = 140
+
+def normalize_alpha_daily(data: dict, symbol: str, start_date=None, end_date=None,
+                          days: Optional[int] = None) -> ColumnarBatch:
+    """
+    Alpha Vantage TIME_SERIES_DAILY payload as FMP historical rows: same field
+    names and dtypes, newest first, change and changePercent derived from open
+    and close like FMP's, vwap (not provided) left NaN
+    Args:
+        data: Decoded TIME_SERIES_DAILY response
+        symbol: Ticker the payload belongs to
+        start_date, end_date (date or str, optional): Inclusive date range to keep
+        days (int, optional): Keep the newest `days` trading days (rows) instead,
+            like FMP's timeseries parameter
+
+    Returns:
+        ColumnarBatch with symbol, date, open, high, low, close, volume, change,
+        changePercent and vwap
+    Raises:
+        ProviderError: If the payload has no daily series (permanent)
+    """
+    series = data.get('Time Series (Daily)') if isinstance(data, dict) else None
+    if series is None:
+        raise ProviderError(f"{symbol}: no daily series in Alpha Vantage payload",
+                            provider='alpha_vantage', kind=FailureKind.PERMANENT)
+    first = str(start_date)[:10] if start_date is not None else ''
+    last = str(end_date)[:10] if end_date is not None else '9999-12-31'
+    # ISO dates compare as strings, sorted newest first like FMP
+    dates = sorted((day for day in series if first <= day <= last), reverse=True)
+    if days is not None:
+        dates = dates[:days]
+    n = len(dates)
+
+    columns = {'symbol': np.full(n, symbol, dtype=object),
+               'date': np.array(dates, dtype='datetime64[ns]')}
+    for field, key in ALPHA_FIELDS:
+        columns[field] = np.fromiter((float(series[day][key]) for day in dates), dtype='float64', count=n)
+    columns['volume'] = np.fromiter((int(float(series[day]['5. volume'])) for day in dates),
+                                    dtype='int64', count=n)
+    columns['change'] = columns['close'] - columns['open']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        columns['changePercent'] = columns['change'] / columns['open'] * 100
+    columns['vwap'] = np.full(n, np.nan)
+    return ColumnarBatch(columns)
+
+
+class FMPProvider:
+    name = 'fmp'
+
+    def __init__(self, client):
+        """
+        Router adapter for FMPClient
+        Args:
+            client (FMPClient): Client the fetches go through
+        """
+        self.client = client
+        self.limiter = client.rate_limiter
+        self.breaker = client.retry_policy.breaker
+
+    def fetch(self, symbol: str, start_date=None, end_date=None, days: Optional[int] = None) -> ColumnarBatch:
+        if days is not None:
+            return as_batch(self.client.get_timeseries(symbol, days))
+        return as_batch(self.client.get_historical_data(symbol, start_date, end_date))
+
+
+class AlphaVantageProvider:
+    name = 'alpha_vantage'
+
+    def __init__(self, client):
+        """
+        Router adapter for AlphaAdvantage, normalizing its payloads to the FMP schema
+        Args:
+            client (AlphaAdvantage): Client the fetches go through
+        """
+        self.client = client
+        self.limiter = client.rate_limiter
+        self.breaker = client.retry_policy.breaker
+
+    def fetch(self, symbol: str, start_date=None, end_date=None, days: Optional[int] = None) -> ColumnarBatch:
+        # compact is one small response, full is only needed past the last 100 trading days
+        if days is not None:
+            recent = days <= ALPHA_COMPACT_ROWS
+        else:
+            recent = start_date is not None and (
+                date.today() - date.fromisoformat(str(start_date)[:10])).days <= ALPHA_COMPACT_DAYS
+        data = self.client.get_stock_data(symbol, {'outputsize': 'compact' if recent else 'full'})
+        return normalize_alpha_daily(data, symbol, start_date, end_date, days)
+
+
+class ProviderRouter:
+    def __init__(self,
+                 providers: List,
+                 latency_smoothing: float = 0.2,
+                 quota_cooldown: float = 60.0):
+        """
+        Spreads ticker fetches over several price providers and fails over per
+        ticker. Every fetch goes to the provider expected to answer first: the
+        wait for a token from its rate limiter, counting the fetches already in
+        flight, plus its observed latency (rate-limit waits included). Providers with an open circuit or a
+        recent quota error are skipped while another one is usable.
+        Clients behind the router should use RetryPolicy(retry_quota=False), so
+        a throttled provider hands the ticker over instead of sleeping.
+        Has the fetch methods of FMPClient, so ETLProcessor can use it in its place.
+        Args:
+            providers: FMPProvider/AlphaVantageProvider adapters, in order of preference on a tie
+            latency_smoothing (float): Weight of the newest sample in the latency average
+            quota_cooldown (float): Seconds a provider is skipped after a quota error
+        """
+        if not providers:
+            raise ValueError("At least one provider is required")
+        self.providers = list(providers)
+        self.latency_smoothing = latency_smoothing
+        self.quota_cooldown = quota_cooldown
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._latency: Dict[str, Optional[float]] = {p.name: None for p in self.providers}
+        self._in_flight: Dict[str, int] = {p.name: 0 for p in self.providers}
+        self._cooldown_until: Dict[str, float] = {p.name: 0.0 for p in self.providers}
+        self.counts: Dict[str, Dict[str, int]] = {p.name: {'ok': 0, 'failed': 0} for p in self.providers}
+
+    def _expected_seconds(self, provider) -> float:
+        """Seconds until this provider would have answered one more fetch"""
+        limiter = provider.limiter
+        missing = self._in_flight[provider.name] + 1 - limiter.available
+        wait = max(0.0, missing) / limiter.refill_rate
+        return wait + (self._latency[provider.name] or 0.0)
+
+    def _usable(self, provider, now: float) -> bool:
+        breaker_open = provider.breaker.state == CircuitBreaker.OPEN and provider.breaker.retry_in() > 0
+        return not breaker_open and now >= self._cooldown_until[provider.name]
+
+    def ranked(self) -> List:
+        """Providers in the order the next fetch would try them"""
+        now = time.monotonic()
+        with self._lock:
+            scored = [(not self._usable(p, now), self._expected_seconds(p), i, p)
+                      for i, p in enumerate(self.providers)]
+        return [p for *_, p in sorted(scored, key=lambda item: item[:3])]
+
+    def _record(self, provider, seconds: Optional[float] = None, kind: Optional[str] = None):
+        """Account for a finished fetch: its latency on success, its failure kind otherwise"""
+        with self._lock:
+            self._in_flight[provider.name] -= 1
+            if kind is None:
+                previous = self._latency[provider.name]
+                self._latency[provider.name] = seconds if previous is None else (
+                    previous + self.latency_smoothing * (seconds - previous))
+                self.counts[provider.name]['ok'] += 1
+            else:
+                self.counts[provider.name]['failed'] += 1
+                if kind == FailureKind.QUOTA:
+                    self._cooldown_until[provider.name] = time.monotonic() + self.quota_cooldown
+
+    def fetch(self, symbol: str, start_date=None, end_date=None, days: Optional[int] = None) -> ColumnarBatch:
+        """
+        Daily rows of one ticker from the best provider, the next one on failure
+        Args:
+            symbol (str): Stock ticker symbol
+            start_date, end_date (date or str, optional): Inclusive date range,
+                the full history a provider has when omitted
+            days (int, optional): The newest `days` trading days instead of a date range
+
+        Returns:
+            ColumnarBatch in the FMP schema
+        Raises:
+            ProviderError: The last provider's error when every provider failed
+        """
+        ranked = self.ranked()
+        last_error = None
+        for i, provider in enumerate(ranked):
+            with self._lock:
+                self._in_flight[provider.name] += 1
+            start = time.perf_counter()
+            try:
+                batch = provider.fetch(symbol, start_date, end_date, days)
+            except Exception as e:
+                kind = e.kind if isinstance(e, ProviderError) else classify_exception(e)[0]
+                self._record(provider, kind=kind)
+                ROUTED_REQUESTS.inc(provider=provider.name, outcome=kind)
+                last_error = e
+                if i + 1 < len(ranked):
+                    ROUTER_FAILOVERS.inc(provider=provider.name)
+                    self.logger.warning(f"{provider.name} failed for {symbol} ({kind}: {e}), "
+                                        f"trying {ranked[i + 1].name}")
+                continue
+            self._record(provider, time.perf_counter() - start)
+            ROUTED_REQUESTS.inc(provider=provider.name, outcome='ok')
+            return batch
+        self.logger.error(f"Every provider failed for {symbol}")
+        raise last_error
+
+    # FMPClient fetch methods, so the router can stand in for the client
+    def get_yearly_data(self, symbol):
+        return self.fetch(symbol, days=365)
+
+    def get_five_year_data(self, symbol):
+        return self.fetch(symbol, days=1825)
+
+    def get_historical_data(self, symbol, start_date=None, end_date=None):
+        return self.fetch(symbol, start_date, end_date)
+
+    def stats(self) -> Dict[str, dict]:
+        """Per-provider fetch counts and average latency in seconds"""
+        with self._lock:
+            return {name: {**counts, 'latency': self._latency[name]} for name, counts in self.counts.items()}
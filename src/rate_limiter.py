@@ -0,0 +1,118 @@
+import logging
+import threading
+import time
+from typing import Dict, Tuple
+
+from src.metrics import get_registry
+
+RATE_LIMIT_WAIT = get_registry().counter(
+    'rate_limit_wait_seconds_total', 'Seconds spent waiting for API quota', ('provider',))
+
+class TokenBucketLimiter:
+    def __init__(self, calls: int, period: float, name: str = ""):
+        """
+        Thread-safe token bucket shared by every call made with one API key.
+        Args:
+            calls (int): Number of calls allowed per period (bucket capacity)
+            period (float): Length of the quota window in seconds
+            name (str): Provider name used to label wait-time metrics
+        """
+        if calls <= 0 or period <= 0:
+            raise ValueError("calls and period must be positive")
+
+        self.name = name
+        self.capacity = float(calls)
+        self.period = float(period)
+        self.refill_rate = self.capacity / self.period
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.total_wait = 0.0
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+            self.updated_at = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take tokens without waiting. Returns False if the bucket is short."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Block until tokens are available and take them
+        Args:
+            tokens (float): Number of tokens to take, 1 per API call
+        Returns:
+            Seconds spent waiting for the bucket to refill
+        """
+        if tokens > self.capacity:
+            raise ValueError(f"Cannot acquire {tokens} tokens from a bucket of {self.capacity}")
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    self.total_wait += waited
+                    break
+                # sleep just long enough for the missing tokens to refill
+                delay = (tokens - self.tokens) / self.refill_rate
+            time.sleep(delay)
+            waited += delay
+
+        if waited:
+            RATE_LIMIT_WAIT.inc(waited, provider=self.name)
+        return waited
+
+    def pause(self, seconds: float):
+        """
+        Empty the bucket so no caller gets a token for the next `seconds`,
+        used when the provider answers 429 with a Retry-After
+        """
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 0.0) - seconds * self.refill_rate
+
+    @property
+    def available(self) -> float:
+        """Tokens currently left in the bucket"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self.tokens
+
+
+# one limiter per API key, shared by every client method and instance using that key
+_limiters: Dict[Tuple[str, str], TokenBucketLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(provider: str,
+                api_key: str,
+                calls: int = 5,
+                period: float = 60) -> TokenBucketLimiter:
+    """
+    Returns the shared limiter for a provider/API key pair, creating it on first use
+    Args:
+        provider (str): Provider name (e.g., fmp, alpha_vantage)
+        api_key (str): API key the quota belongs to
+        calls (int): Calls allowed per period, used only when the limiter is created
+        period (float): Quota window in seconds, used only when the limiter is created
+    """
+    key = (provider, api_key or "")
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = TokenBucketLimiter(calls, period, name=provider)
+            _limiters[key] = limiter
+        return limiter
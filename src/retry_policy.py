@@ -0,0 +1,305 @@
+import contextvars
+import email.utils
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+import requests
+
+from src.metrics import get_registry
+
+RETRIES = get_registry().counter(
+    'provider_retries_total', 'Provider requests retried, by failure kind', ('provider', 'kind'))
+FAILURES = get_registry().counter(
+    'provider_failures_total', 'Provider requests that failed after retries', ('provider', 'kind'))
+CIRCUIT_OPENED = get_registry().counter(
+    'provider_circuit_opened_total', 'Times a provider circuit breaker opened', ('provider',))
+
+# budget of the run the current thread is fetching for, see use_budget
+_run_budget: contextvars.ContextVar = contextvars.ContextVar('run_budget', default=None)
+
+class FailureKind:
+    TRANSIENT = 'transient'   # network errors, timeouts, 5xx: retry with backoff
+    QUOTA = 'quota'           # 429 and provider throttle notes: wait for Retry-After
+    PERMANENT = 'permanent'   # bad symbol, plan restriction, auth: never retry
+
+
+class ProviderError(Exception):
+    def __init__(self, message: str, provider: str = "", kind: str = FailureKind.PERMANENT,
+                 status: Optional[int] = None, retry_after: Optional[float] = None):
+        """
+        Classified failure raised by the API connectors
+        Args:
+            message (str): Description of the failure
+            provider (str): Provider that failed (fmp, alpha_vantage)
+            kind (str): FailureKind value
+            status (int, optional): HTTP status code, when there was a response
+            retry_after (float, optional): Seconds the provider asked us to wait
+        """
+        super().__init__(message)
+        self.provider = provider
+        self.kind = kind
+        self.status = status
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(ProviderError):
+    """Raised without calling the provider while its circuit breaker is open"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After header as seconds, accepts delta-seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+        return max(0.0, when.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def classify_exception(exc: BaseException) -> Tuple[str, Optional[float]]:
+    """
+    Map an exception raised while calling a provider to a failure kind
+    Returns:
+        (FailureKind value, retry_after seconds or None)
+    """
+    if isinstance(exc, ProviderError):
+        return exc.kind, exc.retry_after
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        status = exc.response.status_code
+        if status == 429:
+            return FailureKind.QUOTA, parse_retry_after(exc.response.headers.get('Retry-After'))
+        if status in (408, 425) or status >= 500:
+            return FailureKind.TRANSIENT, parse_retry_after(exc.response.headers.get('Retry-After'))
+        # 401/403 auth, 402 symbol outside the plan, 404 unknown symbol
+        return FailureKind.PERMANENT, None
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return FailureKind.TRANSIENT, None
+    if isinstance(exc, ValueError):
+        # truncated or garbled body, usually a cut connection
+        return FailureKind.TRANSIENT, None
+    if isinstance(exc, requests.RequestException):
+        return FailureKind.TRANSIENT, None
+    return FailureKind.PERMANENT, None
+
+
+class RetryBudget:
+    def __init__(self, max_retries: int = 200):
+        """
+        Cap on retries across a whole run so a bad provider can't stall it
+        Args:
+            max_retries (int): Retries allowed until reset() is called
+        """
+        self.max_retries = max_retries
+        self.spent = 0
+        self._lock = threading.Lock()
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.spent >= self.max_retries:
+                return False
+            self.spent += 1
+            return True
+
+    def reset(self):
+        with self._lock:
+            self.spent = 0
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.max_retries - self.spent)
+
+
+@contextmanager
+def use_budget(budget: RetryBudget):
+    """
+    Charge every retry made by this thread inside the block to budget, instead
+    of the policy's own. Each run enters it with its own budget on the threads
+    that fetch for it, so concurrent runs sharing a provider policy never refill
+    or drain each other's budget.
+    """
+    token = _run_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _run_budget.reset(token)
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Stops calls to a provider after consecutive transient/quota failures
+        Args:
+            name (str): Provider name
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_timeout (float): Seconds before a single trial call is let through
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def allow(self) -> bool:
+        """True when a call may go out; in half-open state only one trial call does"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                self.logger.info(f"Circuit for {self.name} closed again")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    CIRCUIT_OPENED.inc(provider=self.name)
+                    self.logger.warning(f"Circuit for {self.name} opened after {self.failures} failures, "
+                                        f"pausing calls for {self.reset_timeout}s")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def retry_in(self) -> float:
+        """Seconds until the open circuit lets a trial call through"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+
+class RetryPolicy:
+    def __init__(self,
+                 provider: str,
+                 max_attempts: int = 4,
+                 base_delay: float = 0.5,
+                 max_delay: float = 30.0,
+                 max_retry_after: float = 120.0,
+                 budget: Optional[RetryBudget] = None,
+                 breaker: Optional[CircuitBreaker] = None,
+                 retry_quota: bool = True):
+        """
+        Retry rules for one provider: exponential backoff with full jitter,
+        Retry-After honoured for quota errors, a shared per-run retry budget
+        and a circuit breaker
+        Args:
+            provider (str): Provider name, used in errors and metrics
+            max_attempts (int): Calls per request including the first one
+            base_delay (float): Backoff base in seconds, doubled every attempt
+            max_delay (float): Cap on a single backoff sleep
+            max_retry_after (float): Cap on a provider supplied Retry-After
+            budget (RetryBudget, optional): Retry budget used outside use_budget blocks
+            breaker (CircuitBreaker, optional): Breaker shared by every client of the provider
+            retry_quota (bool): Wait out quota errors and retry; False raises them at
+                once (after on_quota), for callers that can use another provider
+        """
+        self.provider = provider
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.budget = budget if budget is not None else RetryBudget()
+        self.breaker = breaker if breaker is not None else CircuitBreaker(provider)
+        self.retry_quota = retry_quota
+        self.logger = logging.getLogger(__name__)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential delay before retry number attempt (0-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, func: Callable, *args, on_quota: Optional[Callable[[float], None]] = None, **kwargs):
+        """
+        Call func, retrying transient and quota failures
+        Args:
+            func (callable): The request to make
+            on_quota (callable, optional): Called with the wait in seconds when the
+                provider throttles us, e.g. to pause the shared rate limiter
+
+        Returns:
+            Whatever func returns
+        Raises:
+            ProviderError: Classified final failure, CircuitOpenError while the breaker is open
+        """
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"{self.provider} circuit open, retry in {self.breaker.retry_in():.0f}s",
+                                       provider=self.provider, kind=FailureKind.TRANSIENT,
+                                       retry_after=self.breaker.retry_in())
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                kind, retry_after = classify_exception(e)
+                status = getattr(getattr(e, 'response', None), 'status_code', None) or getattr(e, 'status', None)
+
+                if kind != FailureKind.PERMANENT:
+                    self.breaker.record_failure()
+                else:
+                    # the provider answered, a bad symbol says nothing about its health
+                    self.breaker.record_success()
+
+                attempt += 1
+                if kind == FailureKind.QUOTA and retry_after is not None:
+                    delay = min(retry_after, self.max_retry_after)
+                else:
+                    delay = self.backoff(attempt - 1)
+                if kind == FailureKind.QUOTA and on_quota is not None:
+                    on_quota(delay)
+
+                if (kind == FailureKind.PERMANENT or attempt >= self.max_attempts
+                        or (kind == FailureKind.QUOTA and not self.retry_quota)
+                        or not (_run_budget.get() or self.budget).try_spend()):
+                    FAILURES.inc(provider=self.provider, kind=kind)
+                    if isinstance(e, ProviderError):
+                        raise
+                    raise ProviderError(str(e), provider=self.provider, kind=kind,
+                                        status=status, retry_after=retry_after) from e
+
+                RETRIES.inc(provider=self.provider, kind=kind)
+                self.logger.warning(f"{self.provider} {kind} failure ({e}), retry {attempt}/"
+                                    f"{self.max_attempts - 1} in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            return result
+
+
+_policies: Dict[str, RetryPolicy] = {}
+_policies_lock = threading.Lock()
+
+def get_retry_policy(provider: str) -> RetryPolicy:
+    """Shared policy per provider, so every client of a provider trips the same breaker"""
+    with _policies_lock:
+        policy = _policies.get(provider)
+        if policy is None:
+            policy = _policies[provider] = RetryPolicy(provider)
+        return policy
@@ -0,0 +1,295 @@
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+# stage order, a ticker is finished once its load is done
+STAGES = ('extract', 'transform', 'load')
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+class RunJournal:
+    def __init__(self,
+                 path: str = ".state/runs.sqlite",
+                 payload_dir: str = ".state/payloads",
+                 flush_every: int = 50,
+                 flush_interval: float = 1.0,
+                 max_pending_payloads: int = 64):
+        """
+        Durable per-ticker journal of ETL runs, so a run that dies part way can
+        be resumed without re-fetching what it already has
+        Args:
+            path (str): SQLite database file, ':memory:' for a throwaway journal
+            payload_dir (str): Directory the extracted payloads are kept in
+            flush_every (int): Buffered status updates written in one transaction
+            flush_interval (float): Seconds after which buffered updates are written anyway
+            max_pending_payloads (int): Payloads waiting for the writer thread before
+                save_payload blocks
+        """
+        self.path = path
+        self.payload_dir = payload_dir
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._pending: List[tuple] = []
+        self._flushed_at = time.monotonic()
+        self._payloads: queue.Queue = queue.Queue(max_pending_payloads)
+        self._writer: Optional[threading.Thread] = None
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL + NORMAL: a commit is an append to the log, no fsync of the main file
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " run_id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " params TEXT,"
+            " started_at TEXT NOT NULL,"
+            " updated_at TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS run_tickers ("
+            " run_id TEXT NOT NULL,"
+            " ticker TEXT NOT NULL,"
+            " stage TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " payload_path TEXT,"
+            " rows INTEGER,"
+            " error TEXT,"
+            " updated_at TEXT NOT NULL,"
+            " PRIMARY KEY (run_id, ticker))"
+        )
+        self._conn.commit()
+
+    # 1. Runs
+    def start_run(self, tickers: Iterable[str], run_id: Optional[str] = None, **params) -> str:
+        """
+        Register a run, or reopen an existing one to resume it
+        Args:
+            tickers: Ticker symbols the run covers, new ones are added to a resumed run
+            run_id (str, optional): Run to resume, a new id is generated when omitted
+            params: Run parameters kept for `status`, e.g. data_type or table
+
+        Returns:
+            The run id
+        """
+        run_id = run_id or f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+        now = _now()
+        with self._lock:
+            resumed = self._conn.execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+            self._conn.execute(
+                "INSERT INTO runs (run_id, status, params, started_at, updated_at) VALUES (?, 'running', ?, ?, ?) "
+                "ON CONFLICT(run_id) DO UPDATE SET status = 'running', updated_at = excluded.updated_at",
+                (run_id, json.dumps(params, default=str), now, now),
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO run_tickers (run_id, ticker, stage, status, updated_at) "
+                "VALUES (?, ?, 'extract', 'pending', ?)",
+                [(run_id, ticker, now) for ticker in tickers],
+            )
+            self._conn.commit()
+        self.logger.info(f"{'Resuming' if resumed else 'Starting'} run {run_id}")
+        return run_id
+
+    def finish_run(self, run_id: str) -> str:
+        """
+        Close a run, 'complete' when every ticker was loaded and 'incomplete' otherwise.
+        A complete run's payloads are deleted, an incomplete one keeps them for its resume
+        Returns:
+            The final run status
+        """
+        self.wait_payloads()
+        self.flush()
+        with self._lock:
+            unfinished = self._conn.execute(
+                "SELECT COUNT(*) FROM run_tickers WHERE run_id = ? AND NOT (stage = 'load' AND status = 'done')",
+                (run_id,),
+            ).fetchone()[0]
+            status = 'complete' if unfinished == 0 else 'incomplete'
+            self._conn.execute("UPDATE runs SET status = ?, updated_at = ? WHERE run_id = ?",
+                               (status, _now(), run_id))
+            if status == 'complete':
+                self._conn.execute("UPDATE run_tickers SET payload_path = NULL WHERE run_id = ?", (run_id,))
+            self._conn.commit()
+        if status == 'complete':
+            shutil.rmtree(os.path.join(self.payload_dir, run_id), ignore_errors=True)
+        self.logger.info(f"Run {run_id} {status}, {unfinished} tickers unfinished")
+        return status
+
+    def runs(self, limit: int = 20) -> List[dict]:
+        """Most recent runs, newest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT run_id, status, params, started_at, updated_at FROM runs "
+                "ORDER BY started_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [{'run_id': run_id, 'status': status, 'params': json.loads(params or '{}'),
+                 'started_at': started_at, 'updated_at': updated_at}
+                for run_id, status, params, started_at, updated_at in rows]
+
+    # 2. Ticker status
+    def record(self,
+               run_id: str,
+               tickers: Iterable[str],
+               stage: str,
+               status: str = 'done',
+               payload_path: Optional[str] = None,
+               rows: Optional[int] = None,
+               error: Optional[str] = None):
+        """
+        Buffer a status update for one or more tickers. Updates are written in
+        batches, a crash loses at most the last flush_interval of them and
+        those tickers are simply redone on resume.
+        """
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage {stage}, expected one of {STAGES}")
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        now = _now()
+        with self._lock:
+            self._pending.extend((run_id, ticker, stage, status, payload_path, rows, error, now)
+                                 for ticker in tickers)
+            due = (len(self._pending) >= self.flush_every
+                   or time.monotonic() - self._flushed_at >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write buffered status updates in one transaction"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._flushed_at = time.monotonic()
+            if not pending:
+                return
+            self._conn.executemany(
+                "INSERT INTO run_tickers (run_id, ticker, stage, status, payload_path, rows, error, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(run_id, ticker) DO UPDATE SET "
+                " stage = excluded.stage,"
+                " status = excluded.status,"
+                " payload_path = COALESCE(excluded.payload_path, payload_path),"
+                " rows = COALESCE(excluded.rows, rows),"
+                " error = excluded.error,"
+                " updated_at = excluded.updated_at",
+                pending,
+            )
+            self._conn.commit()
+
+    def tickers(self, run_id: str) -> Dict[str, dict]:
+        """
+        Returns:
+            dict of ticker -> {stage, status, payload_path, rows, error}
+        """
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ticker, stage, status, payload_path, rows, error FROM run_tickers WHERE run_id = ?",
+                (run_id,),
+            ).fetchall()
+        return {ticker: {'stage': stage, 'status': status, 'payload_path': payload_path,
+                         'rows': n, 'error': error}
+                for ticker, stage, status, payload_path, n, error in rows}
+
+    def status(self, run_id: str) -> dict:
+        """Ticker counts per stage and status, e.g. {'load:done': 480, 'extract:failed': 3}"""
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, status, COUNT(*) FROM run_tickers WHERE run_id = ? GROUP BY stage, status",
+                (run_id,),
+            ).fetchall()
+        return {f"{stage}:{status}": count for stage, status, count in rows}
+
+    # 3. Payloads
+    def save_payload(self, run_id: str, ticker: str, data):
+        """
+        Queue an extracted payload to be kept on disk, so a resumed run can reuse
+        it. A writer thread stores it as Parquet and then sets the ticker's
+        payload_path; until then, or if the write fails, a resume fetches the
+        ticker again. Blocks only when max_pending_payloads are already waiting.
+        """
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_payloads, name="journal-payloads", daemon=True)
+                self._writer.start()
+        self._payloads.put((run_id, ticker, data))
+
+    def wait_payloads(self):
+        """Block until every queued payload is on disk"""
+        self._payloads.join()
+
+    def _write_payloads(self):
+        while True:
+            run_id, ticker, data = self._payloads.get()
+            try:
+                path = self._write_payload(run_id, ticker, data)
+                with self._lock:
+                    self._conn.execute("UPDATE run_tickers SET payload_path = ? WHERE run_id = ? AND ticker = ?",
+                                       (path, run_id, ticker))
+                    self._conn.commit()
+            except Exception as e:
+                self.logger.warning(f"Could not store the payload of {ticker}: {e}")
+            finally:
+                self._payloads.task_done()
+
+    def _write_payload(self, run_id: str, ticker: str, data) -> str:
+        """Store one payload, columnar as Parquet, or as gzipped JSON without pyarrow"""
+        from src.columnar import as_batch, json_default
+
+        directory = os.path.join(self.payload_dir, run_id)
+        os.makedirs(directory, exist_ok=True)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            pa = None
+
+        if pa is not None:
+            path = os.path.join(directory, f"{ticker}.parquet")
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            # the arrays go to Arrow as they are, no rows are rebuilt; payloads are
+            # read back at most once, so speed matters more than size
+            table = pa.table(as_batch(data).columns)
+            pq.write_table(table, tmp_path, compression='snappy')
+        else:
+            path = os.path.join(directory, f"{ticker}.json.gz")
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with gzip.open(tmp_path, 'wt', compresslevel=1) as f:
+                json.dump(data, f, separators=(',', ':'), default=json_default)
+        os.replace(tmp_path, path)
+        return path
+
+    def load_payload(self, path: str):
+        """Read a stored payload back as a ColumnarBatch, None when it is missing or unreadable"""
+        from src.columnar import ColumnarBatch, decode_prices
+
+        try:
+            if path.endswith('.parquet'):
+                import pyarrow.parquet as pq
+
+                table = pq.read_table(path)
+                return ColumnarBatch({name: column.to_numpy()
+                                      for name, column in zip(table.column_names, table.columns)})
+            with gzip.open(path, 'rb') as f:
+                return decode_prices(f.read())
+        except (OSError, ValueError, ImportError) as e:
+            self.logger.warning(f"Could not reuse payload {path}: {e}")
+            return None
+
+    def close(self):
+        self.wait_payloads()
+        self.flush()
+        self._conn.close()
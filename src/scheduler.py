@@ -0,0 +1,540 @@
+import gzip
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+# per shard DAG: each stage depends on the one before it
+STAGES = ('extract', 'transform', 'load')
+
+def _now() -> float:
+    return time.time()
+
+def shard_tickers(ticker_list: List[str], shards: int) -> List[List[str]]:
+    """Split tickers into `shards` round-robin shards of near equal size"""
+    shards = max(1, min(shards, len(ticker_list)))
+    return [ticker_list[i::shards] for i in range(shards)]
+
+
+class WorkQueue:
+    def __init__(self, path: str = ".state/queue.sqlite", lease_seconds: float = 300.0):
+        """
+        Task queue with DAG dependencies in a SQLite file. Workers in several
+        processes, or on several hosts sharing the file, claim ready tasks from it.
+        Args:
+            path (str): SQLite database file
+            lease_seconds (float): A running task whose worker stops renewing the
+                lease for this long is handed to another worker
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.logger = logging.getLogger(__name__)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # autocommit mode, transactions are opened explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            " task_id TEXT PRIMARY KEY,"
+            " run_id TEXT NOT NULL,"
+            " shard INTEGER NOT NULL,"
+            " stage TEXT NOT NULL,"
+            " resource TEXT,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " max_attempts INTEGER NOT NULL,"
+            " worker TEXT,"
+            " lease_until REAL,"
+            " result TEXT,"
+            " error TEXT,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS task_deps ("
+            " task_id TEXT NOT NULL,"
+            " depends_on TEXT NOT NULL,"
+            " PRIMARY KEY (task_id, depends_on))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status)")
+
+    def add(self, tasks: List[dict]):
+        """
+        Insert tasks in one transaction. Each task is a dict with task_id, run_id,
+        shard, stage, payload and optional resource, depends_on and max_attempts.
+        Tasks that already exist are left as they are, so resubmitting a run resumes it.
+        """
+        now = _now()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO tasks (task_id, run_id, shard, stage, resource, payload, status,"
+                    " max_attempts, updated_at) VALUES (?, ?, ?, ?, ?, ?, 'pending', ?, ?)",
+                    [(t['task_id'], t['run_id'], t['shard'], t['stage'], t.get('resource'),
+                      json.dumps(t['payload']), t.get('max_attempts', 3), now) for t in tasks],
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO task_deps (task_id, depends_on) VALUES (?, ?)",
+                    [(t['task_id'], dep) for t in tasks for dep in t.get('depends_on', ())],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _skip_downstream(self, task_id: str, now: float):
+        """Skip everything downstream of a failed task, it can never run; call inside a transaction"""
+        self._conn.execute(
+            "WITH RECURSIVE downstream(task_id) AS ("
+            " SELECT task_id FROM task_deps WHERE depends_on = ?"
+            " UNION SELECT d.task_id FROM task_deps d JOIN downstream ON d.depends_on = downstream.task_id)"
+            " UPDATE tasks SET status = 'skipped', updated_at = ?"
+            " WHERE task_id IN (SELECT task_id FROM downstream) AND status = 'pending'",
+            (task_id, now),
+        )
+
+    def claim(self, worker: str) -> Optional[dict]:
+        """
+        Take the next ready task: pending (or with an expired lease), every
+        dependency done, and its resource (an API key) not held by another
+        running task, so one key is never used by two workers at once.
+        An expired task that has used up its attempts, e.g. one that keeps
+        killing its worker, fails and skips its dependents like in fail()
+        Returns:
+            The task as a dict, None when nothing is ready right now
+        """
+        now = _now()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                exhausted = [task_id for (task_id,) in self._conn.execute(
+                    "SELECT task_id FROM tasks WHERE status = 'running' AND lease_until < ?"
+                    " AND attempts >= max_attempts", (now,)).fetchall()]
+                for task_id in exhausted:
+                    self._conn.execute(
+                        "UPDATE tasks SET status = 'failed', error = ?, lease_until = NULL, updated_at = ?"
+                        " WHERE task_id = ?",
+                        ("lease expired on the last attempt", now, task_id),
+                    )
+                    self._skip_downstream(task_id, now)
+                row = self._conn.execute(
+                    "SELECT t.task_id, t.run_id, t.shard, t.stage, t.resource, t.payload, t.attempts"
+                    " FROM tasks t"
+                    " WHERE (t.status = 'pending' OR (t.status = 'running' AND t.lease_until < ?))"
+                    "  AND NOT EXISTS (SELECT 1 FROM task_deps d JOIN tasks p ON p.task_id = d.depends_on"
+                    "                  WHERE d.task_id = t.task_id AND p.status != 'done')"
+                    "  AND (t.resource IS NULL OR NOT EXISTS ("
+                    "       SELECT 1 FROM tasks r WHERE r.resource = t.resource AND r.status = 'running'"
+                    "        AND r.lease_until >= ? AND r.task_id != t.task_id))"
+                    # later stages first: finishing a shard frees its intermediate files
+                    " ORDER BY CASE t.stage WHEN 'load' THEN 0 WHEN 'transform' THEN 1 ELSE 2 END, t.shard"
+                    " LIMIT 1",
+                    (now, now),
+                ).fetchone()
+                for task_id in exhausted:
+                    self.logger.error(f"{task_id} failed: lease expired on the last attempt")
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                task_id = row[0]
+                self._conn.execute(
+                    "UPDATE tasks SET status = 'running', worker = ?, attempts = attempts + 1,"
+                    " lease_until = ?, updated_at = ? WHERE task_id = ?",
+                    (worker, now + self.lease_seconds, now, task_id),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return {'task_id': task_id, 'run_id': row[1], 'shard': row[2], 'stage': row[3],
+                'resource': row[4], 'payload': json.loads(row[5]), 'attempts': row[6] + 1}
+
+    def renew(self, task_id: str, worker: str):
+        """Extend the lease of a running task"""
+        with self._lock:
+            self._conn.execute("UPDATE tasks SET lease_until = ? WHERE task_id = ? AND worker = ?",
+                               (_now() + self.lease_seconds, task_id, worker))
+
+    def complete(self, task_id: str, result: Optional[dict] = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE tasks SET status = 'done', result = ?, error = NULL, lease_until = NULL,"
+                " updated_at = ? WHERE task_id = ?",
+                (json.dumps(result or {}), _now(), task_id),
+            )
+
+    def fail(self, task_id: str, error: str):
+        """Put a failed task back for another attempt, or fail it and skip its dependents"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                attempts, max_attempts = self._conn.execute(
+                    "SELECT attempts, max_attempts FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+                final = attempts >= max_attempts
+                self._conn.execute(
+                    "UPDATE tasks SET status = ?, error = ?, lease_until = NULL, updated_at = ? WHERE task_id = ?",
+                    ('failed' if final else 'pending', error, _now(), task_id),
+                )
+                if final:
+                    self._skip_downstream(task_id, _now())
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return final
+
+    def unfinished(self, run_id: Optional[str] = None) -> int:
+        """Tasks still pending or running"""
+        query = "SELECT COUNT(*) FROM tasks WHERE status IN ('pending', 'running')"
+        params: tuple = ()
+        if run_id is not None:
+            query += " AND run_id = ?"
+            params = (run_id,)
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()[0]
+
+    def status(self, run_id: str) -> Dict[str, Dict[str, int]]:
+        """Task counts per stage and status, e.g. {'extract': {'done': 8, 'running': 2}}"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, status, COUNT(*) FROM tasks WHERE run_id = ? GROUP BY stage, status",
+                (run_id,),
+            ).fetchall()
+        out: Dict[str, Dict[str, int]] = {}
+        for stage, status, count in rows:
+            out.setdefault(stage, {})[status] = count
+        return out
+
+    def close(self):
+        self._conn.close()
+
+
+def build_processor(config: dict, key_index: int = 0):
+    """
+    ETLProcessor for one worker, bound to one FMP API key
+    Args:
+        config (dict): fmp_api_url, fmp_api_keys, calls_per_minute, and either
+            sink='parquet' with lake_root, or project_id and credentials_path for BigQuery.
+            route_providers=True with alpha_api_url/alpha_api_key spreads fetches over
+            FMP and Alpha Vantage through a ProviderRouter
+        key_index (int): Which of fmp_api_keys this shard uses
+    """
+    from src.connectors import AlphaAdvantage, FMPClient
+    from src.etl_processor import ETLProcessor
+    from src.retry_policy import RetryPolicy, get_retry_policy
+
+    route = bool(config.get('route_providers') and config.get('alpha_api_url'))
+
+    def retry_policy(provider):
+        # behind the router a throttled provider hands its ticker over instead of sleeping
+        if not route:
+            return None
+        return RetryPolicy(provider, breaker=get_retry_policy(provider).breaker, retry_quota=False)
+
+    keys = config['fmp_api_keys']
+    fmp_client = FMPClient(config['fmp_api_url'], keys[key_index % len(keys)],
+                           calls_per_minute=config.get('calls_per_minute', 5),
+                           retry_policy=retry_policy('fmp'))
+    alpha_vantage_client = None
+    if config.get('alpha_api_url'):
+        alpha_vantage_client = AlphaAdvantage(config['alpha_api_url'], config.get('alpha_api_key'),
+                                              calls_per_minute=config.get('alpha_calls_per_minute', 5),
+                                              retry_policy=retry_policy('alpha_vantage'))
+    router = None
+    if route:
+        from src.provider_router import AlphaVantageProvider, FMPProvider, ProviderRouter
+        router = ProviderRouter([FMPProvider(fmp_client), AlphaVantageProvider(alpha_vantage_client)])
+
+    if config.get('sink') == 'parquet':
+        from src.sinks import ParquetSink
+        return ETLProcessor(alpha_vantage_client, fmp_client, None, router=router,
+                            sink=ParquetSink(config.get('lake_root', 'data/lake')))
+
+    from src.bigquery_connector import BigQueryConnector
+    bigquery_client = BigQueryConnector(config['project_id'], config.get('credentials_path'))
+    return ETLProcessor(alpha_vantage_client, fmp_client, bigquery_client, router=router)
+
+
+class _Heartbeat:
+    """Renews a task lease from a background thread while the task runs"""
+
+    def __init__(self, queue: WorkQueue, task_id: str, worker: str):
+        self.queue = queue
+        self.task_id = task_id
+        self.worker = worker
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.queue.lease_seconds / 3):
+            self.queue.renew(self.task_id, self.worker)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+class ShardWorker:
+    def __init__(self, queue_path: str, config: dict, work_dir: str = ".state/work",
+                 poll_interval: float = 0.2, name: Optional[str] = None):
+        """
+        Claims tasks from the work queue and runs them until the queue drains
+        Args:
+            queue_path (str): SQLite work queue shared with the scheduler
+            config (dict): Pipeline settings, see build_processor
+            work_dir (str): Directory for the files passed between stages; must be
+                shared storage when workers run on several hosts
+            poll_interval (float): Seconds to wait when no task is ready
+            name (str, optional): Worker name recorded on claimed tasks
+        """
+        self.queue = WorkQueue(queue_path)
+        self.config = config
+        self.work_dir = work_dir
+        self.poll_interval = poll_interval
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.logger = logging.getLogger(__name__)
+        self._processors: Dict[int, object] = {}
+
+    def _processor(self, key_index: int):
+        if key_index not in self._processors:
+            self._processors[key_index] = build_processor(self.config, key_index)
+        return self._processors[key_index]
+
+    def _path(self, task: dict, suffix: str) -> str:
+        directory = os.path.join(self.work_dir, task['run_id'])
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"shard-{task['shard']:04d}.{suffix}")
+
+    def _extract(self, task: dict) -> dict:
+        from src.columnar import json_default
+
+        payload = task['payload']
+        processor = self._processor(payload['key_index'])
+        if 'ranges' in payload:
+            plan = {ticker: (date.fromisoformat(start), date.fromisoformat(end))
+                    for ticker, (start, end) in payload['ranges'].items()}
+            extracted = [data for _, data in processor.iter_extract_ranges(
+                plan, max_workers=payload.get('max_workers', 1)) if data is not None]
+        else:
+            extracted = processor.extract(payload['tickers'], payload['data_type'],
+                                          max_workers=payload.get('max_workers', 1))
+        path = self._path(task, 'extract.json.gz')
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with gzip.open(tmp_path, 'wt', compresslevel=1) as f:
+            json.dump(extracted, f, separators=(',', ':'), default=json_default)
+        os.replace(tmp_path, path)
+        return {'tickers': len(payload['tickers']), 'extracted': len(extracted)}
+
+    def _transform(self, task: dict) -> dict:
+        payload = task['payload']
+        processor = self._processor(payload['key_index'])
+        source = self._path(task, 'extract.json.gz')
+        with gzip.open(source, 'rt') as f:
+            extracted = json.load(f)
+        df = processor.transform(extracted) if extracted else None
+        if df is None:
+            os.remove(source)
+            return {'rows': 0}  # an incremental range can hold no trading day
+        df = processor.validate(df)
+        # Parquet keeps the compact dtypes (categorical symbol, float32 prices) across the handoff
+        path = self._path(task, 'frame.parquet')
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        df.to_parquet(tmp_path, index=False, compression='snappy')
+        os.replace(tmp_path, path)
+        os.remove(source)
+        return {'rows': len(df)}
+
+    def _load(self, task: dict) -> dict:
+        import pandas as pd
+
+        payload = task['payload']
+        processor = self._processor(payload['key_index'])
+        source = self._path(task, 'frame.parquet')
+        if not os.path.exists(source):
+            return {'rows': 0}  # nothing was extracted for this shard
+        df = pd.read_parquet(source)
+        if not df.empty and not processor.load(df, payload['table'], upsert=payload.get('upsert', False)):
+            raise RuntimeError(f"Load of shard {task['shard']} into {payload['table']} failed")
+        if payload.get('watermarks'):
+            from src.watermark_store import WatermarkStore
+            watermarks = WatermarkStore(payload['watermarks'])
+            try:
+                watermarks.update_from_frame(df)
+            finally:
+                watermarks.close()
+        os.remove(source)
+        return {'rows': len(df)}
+
+    def run_task(self, task: dict):
+        handler = {'extract': self._extract, 'transform': self._transform, 'load': self._load}[task['stage']]
+        self.logger.info(f"{self.name} running {task['task_id']} (attempt {task['attempts']})")
+        try:
+            with _Heartbeat(self.queue, task['task_id'], self.name):
+                result = handler(task)
+        except Exception as e:
+            final = self.queue.fail(task['task_id'], repr(e))
+            self.logger.error(f"{task['task_id']} failed{' for good' if final else ', will retry'}: {e}")
+            return
+        self.queue.complete(task['task_id'], result)
+
+    def run(self, run_id: Optional[str] = None, idle_timeout: Optional[float] = None) -> int:
+        """
+        Work until no task of run_id (or of any run) is pending or running
+        Args:
+            run_id (str, optional): Only wait for this run to drain
+            idle_timeout (float, optional): Give up after this many seconds without a claim
+        Returns:
+            Number of tasks this worker ran
+        """
+        done = 0
+        idle_since = time.monotonic()
+        while True:
+            task = self.queue.claim(self.name)
+            if task is not None:
+                self.run_task(task)
+                done += 1
+                idle_since = time.monotonic()
+                continue
+            if self.queue.unfinished(run_id) == 0:
+                break
+            if idle_timeout is not None and time.monotonic() - idle_since > idle_timeout:
+                break
+            time.sleep(self.poll_interval)
+        self.logger.info(f"{self.name} finished after {done} tasks")
+        return done
+
+
+def run_worker(queue_path: str, config: dict, work_dir: str = ".state/work",
+               run_id: Optional[str] = None, idle_timeout: Optional[float] = None) -> int:
+    """Process entry point, also what other hosts run against the shared queue"""
+    from src.log_config import configure_logging, shutdown_logging
+    from src.metrics import get_registry
+
+    configure_logging(**config.get('logging', {}))
+    metrics = config.get('metrics', {})
+    get_registry().tracing = metrics.get('trace', False)
+    worker = ShardWorker(queue_path, config, work_dir)
+    try:
+        return worker.run(run_id=run_id, idle_timeout=idle_timeout)
+    finally:
+        if metrics.get('path'):
+            # one report per worker process, next to the scheduler's own
+            root, ext = os.path.splitext(metrics['path'])
+            get_registry().write(f"{root}.{worker.name}{ext}")
+        shutdown_logging()
+
+
+class Scheduler:
+    def __init__(self, queue_path: str = ".state/queue.sqlite", work_dir: str = ".state/work"):
+        """
+        Splits a ticker universe into shards, queues an extract -> transform -> load
+        DAG per shard and runs it across worker processes
+        Args:
+            queue_path (str): SQLite work queue, shared with workers on other hosts
+            work_dir (str): Directory for the files passed between stages
+        """
+        self.queue_path = queue_path
+        self.work_dir = work_dir
+        self.queue = WorkQueue(queue_path)
+        self.logger = logging.getLogger(__name__)
+
+    def submit(self,
+               ticker_list: List[str],
+               table: str,
+               data_type: str = 'yearly',
+               shards: int = 8,
+               key_count: int = 1,
+               run_id: Optional[str] = None,
+               upsert: bool = False,
+               max_workers: int = 1,
+               max_attempts: int = 3,
+               ranges: Optional[Dict[str, Tuple[date, date]]] = None,
+               watermarks: Optional[str] = None) -> str:
+        """
+        Queue a run. Shard i uses API key i % key_count, and its extract task holds
+        that key as a resource so no two workers spend the same key's quota at once.
+        Submitting an existing run_id again resumes it, finished tasks stay finished.
+        Args:
+            ticker_list: Tickers to process
+            table: Destination table
+            data_type: 'yearly', 'five_year' or 'historical'
+            shards: Number of shards
+            key_count: Number of API keys the workers are configured with
+            run_id: Run to resume, a new id is generated when omitted
+            upsert: MERGE on load instead of appending
+            max_workers: Fetch threads inside one extract task
+            max_attempts: Attempts per task before it fails and skips its dependents
+            ranges: ticker -> (start_date, end_date) from plan_ranges, each ticker is
+                fetched for its own range instead of by data_type
+            watermarks: WatermarkStore path advanced by every load task
+
+        Returns:
+            The run id
+        """
+        if not ticker_list:
+            self.logger.error("Ticker list is empty")
+            raise ValueError("Ticker list cannot be empty")
+
+        run_id = run_id or f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+        tasks = []
+        for shard, tickers in enumerate(shard_tickers(ticker_list, shards)):
+            key_index = shard % max(1, key_count)
+            payload = {'tickers': tickers, 'table': table, 'data_type': data_type,
+                       'key_index': key_index, 'upsert': upsert, 'max_workers': max_workers}
+            if ranges is not None:
+                payload['ranges'] = {ticker: [ranges[ticker][0].isoformat(), ranges[ticker][1].isoformat()]
+                                     for ticker in tickers}
+            if watermarks is not None:
+                payload['watermarks'] = watermarks
+            previous = None
+            for stage in STAGES:
+                task_id = f"{run_id}:{shard:04d}:{stage}"
+                tasks.append({'task_id': task_id, 'run_id': run_id, 'shard': shard, 'stage': stage,
+                              'payload': payload, 'max_attempts': max_attempts,
+                              'resource': f"fmp-key-{key_index}" if stage == 'extract' else None,
+                              'depends_on': [previous] if previous else []})
+                previous = task_id
+        self.queue.add(tasks)
+        self.logger.info(f"Queued run {run_id}: {len(tasks)} tasks over {len(tasks) // len(STAGES)} shards")
+        return run_id
+
+    def run(self, run_id: str, config: dict, workers: int = 4) -> Dict[str, Dict[str, int]]:
+        """
+        Drain a run with local worker processes. Extract, transform and load tasks of
+        different shards run side by side, so a CPU-bound transform in one process
+        never holds up network-bound extraction in another.
+        Args:
+            run_id: Run returned by submit
+            config: Pipeline settings passed to every worker, see build_processor
+            workers: Number of worker processes
+
+        Returns:
+            Task counts per stage and status
+        """
+        context = multiprocessing.get_context('spawn')
+        processes = [context.Process(target=run_worker, name=f"etl-worker-{i}",
+                                     args=(self.queue_path, config, self.work_dir, run_id))
+                     for i in range(workers)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        status = self.queue.status(run_id)
+        self.logger.info(f"Run {run_id} drained in {time.perf_counter() - start:.1f}s: {status}")
+        return status
@@ -0,0 +1,242 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized
+    fcntl = None
+
+class Sink:
+    """
+    Load target for ETLProcessor. write() raises on failure, the processor
+    turns that into a failed load.
+    """
+
+    def write(self, df: pd.DataFrame, destination: str, upsert: bool = False):
+        raise NotImplementedError
+
+    def read_tail(self, destination: str, symbols: List[str], rows: int) -> pd.DataFrame:
+        """The last `rows` rows of every symbol in destination, oldest first"""
+        raise NotImplementedError
+
+
+class BigQuerySink(Sink):
+    def __init__(self, bigquery_client):
+        """
+        Loads frames through a BigQueryConnector
+        Args:
+            bigquery_client (BigQueryConnector): Connector used for appends and upserts
+        """
+        self.bigquery_client = bigquery_client
+
+    def write(self, df, destination, upsert=False):
+        if upsert:
+            self.bigquery_client.upsert_data(df, destination)
+        else:
+            self.bigquery_client.load_dataframe(df, destination)
+
+    def read_tail(self, destination, symbols, rows):
+        return self.bigquery_client.get_tail(destination, symbols, rows)
+
+    def __str__(self):
+        return "BigQuery"
+
+
+class ParquetSink(Sink):
+    def __init__(self, root: str = "data/lake"):
+        """
+        Local columnar store: one directory per destination, Parquet files
+        partitioned as year=YYYY/symbol=SYM, plus a manifest of the date range
+        and row count of every file
+        Args:
+            root (str): Directory holding the lake
+        """
+        self.root = root
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        return f"Parquet lake at {self.root}"
+
+    def _table_dir(self, destination: str) -> str:
+        # accept BigQuery style references so the same table names work for both sinks
+        return os.path.join(self.root, destination.split('.')[-1])
+
+    def _manifest_path(self, destination: str) -> str:
+        return os.path.join(self._table_dir(destination), "_manifest.json")
+
+    def _read_manifest(self, destination: str) -> Dict[str, dict]:
+        path = self._manifest_path(destination)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    @contextmanager
+    def _manifest_lock(self, destination: str):
+        """
+        Serialize manifest updates across threads and processes; sharded loads
+        run in separate worker processes sharing one lake
+        """
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self._table_dir(destination), exist_ok=True)
+            with open(os.path.join(self._table_dir(destination), "_manifest.lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_manifest(self, destination: str, manifest: Dict[str, dict]):
+        path = self._manifest_path(destination)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def write(self, df, destination, upsert=False):
+        """
+        Append a frame as new Parquet files. Each file is written under a
+        temporary name and renamed into place, then the manifest is swapped
+        atomically, so readers never see partial files. With upsert the rows
+        still append; read() keeps the newest copy of each (symbol, date).
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if df is None or df.empty:
+            raise ValueError("Cannot load empty DataFrame")
+
+        table_dir = self._table_dir(destination)
+        dates = pd.to_datetime(df['date'])
+        # nanosecond sequence in the file name orders writes for upsert dedup on read
+        sequence = time.time_ns()
+        written = {}
+
+        for (year, symbol), part in df.groupby([dates.dt.year, df['symbol'].astype(str)], sort=False, observed=True):
+            part_dir = os.path.join(table_dir, f"year={year}", f"symbol={symbol}")
+            os.makedirs(part_dir, exist_ok=True)
+            name = f"part-{sequence}-{uuid.uuid4().hex[:8]}.parquet"
+            tmp_path = os.path.join(part_dir, f".{name}.tmp")
+            part = part.assign(symbol=part['symbol'].astype(str))
+            pq.write_table(pa.Table.from_pandas(part, preserve_index=False), tmp_path, compression='zstd')
+            os.replace(tmp_path, os.path.join(part_dir, name))
+
+            part_dates = dates.loc[part.index]
+            written[os.path.relpath(os.path.join(part_dir, name), table_dir)] = {
+                'symbol': symbol,
+                'min_date': part_dates.min().date().isoformat(),
+                'max_date': part_dates.max().date().isoformat(),
+                'rows': len(part),
+                'sequence': sequence,
+            }
+
+        with self._manifest_lock(destination):
+            manifest = self._read_manifest(destination)
+            manifest.update(written)
+            self._write_manifest(destination, manifest)
+        self.logger.info(f"Wrote {len(df)} rows in {len(written)} files to {table_dir}")
+
+    def coverage(self, destination: str, symbols: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """
+        Which ticker-date ranges exist, from the manifest alone
+        Returns:
+            DataFrame indexed by symbol with min_date, max_date, rows and files
+        """
+        manifest = pd.DataFrame.from_dict(self._read_manifest(destination), orient='index')
+        if manifest.empty:
+            return pd.DataFrame(columns=['min_date', 'max_date', 'rows', 'files'])
+        if symbols is not None:
+            manifest = manifest[manifest['symbol'].isin(list(symbols))]
+        return manifest.groupby('symbol').agg(min_date=('min_date', 'min'),
+                                              max_date=('max_date', 'max'),
+                                              rows=('rows', 'sum'),
+                                              files=('rows', 'size'))
+
+    def get_max_dates(self, destination: str, symbols: Optional[List[str]] = None) -> Dict[str, date]:
+        """Latest stored date per symbol, same contract as BigQueryConnector.get_max_dates"""
+        coverage = self.coverage(destination, symbols)
+        return {symbol: date.fromisoformat(d) for symbol, d in coverage['max_date'].items()}
+
+    def read_tail(self, destination, symbols, rows):
+        frame = self.read(destination, symbols)
+        if frame.empty:
+            return frame
+        return (frame.sort_values(['symbol', 'date'], kind='stable')
+                     .groupby('symbol', sort=False, observed=True).tail(rows)
+                     .reset_index(drop=True))
+
+    def read(self,
+             destination: str,
+             symbols: Optional[Iterable[str]] = None,
+             start_date: Optional[date] = None,
+             end_date: Optional[date] = None,
+             columns: Optional[List[str]] = None,
+             dedupe: bool = True,
+             as_arrow: bool = False):
+        """
+        Read rows back through memory-mapped Arrow, opening only the files the
+        manifest says overlap the requested symbols and dates
+        Args:
+            destination (str): Table name used when writing
+            symbols (list, optional): Symbols to read, all when None
+            start_date/end_date (date, optional): Inclusive date bounds
+            columns (list, optional): Columns to read, all when None
+            dedupe (bool): Keep only the newest copy of each (symbol, date)
+            as_arrow (bool): Return a pyarrow Table instead of a DataFrame
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        wanted = set(symbols) if symbols is not None else None
+        start = str(start_date) if start_date else None
+        end = str(end_date) if end_date else None
+        table_dir = self._table_dir(destination)
+
+        files = sorted(
+            (entry['sequence'], path) for path, entry in self._read_manifest(destination).items()
+            if (wanted is None or entry['symbol'] in wanted)
+            and (start is None or entry['max_date'] >= start)
+            and (end is None or entry['min_date'] <= end)
+        )
+        read_columns = None
+        if columns is not None:
+            read_columns = list(dict.fromkeys([*columns, 'symbol', 'date']))
+
+        tables = []
+        for _, path in files:
+            with pa.memory_map(os.path.join(table_dir, path)) as source:
+                tables.append(pq.read_table(source, columns=read_columns, memory_map=True))
+        if not tables:
+            return pa.table({}) if as_arrow else pd.DataFrame(columns=columns)
+
+        table = pa.concat_tables(tables, promote_options='permissive')
+        if start is not None:
+            table = table.filter(pc.field('date') >= pa.scalar(pd.Timestamp(start)))
+        if end is not None:
+            table = table.filter(pc.field('date') < pa.scalar(pd.Timestamp(end) + pd.Timedelta(days=1)))
+
+        if dedupe:
+            # files were concatenated oldest first, keep the last copy of each key
+            df = table.to_pandas()
+            df = df.drop_duplicates(subset=['symbol', 'date'], keep='last').reset_index(drop=True)
+            if columns is not None:
+                df = df[columns]
+            return pa.Table.from_pandas(df, preserve_index=False) if as_arrow else df
+
+        if columns is not None:
+            table = table.select(columns)
+        return table if as_arrow else table.to_pandas()
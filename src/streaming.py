@@ -0,0 +1,115 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Iterator, List
+
+import pandas as pd
+
+class MicroBatcher:
+    def __init__(self,
+                 flush_func: Callable[[pd.DataFrame], bool],
+                 max_rows: int = 50_000,
+                 max_bytes: int = 64 * 2**20):
+        """
+        Buffers transformed frames and hands them to flush_func in micro-batches
+        Args:
+            flush_func (callable): Loads one batch, returns True on success
+            max_rows (int): Flush once this many rows are buffered
+            max_bytes (int): Flush once the buffered frames use this much memory
+        """
+        self.flush_func = flush_func
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger(__name__)
+
+        self._frames: List[pd.DataFrame] = []
+        self._rows = 0
+        self._bytes = 0
+        self.stats = {'batches': 0,
+                      'failed_batches': 0,
+                      'rows_loaded': 0,
+                      'rows_failed': 0,
+                      'flush_seconds': 0.0}
+
+    def add(self, df: pd.DataFrame):
+        """Buffer a frame, flushing when the row or byte threshold is reached"""
+        if df is None or df.empty:
+            return
+        self._frames.append(df)
+        self._rows += len(df)
+        self._bytes += int(df.memory_usage(index=False).sum())
+        if self._rows >= self.max_rows or self._bytes >= self.max_bytes:
+            self.flush()
+
+    def flush(self):
+        """Load everything buffered so far as one batch"""
+        if not self._frames:
+            return
+        batch = pd.concat(self._frames, ignore_index=True)
+        if 'symbol' in batch.columns and batch['symbol'].dtype != 'category':
+            # per-ticker categoricals concatenate to object, restore one shared dictionary
+            batch['symbol'] = batch['symbol'].astype('category')
+        self._frames, self._rows, self._bytes = [], 0, 0
+
+        start = time.perf_counter()
+        ok = self.flush_func(batch)
+        self.stats['flush_seconds'] += time.perf_counter() - start
+        self.stats['batches'] += 1
+        if ok:
+            self.stats['rows_loaded'] += len(batch)
+        else:
+            self.stats['failed_batches'] += 1
+            self.stats['rows_failed'] += len(batch)
+        self.logger.info(f"Flushed micro-batch {self.stats['batches']} with {len(batch)} rows "
+                         f"({'ok' if ok else 'failed'})")
+
+
+_DONE = object()
+
+def prefetch(source: Iterator, maxsize: int = 16) -> Iterator:
+    """
+    Drain an iterator on a background thread through a bounded queue, so the
+    producer keeps working while the consumer is busy but never gets more
+    than maxsize items ahead of it
+    """
+    buffer: "queue.Queue" = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    failure: List[BaseException] = []
+
+    def produce():
+        try:
+            for item in source:
+                while not stop.is_set():
+                    try:
+                        buffer.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    break
+        except BaseException as e:
+            failure.append(e)
+        finally:
+            if hasattr(source, 'close'):
+                source.close()
+            buffer.put(_DONE)
+
+    producer = threading.Thread(target=produce, name="prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                break
+            yield item
+        if failure:
+            raise failure[0]
+    finally:
+        stop.set()
+        # unblock a producer waiting on a full queue so it can see the stop flag
+        while producer.is_alive():
+            try:
+                buffer.get_nowait()
+            except queue.Empty:
+                producer.join(timeout=0.1)
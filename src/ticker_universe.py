@@ -0,0 +1,170 @@
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from src.http_transport import HttpTransport, get_default_transport
+
+SP500_URL = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
+
+def parse_constituents(html: str, table_id: str = 'constituents') -> List[str]:
+    """
+    Ticker symbols from the first column of the constituents table, in page order
+    Args:
+        html (str): Page source, e.g. the Wikipedia S&P 500 list or a saved copy of it
+        table_id (str): id of the table to read, the first table of the page is used
+            when no table has this id
+
+    Returns:
+        List of ticker symbols, duplicates removed
+    """
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    # only the constituents table is built into a tree, the rest of the page is skipped
+    soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer('table', id=table_id))
+    table = soup.find('table')
+    if table is None:
+        soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer('table'))
+        table = soup.find('table')
+    if table is None:
+        raise ValueError("No constituents table found in page")
+
+    tickers = []
+    seen = set()
+    for row in table.find_all('tr'):
+        cell = row.find('td')
+        if cell is None:
+            continue  # header row
+        ticker = cell.get_text(strip=True)
+        if ticker and ticker not in seen:
+            seen.add(ticker)
+            tickers.append(ticker)
+    if not tickers:
+        # a layout change, not an empty index: never let it wipe the universe
+        raise ValueError("Constituents table has no ticker rows")
+    return tickers
+
+def diff_universe(previous: Iterable[str], current: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Returns:
+        dict with the sorted 'added' and 'removed' tickers and the 'unchanged' count
+    """
+    previous, current = set(previous), set(current)
+    return {'added': sorted(current - previous),
+            'removed': sorted(previous - current),
+            'unchanged': len(previous & current)}
+
+
+class TickerUniverse:
+    def __init__(self,
+                 url: str = SP500_URL,
+                 state_path: str = ".state/universe.json",
+                 transport: Optional[HttpTransport] = None):
+        """
+        Ticker universe scraped from an index constituents page, refreshed with
+        conditional requests and diffed against the previous refresh
+        Args:
+            url (str): Page with the constituents table
+            state_path (str): JSON file keeping the tickers, ETag and Last-Modified
+            transport (HttpTransport, optional): Pooled HTTP session, defaults to the process-wide one
+        """
+        self.url = url
+        self.state_path = state_path
+        self.transport = transport or get_default_transport()
+        self.logger = logging.getLogger(__name__)
+        self.state = self._read_state()
+
+    def _read_state(self) -> dict:
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return {'tickers': []}
+        if state.get('url') != self.url:
+            # a different index, the cached validators and tickers don't apply
+            return {'tickers': []}
+        return state
+
+    def _write_state(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+        tmp_path = f"{self.state_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    @property
+    def tickers(self) -> List[str]:
+        """Tickers as of the last refresh"""
+        return list(self.state.get('tickers', []))
+
+    @property
+    def pending(self) -> List[str]:
+        """Added tickers whose history backfill has not succeeded yet"""
+        return list(self.state.get('pending', []))
+
+    def mark_loaded(self, tickers: Iterable[str]):
+        """Take tickers off the pending list once their backfill has loaded"""
+        loaded = set(tickers)
+        pending = [ticker for ticker in self.pending if ticker not in loaded]
+        if len(pending) != len(self.pending):
+            self.state['pending'] = pending
+            self._write_state()
+
+    def apply(self, tickers: List[str], **validators) -> Dict[str, List[str]]:
+        """
+        Replace the stored universe and report what changed. Added tickers stay
+        pending until mark_loaded, so a failed backfill is retried by the next run
+        Args:
+            tickers: The new universe
+            validators: etag / last_modified of the response the tickers came from
+
+        Returns:
+            diff_universe of the previous and the new universe
+        """
+        diff = diff_universe(self.state.get('tickers', []), tickers)
+        current = set(tickers)
+        pending = sorted((set(self.pending) | set(diff['added'])) & current)
+        self.state = {'url': self.url,
+                      'tickers': tickers,
+                      'pending': pending,
+                      'etag': validators.get('etag'),
+                      'last_modified': validators.get('last_modified'),
+                      'refreshed_at': datetime.now(timezone.utc).isoformat(timespec="seconds")}
+        self._write_state()
+        self.logger.info(f"Ticker universe: {len(tickers)} tickers, "
+                         f"{len(diff['added'])} added, {len(diff['removed'])} removed")
+        return diff
+
+    def refresh(self, timeout: float = 15) -> Dict[str, List[str]]:
+        """
+        Fetch the page unless it is unchanged since the last refresh (HTTP 304),
+        parse it and diff it against the stored universe
+        Returns:
+            dict with 'added', 'removed' and 'unchanged', both lists are empty
+            when the page has not changed
+        """
+        headers = {}
+        if self.state.get('tickers'):
+            if self.state.get('etag'):
+                headers['If-None-Match'] = self.state['etag']
+            if self.state.get('last_modified'):
+                headers['If-Modified-Since'] = self.state['last_modified']
+
+        res = self.transport.get(self.url, timeout=timeout, headers=headers)
+        if res.status_code == 304:
+            self.logger.info("Ticker universe page not modified, keeping the stored universe")
+            return {'added': [], 'removed': [], 'unchanged': len(self.state['tickers'])}
+        res.raise_for_status()
+
+        tickers = parse_constituents(res.text)
+        return self.apply(tickers,
+                          etag=res.headers.get('ETag'),
+                          last_modified=res.headers.get('Last-Modified'))
+
+    def to_csv(self, path: str):
+        """Write the universe in the `Ticker` column CSV format read through TICKER_CSV"""
+        import pandas as pd
+
+        pd.DataFrame({'Ticker': self.tickers}).to_csv(path)
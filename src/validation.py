@@ -0,0 +1,156 @@
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# columns every price row needs, with the kind of values they must hold
+REQUIRED_COLUMNS = {'symbol': 'string',
+                    'date': 'datetime',
+                    'open': 'float',
+                    'high': 'float',
+                    'low': 'float',
+                    'close': 'float',
+                    'volume': 'integer'}
+
+# one bit per row-level check, a quarantined row lists every check it failed
+CHECKS = ('missing_value', 'bad_type', 'duplicate', 'non_positive_price',
+          'negative_volume', 'ohlc_inconsistent')
+
+class ValidationResult:
+    def __init__(self, valid: pd.DataFrame, quarantine: pd.DataFrame, report: dict):
+        """
+        Outcome of validate_prices
+        Args:
+            valid: Rows that passed every check, with the expected dtypes
+            quarantine: Rows that failed, with a `reason` column
+            report: Row counts per check, gap list and totals
+        """
+        self.valid = valid
+        self.quarantine = quarantine
+        self.report = report
+
+    @property
+    def ok(self) -> bool:
+        return self.quarantine.empty
+
+
+def validate_prices(df: pd.DataFrame,
+                    key_columns=('symbol', 'date'),
+                    max_gap_days: int = 7,
+                    max_reported_gaps: int = 100) -> ValidationResult:
+    """
+    Validate a combined price frame in one vectorized pass: schema and dtypes,
+    duplicate keys, non-positive prices, negative volume, OHLC consistency
+    (low <= open/close <= high) and date gaps. Gaps are reported but do not
+    quarantine rows, a halted or newly listed ticker is not bad data.
+    ETLProcessor.transform already coerces malformed values to NaN/NaT, those
+    rows are reported as missing_value; bad_type is for frames built elsewhere.
+    Args:
+        df: Transformed price frame
+        key_columns: Columns identifying a row, duplicates after the first are quarantined
+        max_gap_days: Calendar days between consecutive rows of a symbol reported as a gap
+        max_reported_gaps: Gaps listed in the report, the count covers all of them
+
+    Returns:
+        ValidationResult
+    Raises:
+        ValueError: If required columns are missing, no row could be valid then
+    """
+    missing_columns = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing_columns:
+        logger.error(f"Price frame is missing columns {missing_columns}")
+        raise ValueError(f"Price frame is missing required columns: {missing_columns}")
+
+    n = len(df)
+    flags = np.zeros(n, dtype=np.uint8)
+    bit = {name: np.uint8(1 << i) for i, name in enumerate(CHECKS)}
+    frame = df.copy(deep=False)
+
+    # dtypes: coerce, a value that was present but does not convert is a bad type
+    for column, kind in REQUIRED_COLUMNS.items():
+        raw = frame[column]
+        absent = raw.isna().to_numpy()
+        if kind == 'datetime':
+            converted = raw if pd.api.types.is_datetime64_any_dtype(raw) else pd.to_datetime(raw, errors='coerce')
+        elif kind in ('float', 'integer'):
+            converted = raw if pd.api.types.is_numeric_dtype(raw) else pd.to_numeric(raw, errors='coerce')
+        else:
+            converted = raw
+            absent |= (raw.astype(str).str.strip() == '').to_numpy()
+        failed = converted.isna().to_numpy() & ~absent
+        flags[absent] |= bit['missing_value']
+        flags[failed] |= bit['bad_type']
+        frame[column] = converted
+
+    prices = frame[['open', 'high', 'low', 'close']].to_numpy(dtype='float64')
+    with np.errstate(invalid='ignore'):
+        flags[(prices <= 0).any(axis=1)] |= bit['non_positive_price']
+        flags[frame['volume'].to_numpy(dtype='float64') < 0] |= bit['negative_volume']
+        open_, high, low, close = prices.T
+        body_low = np.minimum(open_, close)
+        body_high = np.maximum(open_, close)
+        flags[(low > body_low) | (body_high > high) | (low > high)] |= bit['ohlc_inconsistent']
+
+    key = [frame[column].astype(str) if column == 'symbol' else frame[column] for column in key_columns]
+    duplicated = pd.DataFrame(dict(zip(key_columns, key))).duplicated(keep='first').to_numpy()
+    flags[duplicated] |= bit['duplicate']
+
+    bad = flags != 0
+    valid = frame[~bad]
+    if len(valid) and valid['volume'].dtype != 'int64':
+        valid = valid.assign(volume=valid['volume'].astype('int64'))
+
+    quarantine = df[bad].copy()
+    bad_flags = flags[bad]
+    reasons = np.full(len(quarantine), '', dtype=object)
+    for name in CHECKS:
+        hit = (bad_flags & bit[name]) != 0
+        reasons[hit] = np.where(reasons[hit] == '', name, reasons[hit] + ',' + name)
+    quarantine['reason'] = reasons
+
+    report = {'rows': n,
+              'valid_rows': int(len(valid)),
+              'quarantined_rows': int(bad.sum()),
+              'checks': {name: int(((flags & bit[name]) != 0).sum()) for name in CHECKS}}
+    report.update(_find_gaps(valid, max_gap_days, max_reported_gaps))
+
+    if report['quarantined_rows']:
+        logger.warning(f"Validation quarantined {report['quarantined_rows']}/{n} rows: "
+                       f"{ {k: v for k, v in report['checks'].items() if v} }")
+    return ValidationResult(valid, quarantine, report)
+
+def _find_gaps(df: pd.DataFrame, max_gap_days: int, max_reported: int) -> dict:
+    """Consecutive rows of a symbol further apart than max_gap_days"""
+    if df.empty:
+        return {'gaps': 0, 'gap_list': []}
+    ordered = df[['symbol', 'date']].sort_values(['symbol', 'date'], kind='stable')
+    symbols = ordered['symbol'].astype(str).to_numpy()
+    dates = ordered['date'].to_numpy()
+    same_symbol = symbols[1:] == symbols[:-1]
+    delta_days = (dates[1:] - dates[:-1]) / np.timedelta64(1, 'D')
+    gap = np.flatnonzero(same_symbol & (delta_days > max_gap_days))
+    gap_list = [{'symbol': symbols[i],
+                 'from': str(pd.Timestamp(dates[i]).date()),
+                 'to': str(pd.Timestamp(dates[i + 1]).date())} for i in gap[:max_reported]]
+    return {'gaps': int(len(gap)), 'gap_list': gap_list}
+
+def write_quarantine(quarantine: pd.DataFrame, directory: str = "data/quarantine") -> Optional[str]:
+    """
+    Write quarantined rows to a new CSV file, values as they arrived
+    Returns:
+        Path of the file, None when there was nothing to write
+    """
+    if quarantine is None or quarantine.empty:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    name = f"quarantine-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}.csv"
+    path = os.path.join(directory, name)
+    quarantine.to_csv(path, index=False)
+    logger.info(f"Wrote {len(quarantine)} quarantined rows to {path}")
+    return path
@@ -0,0 +1,124 @@
+import logging
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+def plan_ranges(ticker_list: List[str],
+                marks: Dict[str, date],
+                lookback_days: int = 1825,
+                end_date: Optional[date] = None) -> Dict[str, Tuple[date, date]]:
+    """
+    Missing date range of every ticker given its watermark
+    Args:
+        ticker_list: Ticker symbols to extract
+        marks: ticker -> last loaded date, as returned by a watermark store's get
+        lookback_days: History fetched for tickers that have never been loaded
+        end_date: Last date to fetch, defaults to today
+
+    Returns:
+        dict of ticker -> (start_date, end_date), tickers already up to date are left out
+    """
+    end_date = end_date or date.today()
+    plan = {}
+    for ticker in ticker_list:
+        last_loaded = marks.get(ticker)
+        if last_loaded is None:
+            start_date = end_date - timedelta(days=lookback_days)
+        else:
+            start_date = last_loaded + timedelta(days=1)
+        if start_date <= end_date:
+            plan[ticker] = (start_date, end_date)
+    return plan
+
+
+class WatermarkStore:
+    def __init__(self, path: str = ".state/watermarks.sqlite"):
+        """
+        Local store of the last loaded date per ticker
+        Args:
+            path (str): SQLite database file, ':memory:' for a throwaway store
+        """
+        self.path = path
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS watermarks ("
+            " symbol TEXT PRIMARY KEY,"
+            " last_date TEXT NOT NULL,"
+            " updated_at TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, symbols: Optional[Iterable[str]] = None) -> Dict[str, date]:
+        """
+        Returns:
+            dict of symbol -> last loaded date, symbols never loaded are absent
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT symbol, last_date FROM watermarks").fetchall()
+        marks = {symbol: date.fromisoformat(last_date) for symbol, last_date in rows}
+        if symbols is not None:
+            wanted = set(symbols)
+            marks = {symbol: d for symbol, d in marks.items() if symbol in wanted}
+        return marks
+
+    def update(self, marks: Dict[str, date]):
+        """Advance watermarks, an older date never moves a watermark backwards"""
+        if not marks:
+            return
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        rows = [(symbol, d.isoformat(), now) for symbol, d in marks.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO watermarks (symbol, last_date, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(symbol) DO UPDATE SET "
+                " last_date = MAX(last_date, excluded.last_date),"
+                " updated_at = excluded.updated_at",
+                rows,
+            )
+            self._conn.commit()
+        self.logger.info(f"Advanced watermarks for {len(rows)} tickers")
+
+    def update_from_frame(self, df):
+        """Advance watermarks to the newest date per symbol in a loaded DataFrame"""
+        import pandas as pd
+
+        if df is None or df.empty:
+            return
+        latest = pd.to_datetime(df['date']).groupby(df['symbol'].astype(str), observed=True).max()
+        self.update({symbol: ts.date() for symbol, ts in latest.items()})
+
+    def close(self):
+        self._conn.close()
+
+
+class BigQueryWatermarkSource:
+    def __init__(self, bigquery_client, table: str, date_column: str = "date"):
+        """
+        Watermarks read as MAX(date) per symbol from the BigQuery target table
+        Args:
+            bigquery_client (BigQueryConnector): Connector used to run the query
+            table (str): Fully qualified target table
+            date_column (str): Date column of the target table
+        """
+        self.bigquery_client = bigquery_client
+        self.table = table
+        self.date_column = date_column
+
+    def get(self, symbols: Optional[Iterable[str]] = None) -> Dict[str, date]:
+        return self.bigquery_client.get_max_dates(self.table,
+                                                  symbols=list(symbols) if symbols is not None else None,
+                                                  date_column=self.date_column)
+
+    def update(self, marks: Dict[str, date]):
+        # the target table is the state, loading the data already advanced it
+        pass
+
+    def update_from_frame(self, df):
+        pass
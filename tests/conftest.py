@@ -0,0 +1,40 @@
+import random
+from datetime import date
+
+import pandas as pd
+import pytest
+
+@pytest.fixture
+def make_prices():
+    """
+    Factory of FMP-like daily records: make_prices(symbols, days, start=date(2024, 1, 1))
+    returns {symbol: [record, ...]} over business days, newest first like the API
+    """
+    def make(symbols, days, start=date(2024, 1, 1), seed=7):
+        rng = random.Random(seed)
+        dates = pd.bdate_range(start, periods=days).date
+        out = {}
+        for symbol in symbols:
+            price = rng.uniform(20, 500)
+            rows = []
+            for day in dates:
+                o = round(price * rng.uniform(0.98, 1.02), 2)
+                price = c = round(price * rng.uniform(0.97, 1.03), 2)
+                rows.append({'symbol': symbol, 'date': day.isoformat(), 'open': o,
+                             'high': round(max(o, c) * 1.01, 2), 'low': round(min(o, c) * 0.99, 2),
+                             'close': c, 'volume': rng.randint(10_000, 5_000_000),
+                             'change': round(c - o, 2), 'changePercent': round((c - o) / o * 100, 5),
+                             'vwap': round((o + c) / 2, 4)})
+            out[symbol] = rows[::-1]
+        return out
+    return make
+
+@pytest.fixture
+def price_frame(make_prices):
+    """Factory of a price DataFrame for symbols x business days, oldest first"""
+    def make(symbols, days, start=date(2024, 1, 1), seed=7):
+        records = [row for rows in make_prices(symbols, days, start, seed).values() for row in rows[::-1]]
+        df = pd.DataFrame(records)
+        df['date'] = pd.to_datetime(df['date'])
+        return df
+    return make
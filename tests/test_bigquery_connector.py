@@ -0,0 +1,110 @@
+import re
+from datetime import date
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('google.cloud.bigquery')
+
+from src.bigquery_connector import BigQueryConnector
+from src.fake_bigquery import FakeBigQueryClient
+
+TARGET = 'proj.stock_market.prices'
+
+@pytest.fixture
+def warehouse():
+    return FakeBigQueryClient()
+
+@pytest.fixture
+def connector(warehouse):
+    return BigQueryConnector('proj', None, client=warehouse)
+
+def merge_sql(warehouse):
+    (job,) = [job for job in warehouse.queries if 'MERGE' in job.query]
+    return re.sub(r'\s+', ' ', job.query).strip()
+
+
+def test_upsert_stages_the_batch_then_merges_it(connector, warehouse, price_frame):
+    df = price_frame(['AAA', 'BBB'], 5)
+    result = connector.upsert_data(df, TARGET)
+
+    (load,) = warehouse.jobs
+    staging = load.destination
+    assert re.fullmatch(r'proj\.stock_market_staging\.prices_staging_[0-9a-f]{8}', staging)
+    assert load.output_rows == 10 and result['staged_rows'] == 10
+    # the staging table is dropped once merged
+    assert warehouse.deleted_tables == [staging]
+
+    sql = merge_sql(warehouse)
+    assert sql.startswith(f"MERGE `{TARGET}` T USING ( SELECT * FROM `{staging}`")
+    assert "QUALIFY ROW_NUMBER() OVER (PARTITION BY `symbol`, `date` ORDER BY `_load_seq` DESC) = 1" in sql
+    assert "ON T.`symbol` = S.`symbol` AND T.`date` = S.`date`" in sql
+
+def test_merge_only_scans_the_partitions_of_the_batch(connector, warehouse, price_frame):
+    connector.upsert_data(price_frame(['AAA'], 5), TARGET)
+    assert "AND T.`date` BETWEEN DATE '2024-01-01' AND DATE '2024-01-05'" in merge_sql(warehouse)
+
+def test_merge_updates_values_and_inserts_every_column(connector, warehouse, price_frame):
+    df = price_frame(['AAA'], 3)
+    connector.upsert_data(df, TARGET)
+    sql = merge_sql(warehouse)
+
+    update = sql.split('WHEN MATCHED THEN UPDATE SET ')[1].split(' WHEN NOT MATCHED')[0]
+    assert update.split(', ') == [f"`{c}` = S.`{c}`" for c in df.columns if c not in ('symbol', 'date')]
+    columns = ', '.join(f"`{c}`" for c in df.columns)
+    values = ', '.join(f"S.`{c}`" for c in df.columns)
+    assert sql.endswith(f"WHEN NOT MATCHED THEN INSERT ({columns}) VALUES ({values})")
+
+def test_staged_dates_match_the_date_partition_column(connector, warehouse, price_frame):
+    staged = []
+    load = warehouse.load_table_from_file
+
+    def capture(file_obj, destination, job_config=None, **kwargs):
+        job = load(file_obj, destination, job_config, **kwargs)
+        staged.append(warehouse.table_frame(destination))
+        return job
+
+    warehouse.load_table_from_file = capture
+    connector.upsert_data(price_frame(['AAA'], 3), TARGET)
+    assert [type(d) for d in staged[0]['date']] == [date] * 3
+
+def test_the_last_row_of_a_duplicated_key_is_merged(connector, warehouse, price_frame):
+    staged = []
+    load = warehouse.load_table_from_file
+
+    def capture(file_obj, destination, job_config=None, **kwargs):
+        job = load(file_obj, destination, job_config, **kwargs)
+        staged.append(warehouse.table_frame(destination))
+        return job
+
+    warehouse.load_table_from_file = capture
+    df = price_frame(['AAA'], 2)
+    rewritten = df.iloc[[1]].assign(close=df['close'].iloc[1] + 1)
+    connector.upsert_data(pd.concat([df, rewritten], ignore_index=True), TARGET)
+
+    # rows are numbered in write order and the highest number of a key wins
+    assert list(staged[0]['_load_seq']) == [0, 1, 2]
+    sql = merge_sql(warehouse)
+    assert "ORDER BY `_load_seq` DESC) = 1" in sql
+    assert '_load_seq' not in sql.split(' ON ')[1]
+
+def test_staging_dataset_defaults_to_the_target_dataset(connector, warehouse, price_frame):
+    connector.upsert_data(price_frame(['AAA'], 2), 'stock_market.prices', staging_dataset=None)
+    assert warehouse.jobs[0].destination.startswith('proj.stock_market.prices_staging_')
+
+def test_staging_table_is_dropped_when_the_load_fails(price_frame):
+    warehouse = FakeBigQueryClient(fail_every=1)
+    connector = BigQueryConnector('proj', None, client=warehouse)
+    with pytest.raises(Exception):
+        connector.upsert_data(price_frame(['AAA'], 2), TARGET)
+    assert warehouse.deleted_tables == [warehouse.jobs[0].destination]
+    assert not any('MERGE' in job.query for job in warehouse.queries)
+
+@pytest.mark.parametrize('columns', [['close'], ['symbol', 'close']])
+def test_upsert_rejects_frames_without_keys(connector, price_frame, columns):
+    with pytest.raises(ValueError):
+        connector.upsert_data(price_frame(['AAA'], 2)[columns], TARGET)
+
+def test_upsert_rejects_empty_frames(connector, price_frame):
+    with pytest.raises(ValueError):
+        connector.upsert_data(price_frame(['AAA'], 2).iloc[0:0], TARGET)
@@ -0,0 +1,161 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import json
+
+import pytest
+
+from benchmarks.stub_server import StubApiServer
+from src.cache import MemoryCache, ResponseCache, SQLiteCache, backends, market_aware_ttl
+from src.cache.response_cache import MARKET_TZ
+from src.connectors import FMPClient
+from src.rate_limiter import TokenBucketLimiter
+from src.retry_policy import FailureKind, ProviderError, RetryPolicy
+
+@pytest.fixture
+def clock(monkeypatch):
+    state = SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(backends, 'time', SimpleNamespace(time=lambda: state.now))
+    return state
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request):
+    return MemoryCache(max_entries=3) if request.param == 'memory' else SQLiteCache(':memory:', max_entries=3)
+
+class JsonResponse:
+    def __init__(self, payload, status_code=200):
+        self.content = json.dumps(payload).encode()
+        self.text = self.content.decode()
+        self.status_code = status_code
+        self.headers = {'Content-Type': 'application/json'}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class FixedTransport:
+    """Answers every request with the same JSON payload and counts the calls"""
+    def __init__(self, payload):
+        self.payload = payload
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.calls += 1
+        return JsonResponse(self.payload)
+
+def fixed_client(payload):
+    transport = FixedTransport(payload)
+    client = FMPClient('http://fmp.test/stable/historical-price-eod/full?symbol=', 'test-key',
+                       rate_limiter=TokenBucketLimiter(100, 1), transport=transport,
+                       cache=ResponseCache(MemoryCache(), ttl=lambda: 60),
+                       retry_policy=RetryPolicy('fmp', max_attempts=1))
+    return client, transport
+
+def eastern(*args):
+    return datetime(*args, tzinfo=MARKET_TZ)
+
+
+# 1. Keys
+def test_key_ignores_parameter_order():
+    cache = ResponseCache(MemoryCache())
+    assert cache.make_key('fmp/eod', 'AAA', {'from': '2024-01-01', 'to': '2024-02-01'}) == \
+        cache.make_key('fmp/eod', 'AAA', {'to': '2024-02-01', 'from': '2024-01-01'})
+
+def test_key_separates_endpoint_symbol_range_and_namespace():
+    cache = ResponseCache(MemoryCache())
+    key = cache.make_key('fmp/eod', 'AAA', {'timeseries': 365})
+    assert len({key,
+                cache.make_key('fmp/eod-bulk', 'AAA', {'timeseries': 365}),
+                cache.make_key('fmp/eod', 'BBB', {'timeseries': 365}),
+                cache.make_key('fmp/eod', 'AAA', {'timeseries': 1825}),
+                ResponseCache(MemoryCache(), namespace='v2').make_key('fmp/eod', 'AAA', {'timeseries': 365})}) == 5
+
+def test_clients_with_different_api_keys_share_entries():
+    cache = ResponseCache(MemoryCache(), ttl=lambda: 60)
+    with StubApiServer() as stub:
+        def client(api_key):
+            return FMPClient(stub.fmp_url, api_key, rate_limiter=TokenBucketLimiter(100, 1), cache=cache)
+
+        first = client('key-a').get_yearly_data('AAA')
+        second = client('key-b').get_yearly_data('AAA')
+        assert stub.requests == 1
+        assert second.to_records() == first.to_records()
+        assert not any('key-a' in key for key in cache.backend._data)
+
+
+@pytest.mark.parametrize('message, kind', [
+    ('Invalid API KEY. Please retry or visit our documentation', FailureKind.PERMANENT),
+    ('Limit Reach . Please upgrade your plan', FailureKind.QUOTA),
+    ('Something went wrong', FailureKind.TRANSIENT),
+])
+def test_fmp_error_objects_raise_and_are_never_cached(message, kind):
+    client, transport = fixed_client({'Error Message': message})
+    for _ in range(2):
+        with pytest.raises(ProviderError) as error:
+            client.get_yearly_data('AAA')
+        assert error.value.kind == kind
+    assert transport.calls == 2
+    assert len(client.cache.backend) == 0
+
+def test_fmp_rows_are_cached():
+    client, transport = fixed_client([{'symbol': 'AAA', 'date': '2026-01-08', 'open': 1.0, 'high': 1.0,
+                                       'low': 1.0, 'close': 1.0, 'volume': 10}])
+    assert len(client.get_yearly_data('AAA')) == 1
+    assert len(client.get_yearly_data('AAA')) == 1
+    assert transport.calls == 1
+
+def test_bulk_error_objects_are_never_cached():
+    client, transport = fixed_client({'Error Message': 'Something went wrong'})
+    for _ in range(2):
+        with pytest.raises(ProviderError):
+            client.get_bulk_range(['AAA'], '2026-01-08', '2026-01-08')
+    assert transport.calls == 2
+
+
+# 2. Backends
+def test_entries_expire_after_their_ttl(backend, clock):
+    backend.set('a', b'1', ttl=10)
+    backend.set('b', b'2', ttl=None)
+    clock.now += 9.9
+    assert backend.get('a') == b'1'
+    clock.now += 0.2
+    assert backend.get('a') is None
+    assert backend.get('b') == b'2'
+    assert backend.stats()['expirations'] == 1
+
+def test_least_recently_used_entry_is_evicted(backend, clock):
+    for key in ('a', 'b', 'c'):
+        backend.set(key, key.encode(), ttl=60)
+        clock.now += 1
+    backend.get('a')
+    clock.now += 1
+    backend.set('d', b'd', ttl=60)
+
+    assert backend.get('b') is None
+    assert [backend.get(key) for key in ('a', 'c', 'd')] == [b'a', b'c', b'd']
+    assert backend.stats()['evictions'] == 1
+
+def test_undecodable_entries_are_dropped():
+    cache = ResponseCache(MemoryCache())
+    cache.backend.set('k', b'not json', ttl=60)
+    assert cache.get('k') is None
+    assert cache.backend.get('k') is None
+
+
+# 3. TTL
+def test_ttl_is_short_while_the_market_is_open():
+    assert market_aware_ttl(eastern(2026, 1, 7, 11, 0)) == 900
+    # the closing bar is still settling
+    assert market_aware_ttl(eastern(2026, 1, 7, 16, 45)) == 900
+
+def test_ttl_runs_to_the_next_open_outside_the_session():
+    assert market_aware_ttl(eastern(2026, 1, 7, 18, 0)) == pytest.approx(15.5 * 3600)
+    assert market_aware_ttl(eastern(2026, 1, 8, 7, 30)) == pytest.approx(2 * 3600)
+    # Friday evening to Monday morning
+    assert market_aware_ttl(eastern(2026, 1, 9, 20, 0)) == pytest.approx((2 * 24 + 13.5) * 3600)
+
+def test_ttl_never_drops_below_the_intraday_ttl():
+    assert market_aware_ttl(eastern(2026, 1, 8, 9, 25)) == 900
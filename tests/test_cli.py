@@ -0,0 +1,68 @@
+import pytest
+
+from benchmarks.stub_server import StubApiServer
+from src import cli
+from src.sinks import ParquetSink
+from src.watermark_store import WatermarkStore
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli, 'STATE_DIR', str(tmp_path / 'state'))
+    return tmp_path / 'state'
+
+@pytest.fixture
+def stub(monkeypatch):
+    with StubApiServer(latency=0.001) as server:
+        monkeypatch.setenv('FMP_API_URL', server.fmp_url)
+        monkeypatch.setenv('FMP_API_KEY', 'test-key')
+        monkeypatch.delenv('ALPHA_API_URL', raising=False)
+        monkeypatch.delenv('ALPHA_API_KEY', raising=False)
+        yield server
+
+def run(argv):
+    args = cli.build_parser().parse_args(argv)
+    return args.func(args, cli.load_config())
+
+
+def test_check_config_reports_a_non_numeric_worker_count(monkeypatch):
+    monkeypatch.setenv('ETL_WORKERS', 'four')
+    problems = cli.check_config(cli.load_config(), sink='parquet')
+    assert any('ETL_WORKERS' in problem for problem in problems)
+
+def test_sharded_incremental_run_advances_watermarks(tmp_path, state_dir, stub):
+    lake = str(tmp_path / 'lake')
+    argv = ['run', '--incremental', '--tickers', 'AAA,BBB,CCC', '--table', 'prices',
+            '--sink', 'parquet', '--lake-root', lake, '--workers', '2', '--threads', '2']
+
+    assert run(argv) == 0
+    coverage = ParquetSink(lake).coverage('prices')
+    marks = WatermarkStore(str(state_dir / 'watermarks.sqlite')).get()
+    assert sorted(marks) == ['AAA', 'BBB', 'CCC']
+    assert {symbol: d.isoformat() for symbol, d in marks.items()} == coverage['max_date'].to_dict()
+
+    # the second run only asks for dates after the watermarks
+    fetched = stub.paths['/stable/historical-price-eod/full']
+    assert run(argv) == 0
+    assert stub.paths['/stable/historical-price-eod/full'] - fetched <= 3
+    assert ParquetSink(lake).coverage('prices')['rows'].equals(coverage['rows'])
+
+class RecordingProcessor:
+    """Stands in for ETLProcessor, failing the five year backfill"""
+    def __init__(self):
+        self.calls = []
+
+    def run_streaming(self, tickers, table, data_type='yearly', **kwargs):
+        self.calls.append((data_type, list(tickers)))
+        failed = 1 if data_type == 'five_year' else 0
+        return {'failed_batches': failed, 'run_status': 'complete'}
+
+def test_run_exit_code_counts_the_new_constituent_backfill(monkeypatch, state_dir):
+    monkeypatch.setenv('FMP_API_URL', 'http://fmp.invalid')
+    monkeypatch.setenv('FMP_API_KEY', 'test-key')
+    processor = RecordingProcessor()
+    monkeypatch.setattr(cli, 'resolve_tickers', lambda *args, **kwargs: (['AAA', 'BBB'], ['BBB']))
+    monkeypatch.setattr(cli, '_build_processor', lambda config, args: processor)
+
+    argv = ['run', '--sink', 'parquet', '--lake-root', str(state_dir / 'lake'), '--workers', '1']
+    assert run(argv) == 1
+    assert processor.calls == [('five_year', ['BBB']), ('yearly', ['AAA'])]
@@ -0,0 +1,100 @@
+from datetime import date
+
+import pytest
+
+from benchmarks.stub_server import StubApiServer
+from src.connectors import CoalescedFetch, FMPClient
+from src.rate_limiter import TokenBucketLimiter
+from src.retry_policy import FailureKind, ProviderError, RetryPolicy
+
+# Monday to Thursday of the stub's last week
+START, END = date(2026, 1, 5), date(2026, 1, 8)
+
+def fmp_client(stub, **kwargs):
+    return FMPClient(stub.fmp_url, 'test-key', rate_limiter=TokenBucketLimiter(1000, 1, 'fmp'),
+                     retry_policy=RetryPolicy('fmp', max_attempts=2, base_delay=0.01), **kwargs)
+
+def dates(payload):
+    records = payload.to_records() if hasattr(payload, 'to_records') else payload
+    return [row['date'][:10] for row in records]
+
+
+@pytest.mark.parametrize('bulk_format', ['json', 'csv'])
+def test_bulk_range_matches_single_symbol_calls(bulk_format):
+    with StubApiServer(bulk_symbols=5, bulk_format=bulk_format) as stub:
+        client = fmp_client(stub)
+        bulk = client.get_bulk_range(['T0', 'T3', 'MISSING'], START, END)
+        assert stub.paths['/stable/eod-bulk'] == 4
+
+        assert bulk['MISSING'] == []
+        for symbol in ('T0', 'T3'):
+            # normalized to the historical rows' fields
+            assert set(bulk[symbol][0]) == set(client.get_historical_data(symbol, START, END).to_records()[0])
+            row = bulk[symbol][0]
+            assert row['change'] == pytest.approx(row['close'] - row['open'])
+            assert row['changePercent'] == pytest.approx((row['close'] - row['open']) / row['open'] * 100)
+            # the stub's prices depend on the requested range, so only the days are compared
+            assert dates(bulk[symbol]) == dates(client.get_historical_data(symbol, START, END))
+
+def test_bulk_range_skips_weekends():
+    with StubApiServer(bulk_symbols=2) as stub:
+        fmp_client(stub).get_bulk_range(['T0'], date(2026, 1, 2), date(2026, 1, 5))
+        assert stub.paths['/stable/eod-bulk'] == 2
+
+def test_bulk_range_rejects_a_response_that_is_not_rows():
+    with StubApiServer(bulk_symbols=2) as stub:
+        client = fmp_client(stub)
+        client._bulk_request = lambda day: 'Error: upstream timeout'
+        with pytest.raises(ProviderError) as error:
+            client.get_bulk_range(['T0'], START, END)
+        assert error.value.kind == FailureKind.TRANSIENT
+
+def test_coalesced_fetch_serves_every_symbol_from_one_bulk_range():
+    symbols = ['T0', 'T1', 'T2']
+    with StubApiServer(bulk_symbols=5) as stub:
+        fetch = CoalescedFetch(fmp_client(stub), symbols, START, END)
+        payloads = {symbol: fetch(symbol) for symbol in symbols}
+
+        assert stub.paths == {'/stable/eod-bulk': 4}
+        assert all(len(payload) == 4 for payload in payloads.values())
+        # each payload is handed out once
+        assert fetch('T0') == []
+
+def test_coalesced_fetch_falls_back_when_the_plan_rejects_bulk():
+    with StubApiServer(reject_batches=True) as stub:
+        client = fmp_client(stub)
+        fetch = CoalescedFetch(client, ['AAA', 'BBB'], START, END)
+
+        assert len(fetch('AAA')) == 4 and len(fetch('BBB')) == 4
+        assert client.bulk_supported is False
+        assert stub.paths['/stable/eod-bulk'] == 1
+        assert stub.paths['/stable/historical-price-eod/full'] == 2
+
+        # later groups go straight to single calls
+        CoalescedFetch(client, ['CCC'], START, END)('CCC')
+        assert stub.paths['/stable/eod-bulk'] == 1
+
+def test_coalesced_fetch_raises_transient_bulk_failures():
+    with StubApiServer(down_paths=('/stable/eod-bulk',)) as stub:
+        client = fmp_client(stub)
+        fetch = CoalescedFetch(client, ['AAA', 'BBB'], START, END)
+
+        for symbol in ('AAA', 'BBB'):
+            with pytest.raises(ProviderError) as error:
+                fetch(symbol)
+            assert error.value.kind == FailureKind.TRANSIENT
+        assert client.bulk_supported is True
+        assert '/stable/historical-price-eod/full' not in stub.paths
+
+def test_coalesced_fetch_hands_failed_groups_to_the_fallback():
+    with StubApiServer(down_paths=('/stable/eod-bulk',)) as stub:
+        fallen_back = []
+
+        def fallback(symbol, start_date, end_date):
+            fallen_back.append(symbol)
+            return [{'symbol': symbol, 'date': str(end_date)}]
+
+        fetch = CoalescedFetch(fmp_client(stub), ['AAA', 'BBB'], START, END, fallback=fallback)
+        assert fetch('AAA') == [{'symbol': 'AAA', 'date': '2026-01-08'}]
+        fetch('BBB')
+        assert fallen_back == ['AAA', 'BBB']
@@ -0,0 +1,45 @@
+import asyncio
+
+from benchmarks.stub_server import StubApiServer
+from src.http_transport import AsyncHttpTransport, HttpTransport
+
+def url(stub):
+    return f"{stub.base_url}/stable/historical-price-eod/full"
+
+def params(symbol):
+    return {'symbol': symbol, 'from': '2026-01-05', 'to': '2026-01-08'}
+
+
+def test_sync_transport_reuses_connections():
+    with StubApiServer() as stub:
+        transport = HttpTransport(pool_maxsize=2)
+        try:
+            for symbol in ('AAA', 'BBB', 'CCC', 'DDD'):
+                assert transport.get(url(stub), params=params(symbol)).status_code == 200
+            stats = transport.stats()
+        finally:
+            transport.close()
+
+    assert stats['requests'] == 4
+    assert stats['new_connections'] == 1 and stats['reuse_rate'] == 0.75
+
+def test_async_transport_runs_concurrent_requests_within_the_host_limit():
+    symbols = [f"T{i}" for i in range(12)]
+
+    async def fetch_all(stub):
+        transport = AsyncHttpTransport(max_connections=8, max_per_host=3)
+        try:
+            responses = await asyncio.gather(*(transport.get(url(stub), params=params(symbol))
+                                               for symbol in symbols))
+            return responses, transport.stats()
+        finally:
+            await transport.aclose()
+
+    with StubApiServer(latency=0.01) as stub:
+        responses, stats = asyncio.run(fetch_all(stub))
+
+    assert [res.json()[0]['symbol'] for res in responses] == symbols
+    assert stats['requests'] == 12
+    # the host limit caps the connections opened, the rest of the requests reuse them
+    assert 1 <= stats['new_connections'] <= 3
+    assert stats['reuse_rate'] >= 0.75
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.etl_processor import ETLProcessor
+from src.indicators import IndicatorState, compute_indicators
+from src.sinks import ParquetSink
+from src.watermark_store import WatermarkStore
+
+INDICATORS = ['return_1d', 'log_return', 'sma_5', 'sma_20', 'sma_50', 'volatility_20', 'vwap_20']
+
+def assert_same_indicators(actual, expected, rtol=1e-9):
+    actual = actual.sort_values(['symbol', 'date']).reset_index(drop=True)
+    expected = expected.sort_values(['symbol', 'date']).reset_index(drop=True)
+    assert actual[['symbol', 'date']].astype(str).equals(expected[['symbol', 'date']].astype(str))
+    for column in INDICATORS:
+        np.testing.assert_allclose(actual[column].to_numpy(), expected[column].to_numpy(),
+                                   rtol=rtol, equal_nan=True, err_msg=column)
+
+
+class HistoryClient:
+    """Serves get_historical_data from in-memory records"""
+    def __init__(self, records):
+        self.records = records
+
+    def get_historical_data(self, symbol, start_date=None, end_date=None):
+        return [row for row in self.records[symbol] if str(start_date) <= row['date'] <= str(end_date)]
+
+
+# 1. Windows
+def test_compute_indicators_windows(price_frame):
+    df = price_frame(['AAA'], 60)
+    out = compute_indicators(df)
+
+    close = df['close'].to_numpy()
+    assert np.isnan(out['sma_5'].iloc[3]) and np.isnan(out['return_1d'].iloc[0])
+    assert out['sma_5'].iloc[4] == pytest.approx(close[:5].mean())
+    assert out['sma_50'].iloc[-1] == pytest.approx(close[-50:].mean())
+    assert out['volatility_20'].iloc[-1] == pytest.approx(np.std(np.diff(np.log(close[-21:])), ddof=1))
+
+def test_symbols_do_not_share_windows(price_frame):
+    together = compute_indicators(price_frame(['AAA', 'BBB'], 30))
+    alone = compute_indicators(price_frame(['AAA', 'BBB'], 30).query("symbol == 'BBB'"))
+    assert_same_indicators(together[together['symbol'] == 'BBB'], alone)
+
+
+# 2. Incremental vs full
+@pytest.mark.parametrize('split', [1, 3, 20, 70])
+def test_incremental_update_matches_full_history(price_frame, split):
+    full = price_frame(['AAA', 'BBB', 'CCC'], 120)
+    cutoff = full['date'].sort_values().unique()[-split]
+    state = IndicatorState(':memory:')
+
+    state.update(full[full['date'] < cutoff])
+    incremental = state.update(full[full['date'] >= cutoff])
+
+    expected = compute_indicators(full)
+    assert_same_indicators(incremental, expected[expected['date'] >= cutoff])
+
+def test_update_seeded_with_history_matches_full_history(price_frame):
+    full = price_frame(['AAA', 'BBB'], 90)
+    cutoff = full['date'].sort_values().unique()[-3]
+    state = IndicatorState(':memory:')
+
+    # history as read back from the table, which already holds the new rows
+    result = state.update(full[full['date'] >= cutoff], history=full.groupby('symbol').tail(60))
+
+    expected = compute_indicators(full)
+    assert_same_indicators(result, expected[expected['date'] >= cutoff])
+    assert state.missing(['AAA', 'BBB', 'ZZZ']) == ['ZZZ']
+
+
+# 3. Incremental runs
+def test_run_incremental_requires_indicator_state(tmp_path):
+    processor = ETLProcessor(None, HistoryClient({}), None, sink=ParquetSink(str(tmp_path)))
+    with pytest.raises(ValueError):
+        processor.run_incremental(['AAA'], 'prices', WatermarkStore(':memory:'), features_table='features')
+
+def test_run_incremental_seeds_features_from_the_loaded_table(tmp_path, make_prices, price_frame):
+    records = make_prices(['AAA', 'BBB'], 80)
+    full = price_frame(['AAA', 'BBB'], 80)
+    dates = sorted(full['date'].unique())
+    sink = ParquetSink(str(tmp_path / 'lake'))
+    processor = ETLProcessor(None, HistoryClient(records), None, sink=sink)
+
+    # everything but the last 3 days was loaded before indicators were tracked
+    sink.write(full[full['date'] < dates[-3]], 'prices')
+    watermarks = WatermarkStore(':memory:')
+    watermarks.update({symbol: pd.Timestamp(dates[-4]).date() for symbol in records})
+
+    df = processor.run_incremental(['AAA', 'BBB'], 'prices', watermarks, end_date=pd.Timestamp(dates[-1]).date(),
+                                   features_table='features', indicator_state=IndicatorState(':memory:'),
+                                   validate=False)
+
+    assert len(df) == 6
+    features = sink.read('features')
+    expected = compute_indicators(full)
+    # the transform stores prices as float32
+    assert_same_indicators(features, expected[expected['date'] >= dates[-3]], rtol=1e-4)
+    assert features['sma_50'].notna().all()
+    assert watermarks.get()['AAA'] == pd.Timestamp(dates[-1]).date()
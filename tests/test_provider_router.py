@@ -0,0 +1,91 @@
+import pytest
+
+from benchmarks.stub_server import StubApiServer
+from src.connectors import AlphaAdvantage, FMPClient
+from src.provider_router import AlphaVantageProvider, FMPProvider, ProviderRouter, normalize_alpha_daily
+from src.rate_limiter import TokenBucketLimiter
+from src.retry_policy import FailureKind, ProviderError, RetryPolicy
+
+SERIES = {'Time Series (Daily)': {
+    day: {'1. open': '10.0', '2. high': '11.0', '3. low': '9.0', '4. close': close, '5. volume': '1000'}
+    for day, close in (('2026-01-02', '10.5'), ('2026-01-05', '10.0'), ('2026-01-06', '12.0'),
+                       ('2026-01-07', '9.5'), ('2026-01-08', '11.0'))}}
+
+def providers(stub):
+    def policy(name):
+        return RetryPolicy(name, max_attempts=2, base_delay=0.01, retry_quota=False)
+    fmp = FMPClient(stub.fmp_url, 'test-key', rate_limiter=TokenBucketLimiter(1000, 1, 'fmp'),
+                    retry_policy=policy('fmp'))
+    alpha = AlphaAdvantage(stub.alpha_url, 'test-key', rate_limiter=TokenBucketLimiter(1000, 1, 'alpha_vantage'),
+                           retry_policy=policy('alpha_vantage'))
+    return FMPProvider(fmp), AlphaVantageProvider(alpha)
+
+def dates(batch):
+    return [str(day)[:10] for day in batch.to_frame()['date']]
+
+
+# 1. Alpha Vantage payloads
+def test_normalize_alpha_daily_matches_the_fmp_schema():
+    batch = normalize_alpha_daily(SERIES, 'AAA')
+    frame = batch.to_frame()
+    assert dates(batch) == ['2026-01-08', '2026-01-07', '2026-01-06', '2026-01-05', '2026-01-02']
+    first = frame.iloc[0]
+    assert first['symbol'] == 'AAA' and first['volume'] == 1000
+    assert first['change'] == pytest.approx(1.0) and first['changePercent'] == pytest.approx(10.0)
+
+def test_normalize_alpha_daily_days_counts_trading_rows():
+    # three rows span a weekend, a calendar cutoff would keep two
+    assert dates(normalize_alpha_daily(SERIES, 'AAA', days=3)) == ['2026-01-08', '2026-01-07', '2026-01-06']
+    assert dates(normalize_alpha_daily(SERIES, 'AAA', days=5))[-1] == '2026-01-02'
+    assert dates(normalize_alpha_daily(SERIES, 'AAA', '2026-01-05', '2026-01-07')) == [
+        '2026-01-07', '2026-01-06', '2026-01-05']
+
+def test_normalize_alpha_daily_rejects_payloads_without_a_series():
+    with pytest.raises(ProviderError) as error:
+        normalize_alpha_daily({'Information': 'premium endpoint'}, 'AAA')
+    assert error.value.kind == FailureKind.PERMANENT
+
+@pytest.mark.parametrize('days', [20, 250])
+def test_providers_agree_on_the_last_days(days):
+    with StubApiServer() as stub:
+        fmp, alpha = providers(stub)
+        fmp_dates = dates(fmp.fetch('AAA', days=days))
+        assert len(fmp_dates) == days
+        assert dates(alpha.fetch('AAA', days=days)) == fmp_dates
+
+
+# 2. Routing
+def test_router_fails_over_when_a_provider_is_down():
+    with StubApiServer(down_paths=('/stable/',)) as stub:
+        router = ProviderRouter(list(providers(stub)))
+        batches = [router.get_yearly_data(symbol) for symbol in ('AAA', 'BBB', 'CCC')]
+
+        assert all(len(batch) == 365 for batch in batches)
+        stats = router.stats()
+        assert stats['alpha_vantage']['ok'] == 3
+        assert stats['fmp']['ok'] == 0 and stats['fmp']['failed'] >= 1
+
+def test_router_raises_the_last_error_when_every_provider_fails():
+    with StubApiServer(down_paths=('/stable/', '/query')) as stub:
+        router = ProviderRouter(list(providers(stub)))
+        with pytest.raises(ProviderError):
+            router.fetch('AAA', days=10)
+        assert router.stats()['alpha_vantage']['failed'] == 1
+
+def test_coalesced_ranges_fail_over_through_the_router():
+    from datetime import date
+
+    from src.etl_processor import ETLProcessor
+
+    with StubApiServer(down_paths=('/stable/',)) as stub:
+        fmp, alpha = providers(stub)
+        router = ProviderRouter([fmp, alpha])
+        processor = ETLProcessor(alpha.client, fmp.client, None, router=router)
+        plan = {symbol: (date(2026, 1, 5), date(2026, 1, 8)) for symbol in ('AAA', 'BBB')}
+
+        results = dict(processor.iter_extract_ranges(plan, use_retry=False, max_workers=2))
+
+        assert stub.paths['/stable/eod-bulk'] >= 1
+        assert {symbol: dates(batch) for symbol, batch in results.items()} == {
+            symbol: ['2026-01-08', '2026-01-07', '2026-01-06', '2026-01-05'] for symbol in plan}
+        assert router.stats()['alpha_vantage']['ok'] == 2
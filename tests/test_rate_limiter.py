@@ -0,0 +1,89 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src import rate_limiter
+from src.rate_limiter import TokenBucketLimiter, get_limiter
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock for the limiter module; sleeping advances it"""
+    state = SimpleNamespace(now=100.0, slept=[])
+
+    def sleep(seconds):
+        state.slept.append(seconds)
+        state.now += seconds
+
+    monkeypatch.setattr(rate_limiter, 'time', SimpleNamespace(monotonic=lambda: state.now, sleep=sleep))
+    return state
+
+
+def test_bucket_starts_full_and_refills_at_the_quota_rate(clock):
+    limiter = TokenBucketLimiter(5, 60)
+    assert all(limiter.try_acquire() for _ in range(5))
+    assert not limiter.try_acquire()
+
+    clock.now += 12  # one call's worth of a 5 per minute quota
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+
+def test_refill_never_exceeds_capacity(clock):
+    limiter = TokenBucketLimiter(3, 1)
+    clock.now += 3600
+    assert limiter.available == 3
+
+def test_acquire_waits_for_the_missing_tokens(clock):
+    limiter = TokenBucketLimiter(2, 1, name='fmp')
+    assert limiter.acquire() == 0 and limiter.acquire() == 0
+
+    assert limiter.acquire() == pytest.approx(0.5)
+    assert clock.slept == [pytest.approx(0.5)]
+    assert limiter.total_wait == pytest.approx(0.5)
+
+def test_pause_holds_every_caller_back(clock):
+    limiter = TokenBucketLimiter(10, 1)
+    limiter.pause(2)
+    assert not limiter.try_acquire()
+
+    clock.now += 2
+    assert not limiter.try_acquire()
+    clock.now += 0.15
+    assert limiter.try_acquire()
+
+@pytest.mark.parametrize('calls, period', [(0, 60), (5, 0), (-1, 1)])
+def test_rejects_empty_quotas(calls, period):
+    with pytest.raises(ValueError):
+        TokenBucketLimiter(calls, period)
+
+def test_acquire_rejects_more_tokens_than_the_bucket_holds():
+    with pytest.raises(ValueError):
+        TokenBucketLimiter(2, 1).acquire(3)
+
+def test_one_limiter_per_provider_and_key():
+    limiter = get_limiter('test-provider', 'key-a', calls=7)
+    assert get_limiter('test-provider', 'key-a', calls=99) is limiter
+    assert limiter.capacity == 7
+    assert get_limiter('test-provider', 'key-b') is not limiter
+    assert get_limiter('other-provider', 'key-a') is not limiter
+
+def test_threads_share_the_quota():
+    limiter = TokenBucketLimiter(10, 0.5)  # 20 calls per second, a burst of 10
+    granted = []
+
+    def worker():
+        for _ in range(5):
+            limiter.acquire()
+            granted.append(time.monotonic())
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # 30 calls: the burst of 10 at once, the other 20 at 20 per second
+    assert len(granted) == 30
+    assert time.monotonic() - start >= 0.95
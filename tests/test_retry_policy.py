@@ -0,0 +1,152 @@
+import time
+
+import pytest
+import requests
+
+from src import retry_policy
+from src.retry_policy import (CircuitBreaker, CircuitOpenError, FailureKind, ProviderError, RetryBudget,
+                              RetryPolicy, classify_exception, use_budget)
+
+def http_error(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return requests.HTTPError(f"HTTP {status}", response=response)
+
+class Flaky:
+    """Raises the queued errors in turn, then returns 'ok'"""
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return 'ok'
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(retry_policy.time, 'sleep', slept.append)
+    return slept
+
+
+# 1. Classification
+@pytest.mark.parametrize('status, kind', [
+    (429, FailureKind.QUOTA), (408, FailureKind.TRANSIENT), (503, FailureKind.TRANSIENT),
+    (400, FailureKind.PERMANENT), (401, FailureKind.PERMANENT), (402, FailureKind.PERMANENT),
+    (404, FailureKind.PERMANENT)])
+def test_classify_http_errors(status, kind):
+    assert classify_exception(http_error(status))[0] == kind
+
+def test_classify_reads_retry_after():
+    assert classify_exception(http_error(429, {'Retry-After': '7'})) == (FailureKind.QUOTA, 7.0)
+
+
+# 2. Retries
+def test_429_waits_for_retry_after_and_pauses_the_limiter(sleeps):
+    paused = []
+    func = Flaky(http_error(429, {'Retry-After': '12'}))
+
+    assert RetryPolicy('fmp').call(func, on_quota=paused.append) == 'ok'
+    assert func.calls == 2
+    assert paused == [12.0] and sleeps == [12.0]
+
+def test_retry_after_is_capped(sleeps):
+    func = Flaky(http_error(429, {'Retry-After': '3600'}))
+    RetryPolicy('fmp', max_retry_after=60).call(func)
+    assert sleeps == [60]
+
+def test_quota_is_raised_at_once_without_retry_quota(sleeps):
+    paused = []
+    func = Flaky(http_error(429, {'Retry-After': '5'}))
+
+    with pytest.raises(ProviderError) as error:
+        RetryPolicy('fmp', retry_quota=False).call(func, on_quota=paused.append)
+    assert error.value.kind == FailureKind.QUOTA and error.value.retry_after == 5.0
+    assert func.calls == 1 and paused == [5.0] and sleeps == []
+
+def test_4xx_is_permanent(sleeps):
+    func = Flaky(http_error(404))
+
+    with pytest.raises(ProviderError) as error:
+        RetryPolicy('fmp').call(func)
+    assert error.value.kind == FailureKind.PERMANENT and error.value.status == 404
+    assert func.calls == 1 and sleeps == []
+
+def test_transient_failures_back_off_until_max_attempts(sleeps):
+    func = Flaky(*(http_error(503) for _ in range(5)))
+
+    with pytest.raises(ProviderError) as error:
+        RetryPolicy('fmp', max_attempts=3, base_delay=1.0).call(func)
+    assert error.value.kind == FailureKind.TRANSIENT
+    assert func.calls == 3
+    assert len(sleeps) == 2 and sleeps[0] <= 1.0 and sleeps[1] <= 2.0
+
+
+# 3. Retry budget
+def test_an_exhausted_budget_stops_retries(sleeps):
+    policy = RetryPolicy('fmp', max_attempts=10, budget=RetryBudget(2))
+    func = Flaky(*(requests.ConnectionError("reset") for _ in range(5)))
+
+    with pytest.raises(ProviderError):
+        policy.call(func)
+    assert func.calls == 3 and policy.budget.remaining == 0
+
+    # the next request gets no retry at all
+    func = Flaky(requests.ConnectionError("reset"))
+    with pytest.raises(ProviderError):
+        policy.call(func)
+    assert func.calls == 1
+
+def test_use_budget_charges_the_run_budget(sleeps):
+    policy = RetryPolicy('fmp', max_attempts=10, budget=RetryBudget(100))
+    run_budget = RetryBudget(1)
+
+    with use_budget(run_budget), pytest.raises(ProviderError):
+        policy.call(Flaky(*(requests.Timeout() for _ in range(5))))
+    assert run_budget.remaining == 0 and policy.budget.remaining == 100
+
+
+# 4. Circuit breaker
+def test_breaker_opens_half_opens_and_closes():
+    breaker = CircuitBreaker('fmp', failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+    assert 0 < breaker.retry_in() <= 0.05
+
+    time.sleep(0.06)
+    # one trial call goes through while half-open
+    assert breaker.allow() and breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+def test_a_failed_trial_opens_the_breaker_again():
+    breaker = CircuitBreaker('fmp', failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+
+def test_an_open_breaker_fails_calls_without_making_them(sleeps):
+    policy = RetryPolicy('fmp', max_attempts=1, breaker=CircuitBreaker('fmp', failure_threshold=1))
+    with pytest.raises(ProviderError):
+        policy.call(Flaky(http_error(500)))
+
+    func = Flaky()
+    with pytest.raises(CircuitOpenError):
+        policy.call(func)
+    assert func.calls == 0
+
+def test_permanent_failures_do_not_open_the_breaker(sleeps):
+    policy = RetryPolicy('fmp', breaker=CircuitBreaker('fmp', failure_threshold=1))
+    with pytest.raises(ProviderError):
+        policy.call(Flaky(http_error(404)))
+    assert policy.breaker.state == CircuitBreaker.CLOSED
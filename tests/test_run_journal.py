@@ -0,0 +1,110 @@
+import os
+
+import pytest
+
+from src.etl_processor import ETLProcessor
+from src.retry_policy import FailureKind, ProviderError
+from src.run_journal import RunJournal
+from src.sinks import ParquetSink
+
+SYMBOLS = ['AAA', 'BBB', 'CCC']
+
+class CountingClient:
+    """Serves stored records and counts fetches, failing the tickers in `down`"""
+    def __init__(self, records, down=()):
+        self.records = records
+        self.down = set(down)
+        self.calls = []
+
+    def get_yearly_data(self, symbol):
+        self.calls.append(symbol)
+        if symbol in self.down:
+            raise ProviderError(f"{symbol} is down", provider='fmp', kind=FailureKind.PERMANENT)
+        return self.records[symbol]
+
+    get_five_year_data = get_yearly_data
+
+    def get_historical_data(self, symbol, start_date=None, end_date=None):
+        return self.get_yearly_data(symbol)
+
+
+class FlakySink(ParquetSink):
+    """Parquet lake whose writes fail while `broken` is set"""
+    broken = False
+
+    def write(self, df, destination, upsert=False):
+        if self.broken:
+            raise OSError("disk full")
+        return super().write(df, destination, upsert)
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / 'runs.sqlite'), str(tmp_path / 'payloads')
+
+def run(journal_path, client, sink, run_id=None):
+    journal = RunJournal(*journal_path)
+    processor = ETLProcessor(None, client, None, sink=sink, journal=journal)
+    try:
+        return processor.run_streaming(SYMBOLS, 'prices', max_workers=2, run_id=run_id, validate=False)
+    finally:
+        journal.close()
+
+
+def test_resume_fetches_only_the_tickers_that_failed(tmp_path, journal_path, make_prices):
+    records = make_prices(SYMBOLS, 20)
+    sink = ParquetSink(str(tmp_path / 'lake'))
+
+    first = run(journal_path, CountingClient(records, down={'CCC'}), sink)
+    assert first['run_status'] == 'incomplete'
+
+    client = CountingClient(records)
+    second = run(journal_path, client, sink, run_id=first['run_id'])
+    assert second['run_status'] == 'complete'
+    assert client.calls == ['CCC']
+    assert sorted(sink.coverage('prices').index) == SYMBOLS
+
+def test_resume_reuses_payloads_of_tickers_that_never_loaded(tmp_path, journal_path, make_prices):
+    records = make_prices(SYMBOLS, 20)
+    sink = FlakySink(str(tmp_path / 'lake'))
+    sink.broken = True
+
+    first = run(journal_path, CountingClient(records), sink)
+    assert first['run_status'] == 'incomplete'
+    journal = RunJournal(*journal_path)
+    assert journal.status(first['run_id']) == {'load:failed': 3}
+    journal.close()
+    payload_dir = os.path.join(journal_path[1], first['run_id'])
+    assert sorted(os.listdir(payload_dir)) == [f"{symbol}.parquet" for symbol in SYMBOLS]
+
+    sink.broken = False
+    client = CountingClient(records)
+    second = run(journal_path, client, sink, run_id=first['run_id'])
+    assert second['run_status'] == 'complete'
+    assert client.calls == []
+    # a complete run has no use for its payloads
+    assert not os.path.exists(payload_dir)
+
+    loaded = sink.read('prices').sort_values(['symbol', 'date'])
+    assert len(loaded) == 60
+    expected = sorted(row['close'] for rows in records.values() for row in rows)
+    assert sorted(loaded['close']) == pytest.approx(expected, rel=1e-6)
+
+def test_payloads_round_trip_through_the_journal(tmp_path, make_prices):
+    rows = make_prices(['AAA'], 5)['AAA']
+    journal = RunJournal(str(tmp_path / 'runs.sqlite'), str(tmp_path / 'payloads'))
+    run_id = journal.start_run(['AAA'])
+    journal.save_payload(run_id, 'AAA', rows)
+    journal.wait_payloads()
+
+    entry = journal.tickers(run_id)['AAA']
+    restored = journal.load_payload(entry['payload_path']).to_records()
+    assert [row['date'][:10] for row in restored] == [row['date'] for row in rows]
+    assert [row['close'] for row in restored] == [row['close'] for row in rows]
+    journal.close()
+
+def test_journal_rejects_unknown_stages(tmp_path):
+    journal = RunJournal(str(tmp_path / 'runs.sqlite'), str(tmp_path / 'payloads'))
+    with pytest.raises(ValueError):
+        journal.record('run', 'AAA', 'publish')
+    journal.close()
@@ -0,0 +1,144 @@
+import pytest
+
+from src import scheduler
+from src.scheduler import STAGES, Scheduler, WorkQueue, shard_tickers
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(scheduler, '_now', clock)
+    return clock
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    queue = WorkQueue(str(tmp_path / 'queue.sqlite'), lease_seconds=60)
+    yield queue
+    queue.close()
+
+def chain(run_id='run', shard=0, resource=None, max_attempts=3):
+    """extract -> transform -> load tasks of one shard"""
+    tasks, previous = [], None
+    for stage in STAGES:
+        task_id = f"{run_id}:{shard}:{stage}"
+        tasks.append({'task_id': task_id, 'run_id': run_id, 'shard': shard, 'stage': stage, 'payload': {},
+                      'resource': resource if stage == 'extract' else None, 'max_attempts': max_attempts,
+                      'depends_on': [previous] if previous else []})
+        previous = task_id
+    return tasks
+
+
+def test_shard_tickers_round_robin():
+    assert shard_tickers(['A', 'B', 'C', 'D', 'E'], 2) == [['A', 'C', 'E'], ['B', 'D']]
+    assert shard_tickers(['A'], 4) == [['A']]
+
+
+# 1. Claiming
+def test_claim_follows_the_dependencies(queue):
+    queue.add(chain())
+
+    task = queue.claim('w1')
+    assert task['stage'] == 'extract' and task['attempts'] == 1
+    assert queue.claim('w2') is None  # transform waits for extract
+
+    queue.complete(task['task_id'])
+    assert queue.claim('w2')['stage'] == 'transform'
+
+def test_claim_prefers_later_stages(queue):
+    queue.add(chain(shard=0) + chain(shard=1))
+    queue.complete(queue.claim('w1')['task_id'])
+
+    # shard 0's transform goes before shard 1's extract
+    assert queue.claim('w1')['task_id'] == 'run:0:transform'
+
+def test_resubmitting_leaves_finished_tasks_alone(queue):
+    queue.add(chain())
+    queue.complete(queue.claim('w1')['task_id'])
+    queue.add(chain())
+
+    assert queue.status('run') == {'extract': {'done': 1}, 'transform': {'pending': 1}, 'load': {'pending': 1}}
+
+
+# 2. Resource limits
+def test_a_resource_is_held_by_one_running_task(queue):
+    queue.add(chain(shard=0, resource='fmp-key-0') + chain(shard=1, resource='fmp-key-0')
+              + chain(shard=2, resource='fmp-key-1'))
+
+    first, second = queue.claim('w1'), queue.claim('w2')
+    assert {first['resource'], second['resource']} == {'fmp-key-0', 'fmp-key-1'}
+    assert queue.claim('w3') is None  # the other fmp-key-0 extract waits
+
+    queue.complete(first['task_id'] if first['resource'] == 'fmp-key-0' else second['task_id'])
+    assert queue.claim('w3')['stage'] == 'transform'
+    assert queue.claim('w4')['resource'] == 'fmp-key-0'
+
+def test_an_expired_lease_frees_its_resource(queue, clock):
+    queue.add(chain(shard=0, resource='fmp-key-0') + chain(shard=1, resource='fmp-key-0'))
+    queue.claim('w1')
+
+    clock.now += 61
+    assert queue.claim('w2')['resource'] == 'fmp-key-0'
+
+
+# 3. Leases
+def test_an_expired_lease_is_claimed_again(queue, clock):
+    queue.add(chain())
+    task = queue.claim('w1')
+
+    clock.now += 30
+    queue.renew(task['task_id'], 'w1')
+    clock.now += 61 - 30
+    assert queue.claim('w2') is None  # the renewed lease still holds
+
+    clock.now += 30
+    again = queue.claim('w2')
+    assert again['task_id'] == task['task_id'] and again['attempts'] == 2
+
+def test_an_expired_lease_on_the_last_attempt_fails_the_task(queue, clock):
+    queue.add(chain(max_attempts=2))
+    queue.claim('w1')
+    clock.now += 61
+    queue.claim('w2')
+
+    clock.now += 61
+    assert queue.claim('w3') is None
+    assert queue.status('run') == {'extract': {'failed': 1}, 'transform': {'skipped': 1}, 'load': {'skipped': 1}}
+    assert queue.unfinished('run') == 0
+
+
+# 4. Failures
+def test_fail_retries_until_max_attempts_then_skips_dependents(queue):
+    queue.add(chain(max_attempts=2) + chain(shard=1))
+
+    task = queue.claim('w1')
+    assert queue.fail(task['task_id'], 'boom') is False
+    task = queue.claim('w1')
+    assert task['task_id'] == 'run:0:extract' and task['attempts'] == 2
+    assert queue.fail(task['task_id'], 'boom') is True
+
+    status = queue.status('run')
+    assert status['extract'] == {'failed': 1, 'pending': 1}
+    assert status['transform'] == {'skipped': 1, 'pending': 1}
+    assert status['load'] == {'skipped': 1, 'pending': 1}
+
+
+# 5. Submitting
+def test_submit_queues_a_dag_per_shard_with_one_key_each(tmp_path):
+    queue_path = str(tmp_path / 'queue.sqlite')
+    run_id = Scheduler(queue_path, str(tmp_path / 'work')).submit(
+        ['A', 'B', 'C', 'D'], 'prices', shards=2, key_count=2, run_id='run')
+
+    queue = WorkQueue(queue_path)
+    try:
+        assert run_id == 'run'
+        assert queue.status(run_id) == {stage: {'pending': 2} for stage in STAGES}
+        resources = {queue.claim('w1')['resource'], queue.claim('w2')['resource']}
+        assert resources == {'fmp-key-0', 'fmp-key-1'}
+    finally:
+        queue.close()
@@ -0,0 +1,57 @@
+import multiprocessing
+
+import pytest
+
+from src.sinks import ParquetSink
+
+pytest.importorskip('pyarrow')
+
+def write_frames(root, frames):
+    sink = ParquetSink(root)
+    for frame in frames:
+        sink.write(frame, 'prices')
+
+
+def test_read_returns_written_rows(tmp_path, price_frame):
+    sink = ParquetSink(str(tmp_path))
+    df = price_frame(['AAA', 'BBB'], 30)
+    sink.write(df, 'project.dataset.prices')
+
+    out = sink.read('prices', symbols=['BBB'])
+    assert len(out) == 30 and set(out['symbol']) == {'BBB'}
+    assert sink.coverage('prices').loc['AAA', 'rows'] == 30
+
+def test_upsert_keeps_newest_copy(tmp_path, price_frame):
+    sink = ParquetSink(str(tmp_path))
+    df = price_frame(['AAA'], 10)
+    sink.write(df, 'prices')
+    sink.write(df.assign(close=df['close'] + 1), 'prices', upsert=True)
+
+    out = sink.read('prices').sort_values('date')
+    assert len(out) == 10
+    assert (out['close'].to_numpy() == (df['close'] + 1).to_numpy()).all()
+
+def test_read_tail_takes_last_rows_per_symbol(tmp_path, price_frame):
+    sink = ParquetSink(str(tmp_path))
+    df = price_frame(['AAA', 'BBB'], 30)
+    sink.write(df, 'prices')
+
+    tail = sink.read_tail('prices', ['AAA', 'BBB'], 5)
+    assert tail.groupby('symbol').size().to_dict() == {'AAA': 5, 'BBB': 5}
+    assert tail['date'].max() == df['date'].max()
+
+def test_manifest_survives_concurrent_writer_processes(tmp_path, price_frame):
+    # sharded loads write one lake from several spawned processes
+    symbols = [f"S{i:02d}" for i in range(12)]
+    frames = [price_frame([symbol], 20, seed=i) for i, symbol in enumerate(symbols)]
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=write_frames, args=(str(tmp_path), frames[i::4])) for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+
+    coverage = ParquetSink(str(tmp_path)).coverage('prices')
+    assert sorted(coverage.index) == symbols
+    assert (coverage['rows'] == 20).all()
@@ -0,0 +1,174 @@
+import json
+import os
+
+import pytest
+
+from src.ticker_universe import TickerUniverse, diff_universe, parse_constituents
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'sp500_constituents.html')
+URL = 'https://example.test/sp500'
+
+@pytest.fixture
+def page():
+    with open(FIXTURE, encoding='utf-8') as f:
+        return f.read()
+
+
+class FakeResponse:
+    def __init__(self, status_code, text='', headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class FakeTransport:
+    """Answers with queued responses and records the headers of every request"""
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent_headers = []
+
+    def get(self, url, timeout=None, headers=None):
+        self.sent_headers.append(dict(headers or {}))
+        return self.responses.pop(0)
+
+
+# 1. Parsing
+def test_parse_constituents_reads_the_constituents_table(page):
+    tickers = parse_constituents(page)
+
+    assert len(tickers) == 15
+    assert tickers[:3] == ['MMM', 'AOS', 'ABT']
+    assert {'BRK.B', 'BF.B', 'GOOGL', 'GOOG'} <= set(tickers)
+    # the banner table before it and the changes table after it are not read
+    assert 'APP' not in tickers and 'ENPH' not in tickers
+
+def test_parse_constituents_falls_back_to_the_first_table():
+    html = ("<table><tr><th>Symbol</th></tr><tr><td>AAA</td></tr><tr><td>BBB</td></tr>"
+            "<tr><td>AAA</td></tr></table>")
+    assert parse_constituents(html) == ['AAA', 'BBB']
+
+def test_parse_constituents_rejects_a_page_without_ticker_rows():
+    with pytest.raises(ValueError):
+        parse_constituents("<p>no table here</p>")
+    with pytest.raises(ValueError):
+        parse_constituents('<table id="constituents"><tr><th>Symbol</th></tr></table>')
+
+
+# 2. Diffing
+def test_diff_universe():
+    diff = diff_universe(['AAPL', 'MSFT', 'ENPH'], ['MSFT', 'APP', 'AAPL'])
+    assert diff == {'added': ['APP'], 'removed': ['ENPH'], 'unchanged': 2}
+
+
+# 3. Conditional refresh
+def test_refresh_stores_validators_and_reports_every_ticker_as_added(tmp_path, page):
+    transport = FakeTransport(FakeResponse(200, page, {'ETag': '"v1"', 'Last-Modified': 'Mon, 06 Oct 2025 10:00:00 GMT'}))
+    universe = TickerUniverse(URL, state_path=str(tmp_path / 'universe.json'), transport=transport)
+
+    diff = universe.refresh()
+
+    assert transport.sent_headers == [{}]
+    assert len(diff['added']) == 15 and diff['removed'] == []
+    with open(tmp_path / 'universe.json') as f:
+        state = json.load(f)
+    assert state['etag'] == '"v1"'
+    assert state['tickers'] == universe.tickers
+
+def test_refresh_keeps_the_universe_on_304(tmp_path, page):
+    state_path = str(tmp_path / 'universe.json')
+    TickerUniverse(URL, state_path, FakeTransport(FakeResponse(200, page, {'ETag': '"v1"'}))).refresh()
+
+    transport = FakeTransport(FakeResponse(304))
+    universe = TickerUniverse(URL, state_path, transport)
+    diff = universe.refresh()
+
+    assert transport.sent_headers == [{'If-None-Match': '"v1"'}]
+    assert diff == {'added': [], 'removed': [], 'unchanged': 15}
+    assert len(universe.tickers) == 15
+
+def test_refresh_diffs_a_changed_page(tmp_path, page):
+    state_path = str(tmp_path / 'universe.json')
+    TickerUniverse(URL, state_path, FakeTransport(FakeResponse(200, page, {'ETag': '"v1"'}))).refresh()
+
+    changed = page.replace('>ZTS<', '>APP<')
+    diff = TickerUniverse(URL, state_path, FakeTransport(FakeResponse(200, changed, {'ETag': '"v2"'}))).refresh()
+
+    assert diff['added'] == ['APP'] and diff['removed'] == ['ZTS']
+
+def test_state_of_another_url_is_ignored(tmp_path, page):
+    state_path = str(tmp_path / 'universe.json')
+    TickerUniverse(URL, state_path, FakeTransport(FakeResponse(200, page, {'ETag': '"v1"'}))).refresh()
+
+    transport = FakeTransport(FakeResponse(200, page))
+    TickerUniverse('https://example.test/other', state_path, transport).refresh()
+
+    assert transport.sent_headers == [{}]
+
+
+# 4. Backfilling new constituents only
+def test_backfill_new_only_runs_just_the_added_constituents(tmp_path, monkeypatch, page):
+    from src import cli
+
+    state_path = tmp_path / '.state' / 'universe.json'
+    loaded = TickerUniverse(URL, str(state_path), FakeTransport(FakeResponse(200, page)))
+    loaded.refresh()
+    loaded.mark_loaded(loaded.tickers)
+    changed = page.replace('>ZTS<', '>APP<')
+
+    def universe(state_path):
+        return TickerUniverse(URL, state_path, FakeTransport(FakeResponse(200, changed)))
+
+    monkeypatch.setattr(cli, 'STATE_DIR', str(tmp_path / '.state'))
+    monkeypatch.setattr('src.ticker_universe.TickerUniverse', universe)
+    tickers, new_tickers = cli.resolve_tickers(None, {'ticker_csv': None})
+
+    assert new_tickers == ['APP']
+    assert 'APP' in tickers and 'ZTS' not in tickers
+
+def test_added_tickers_stay_pending_until_their_backfill_loads(tmp_path, page):
+    state_path = str(tmp_path / 'universe.json')
+    first = TickerUniverse(URL, state_path, FakeTransport(FakeResponse(200, page, {'ETag': '"v1"'})))
+    first.refresh()
+    first.mark_loaded(first.tickers)
+
+    changed = page.replace('>ZTS<', '>APP<')
+    TickerUniverse(URL, state_path, FakeTransport(FakeResponse(200, changed, {'ETag': '"v2"'}))).refresh()
+
+    # the backfill failed: the page is unchanged now, but APP is still waiting
+    universe = TickerUniverse(URL, state_path, FakeTransport(FakeResponse(304)))
+    assert universe.refresh()['added'] == []
+    assert universe.pending == ['APP']
+
+    universe.mark_loaded(['APP'])
+    assert TickerUniverse(URL, state_path).pending == []
+
+def test_removed_tickers_leave_the_pending_list(tmp_path, page):
+    state_path = str(tmp_path / 'universe.json')
+    TickerUniverse(URL, state_path, FakeTransport(FakeResponse(200, page))).refresh()
+
+    universe = TickerUniverse(URL, state_path, FakeTransport(FakeResponse(200, page.replace('>ZTS<', '>APP<'))))
+    universe.refresh()
+
+    assert 'APP' in universe.pending and 'ZTS' not in universe.pending
+
+def test_failed_backfill_leaves_new_constituents_pending(tmp_path, monkeypatch, page):
+    from src import cli
+
+    state_dir = tmp_path / '.state'
+    universe = TickerUniverse(URL, str(state_dir / 'universe.json'), FakeTransport(FakeResponse(200, page)))
+    universe.refresh()
+    universe.mark_loaded(universe.tickers)
+    changed = page.replace('>ZTS<', '>APP<')
+    TickerUniverse(URL, str(state_dir / 'universe.json'), FakeTransport(FakeResponse(200, changed))).refresh()
+
+    monkeypatch.setattr(cli, 'STATE_DIR', str(state_dir))
+    monkeypatch.setattr('src.ticker_universe.TickerUniverse',
+                        lambda state_path: TickerUniverse(URL, state_path, FakeTransport(FakeResponse(304))))
+    assert cli.resolve_tickers(None, {'ticker_csv': None})[1] == ['APP']
+
+    cli._mark_backfilled(['APP'])
+    assert cli.resolve_tickers(None, {'ticker_csv': None})[1] == []
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from src.columnar import ColumnarBatch
+from src.etl_processor import ETLProcessor
+
+ERROR = {'Error Message': 'Invalid API KEY'}
+
+class PayloadClient:
+    """Returns a fixed payload per symbol"""
+    def __init__(self, payloads):
+        self.payloads = payloads
+
+    def get_yearly_data(self, symbol):
+        return self.payloads[symbol]
+
+    get_five_year_data = get_yearly_data
+
+    def get_historical_data(self, symbol, start_date=None, end_date=None):
+        return self.payloads[symbol]
+
+
+@pytest.fixture
+def processor():
+    return ETLProcessor(None, None, None)
+
+
+def test_transform_combines_lists_and_batches(processor, make_prices):
+    records = make_prices(['AAA', 'BBB'], 5)
+    df = processor.transform([records['AAA'], ColumnarBatch.from_records(records['BBB'])])
+
+    assert len(df) == 10
+    assert str(df['symbol'].dtype) == 'category'
+    assert df['volume'].dtype == np.int64
+
+def test_transform_reads_flat_records(processor, make_prices):
+    records = make_prices(['AAA'], 5)['AAA']
+    assert len(processor.transform(records)) == 5
+
+@pytest.mark.parametrize('position', [0, 1])
+def test_one_error_payload_does_not_fail_the_batch(processor, make_prices, position):
+    records = make_prices(['AAA', 'BBB'], 5)
+    payloads = [records['AAA'], records['BBB']]
+    payloads.insert(position, ERROR)
+
+    df = processor.transform(payloads)
+    assert sorted(df['symbol'].unique()) == ['AAA', 'BBB']
+    assert processor.transform([ERROR, 'garbage']) is None
+
+def test_extract_counts_error_objects_as_failures(make_prices):
+    records = make_prices(['AAA'], 5)
+    processor = ETLProcessor(None, PayloadClient({'AAA': records['AAA'], 'BAD': ERROR}), None)
+
+    extracted = processor.extract(['AAA', 'BAD'], 'yearly', use_retry=False)
+    assert extracted == [records['AAA']]
+    assert processor.stats['extracted'] == 1
+    assert processor.stats['errors'] == 1
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.etl_processor import ETLProcessor
+from src.validation import CHECKS, validate_prices, write_quarantine
+
+@pytest.fixture
+def prices(price_frame):
+    return price_frame(['AAA', 'BBB'], 10)
+
+def reasons(result):
+    return dict(zip(result.quarantine['symbol'] + ' ' + result.quarantine['date'].astype(str).str[:10],
+                    result.quarantine['reason']))
+
+
+def test_clean_frame_passes(prices):
+    result = validate_prices(prices)
+    assert result.ok
+    assert len(result.valid) == len(prices)
+    assert result.report['checks'] == {name: 0 for name in CHECKS}
+    assert result.report['gaps'] == 0
+
+def test_each_check_flags_its_rows(prices):
+    df = prices.copy()
+    df.loc[0, 'close'] = np.nan
+    df.loc[1, 'low'] = -1.0
+    df.loc[2, 'volume'] = -5
+    df.loc[3, 'low'] = df.loc[3, 'high'] + 1
+    bad = pd.concat([df, df.iloc[[4]]], ignore_index=True)
+
+    result = validate_prices(bad)
+    assert result.report['checks'] == {'missing_value': 1, 'bad_type': 0, 'duplicate': 1,
+                                       'non_positive_price': 1, 'negative_volume': 1, 'ohlc_inconsistent': 1}
+    assert result.report['quarantined_rows'] == 5
+    assert len(result.valid) == len(prices) - 4
+    # the first copy of a duplicated key stays valid
+    assert (result.valid['date'] == df.loc[4, 'date']).sum() == 2
+
+def test_quarantined_rows_list_every_failed_check(prices):
+    df = prices.copy()
+    df.loc[0, ['open', 'low']] = [-1.0, 5.0]
+    result = validate_prices(df)
+    assert list(result.quarantine['reason']) == ['non_positive_price,ohlc_inconsistent']
+
+def test_unconvertible_values_are_bad_types(prices):
+    df = prices.astype({'close': object, 'date': object})
+    df.loc[0, 'close'] = 'n/a'
+    df.loc[1, 'date'] = 'yesterday'
+    df.loc[2, 'symbol'] = ' '
+
+    result = validate_prices(df)
+    assert result.report['checks']['bad_type'] == 2
+    assert result.report['checks']['missing_value'] == 1
+    # quarantined rows keep the values as they arrived
+    assert 'n/a' in set(result.quarantine['close'])
+    assert pd.api.types.is_datetime64_any_dtype(result.valid['date'])
+    assert result.valid['volume'].dtype == 'int64'
+
+def test_gaps_are_reported_but_not_quarantined(prices):
+    df = prices[~prices['date'].between('2024-01-03', '2024-01-11') | (prices['symbol'] == 'BBB')]
+    result = validate_prices(df, max_gap_days=5)
+    assert result.ok
+    assert result.report['gaps'] == 1
+    assert result.report['gap_list'] == [{'symbol': 'AAA', 'from': '2024-01-02', 'to': '2024-01-12'}]
+
+def test_missing_columns_raise(prices):
+    with pytest.raises(ValueError):
+        validate_prices(prices.drop(columns=['volume']))
+
+def test_processor_writes_quarantine_and_loads_the_rest(tmp_path, prices):
+    df = prices.copy()
+    df.loc[0, 'high'] = 0.0
+    valid = ETLProcessor(None, None, None).validate(df, quarantine_dir=str(tmp_path))
+
+    assert len(valid) == len(prices) - 1
+    files = list(tmp_path.glob('quarantine-*.csv'))
+    assert len(files) == 1
+    written = pd.read_csv(files[0])
+    assert written['reason'].tolist() == ['non_positive_price,ohlc_inconsistent']
+    assert write_quarantine(df.iloc[0:0], str(tmp_path)) is None
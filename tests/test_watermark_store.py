@@ -0,0 +1,45 @@
+from datetime import date
+
+import pandas as pd
+
+from src.watermark_store import WatermarkStore, plan_ranges
+
+END = date(2026, 1, 8)
+
+
+def test_plan_starts_the_day_after_each_watermark():
+    plan = plan_ranges(['AAA', 'BBB'], {'AAA': date(2026, 1, 5), 'BBB': date(2025, 12, 31)}, end_date=END)
+    assert plan == {'AAA': (date(2026, 1, 6), END), 'BBB': (date(2026, 1, 1), END)}
+
+def test_plan_gives_never_loaded_tickers_the_full_lookback():
+    plan = plan_ranges(['NEW'], {}, lookback_days=30, end_date=END)
+    assert plan == {'NEW': (date(2025, 12, 9), END)}
+
+def test_plan_leaves_out_up_to_date_tickers():
+    marks = {'AAA': END, 'BBB': date(2026, 1, 9), 'CCC': date(2026, 1, 7)}
+    assert plan_ranges(['AAA', 'BBB', 'CCC'], marks, end_date=END) == {'CCC': (END, END)}
+
+def test_plan_ignores_watermarks_of_other_tickers():
+    assert plan_ranges([], {'AAA': date(2026, 1, 1)}, end_date=END) == {}
+
+
+def test_watermarks_only_move_forward(tmp_path):
+    store = WatermarkStore(str(tmp_path / 'marks.sqlite'))
+    store.update({'AAA': date(2026, 1, 7), 'BBB': date(2026, 1, 2)})
+    store.update({'AAA': date(2026, 1, 5), 'BBB': date(2026, 1, 6)})
+
+    assert store.get() == {'AAA': date(2026, 1, 7), 'BBB': date(2026, 1, 6)}
+    assert store.get(['BBB', 'ZZZ']) == {'BBB': date(2026, 1, 6)}
+    store.close()
+
+    # and survive a restart
+    assert WatermarkStore(str(tmp_path / 'marks.sqlite')).get(['AAA']) == {'AAA': date(2026, 1, 7)}
+
+def test_update_from_frame_takes_the_newest_date_per_symbol():
+    store = WatermarkStore(':memory:')
+    df = pd.DataFrame({'symbol': pd.Categorical(['AAA', 'AAA', 'BBB']),
+                       'date': pd.to_datetime(['2026-01-06', '2026-01-08', '2026-01-05'])})
+    store.update_from_frame(df)
+    store.update_from_frame(df.iloc[0:0])
+
+    assert store.get() == {'AAA': date(2026, 1, 8), 'BBB': date(2026, 1, 5)}